@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark of atomic_write in each durability mode: throughput and latency of
+small file writes from a growing number of concurrent writer threads.
+
+It compares the old in-place write (open with 'w', no fsync) with
+atomic_write under "none" (temp file + rename only), "fsync" (file and
+directory synced on every write) and "group" (fsyncs batched across
+concurrent writers every WRITE_GROUP_COMMIT_WINDOW_MS).
+
+fsync cost depends entirely on the filesystem, so run it on the disk the
+workspace lives on (a tmpfs /tmp makes every mode look free). Run from the
+backend directory:
+    python -m benchmarks.atomic_write_durability --dir workspace
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, List
+
+from src.utils.atomic_write import (
+    DURABILITY_FSYNC,
+    DURABILITY_GROUP,
+    DURABILITY_NONE,
+    atomic_write
+)
+
+MODES = ["in-place", DURABILITY_NONE, DURABILITY_FSYNC, DURABILITY_GROUP]
+
+
+def in_place_write(file_path: str, data: bytes) -> None:
+    """How file_utils wrote before atomic writes: truncate and rewrite the file itself."""
+    with open(file_path, 'wb') as f:
+        f.write(data)
+
+
+def writer_for(mode: str) -> Callable[[str, bytes], None]:
+    if mode == "in-place":
+        return in_place_write
+    return lambda file_path, data: atomic_write(file_path, data, durability=mode)
+
+
+def run(mode: str, directory: str, threads: int, writes_per_thread: int, size: int) -> List[float]:
+    """Have each thread rewrite its own file; returns every write's latency in seconds."""
+    write = writer_for(mode)
+    data = os.urandom(size)
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    start = threading.Barrier(threads)
+
+    def worker(number: int) -> None:
+        file_path = os.path.join(directory, f"file-{number}.txt")
+        start.wait()
+        for _ in range(writes_per_thread):
+            started = time.perf_counter()
+            write(file_path, data)
+            latencies[number].append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return [latency for thread_latencies in latencies for latency in thread_latencies]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark atomic_write durability modes")
+    parser.add_argument("--dir", default=".", help="Directory to write in (on the disk to measure)")
+    parser.add_argument("--threads", default="1,8,32", help="Comma-separated numbers of concurrent writers")
+    parser.add_argument("--writes", type=int, default=200, help="Total writes per run")
+    parser.add_argument("--size", type=int, default=4096, help="Bytes per write")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="atomic-write-bench-", dir=args.dir)
+    try:
+        print(f"{args.writes} writes of {args.size} bytes in {os.path.abspath(directory)}")
+        print(f"{'mode':>9} {'threads':>8} {'writes/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for threads in (int(value) for value in args.threads.split(",")):
+            for mode in MODES:
+                writes_per_thread = max(1, args.writes // threads)
+                started = time.perf_counter()
+                latencies = run(mode, directory, threads, writes_per_thread, args.size)
+                elapsed = time.perf_counter() - started
+                print(
+                    f"{mode:>9} {threads:>8} {len(latencies) / elapsed:>10.0f} "
+                    f"{percentile(latencies, 0.5) * 1000:>8.2f} {percentile(latencies, 0.99) * 1000:>8.2f}"
+                )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the per-request overhead of /api/file/operation outside
+the file work itself: validating the request and serializing the response.
+
+It compares the old path (untyped parameters dict, response validated
+through the route's response_model and rendered with the json module) with
+the current one (typed command validated once, response rendered by
+FastJSONResponse), for view results of growing size.
+
+Run from the backend directory:
+    python -m benchmarks.file_operation_overhead
+"""
+
+import json
+import time
+from typing import Any, Callable, Dict
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from src.api.models import FileOperation, FileOperationResponse
+from src.api.responses import FastJSONResponse, orjson
+
+SIZES = [64 * 1024, 1024 * 1024, 8 * 1024 * 1024]
+
+
+class LegacyFileOperation(BaseModel):
+    """The request model before typed commands."""
+    command: str
+    path: str
+    parameters: Dict[str, Any] = {}
+
+
+def view_result(size: int) -> str:
+    """A view result of about size bytes: numbered lines, some non-ASCII."""
+    line = 'print("naïve café — ünïcode", value)  # comment\n'
+    lines = []
+    total = 0
+    number = 1
+    while total < size:
+        text = f"{number}: {line}"
+        lines.append(text)
+        total += len(text.encode("utf-8"))
+        number += 1
+    return "".join(lines)
+
+
+def measure(fn: Callable[[], Any], min_seconds: float = 0.5) -> float:
+    """Average seconds per call over at least min_seconds."""
+    fn()
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main() -> None:
+    operation_adapter = TypeAdapter(FileOperation)
+    request = {"command": "view", "path": "big.py", "parameters": {"view_range": [1, -1]}}
+
+    def legacy_request() -> None:
+        operation = LegacyFileOperation.model_validate(request)
+        # handle_tool_use rebuilt the input dict and picked parameters out with .get()
+        params = {"command": operation.command, "path": operation.path, **operation.parameters}
+        params.get("view_range"), params.get("cursor")
+
+    def typed_request() -> None:
+        command = operation_adapter.validate_python(request)
+        command.view_range, command.cursor
+
+    print(f"orjson installed: {orjson is not None}")
+    print(f"request validation: legacy {measure(legacy_request) * 1e6:.1f} us, typed {measure(typed_request) * 1e6:.1f} us")
+    print()
+    print(f"{'view size':>10} {'legacy ms':>10} {'fast ms':>10} {'speedup':>8}")
+
+    for size in SIZES:
+        result = {"success": True, "message": view_result(size), "error": False}
+
+        def legacy_response() -> bytes:
+            # What FastAPI does for a dict returned from a route with a response_model
+            content = FileOperationResponse.model_validate(result).model_dump(mode="json")
+            return JSONResponse(content).body
+
+        def fast_response() -> bytes:
+            return FastJSONResponse(result).body
+
+        assert json.loads(legacy_response()) == json.loads(fast_response())
+        legacy = measure(legacy_response)
+        fast = measure(fast_response)
+        print(f"{size // 1024:>8} KiB {legacy * 1000:>10.2f} {fast * 1000:>10.2f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
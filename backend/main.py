@@ -9,26 +9,71 @@ allowing it to view and modify text files through its text editor tool.
 # Imports
 # ----------------------------------------------------------------------
 import os
-import sys
 import logging
+import uuid
+from contextlib import asynccontextmanager
 from typing import Dict, List, Any, Optional
 
-import uvicorn
-from fastapi import FastAPI, HTTPException, Depends, status, BackgroundTasks
+from dotenv import load_dotenv
+
+# Load .env before any src module reads settings from the environment
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, status, BackgroundTasks, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 
 from src.chatbot import ClaudeTextEditorChatbot
-from src.config.settings import WORKSPACE_DIR
 from src.api.models import (
     UserMessage, 
     ChatResponse, 
-    FileOperation, 
+    ChatCancelResponse,
+    FileOperationBatch,
     FileOperationResponse,
-    ListFilesResponse
+    ListFilesResponse,
+    describe_validation_error,
+    parse_editor_command
 )
-from src.api.dependencies import get_chatbot
+from src.api.dependencies import get_chatbot, get_job_queue, get_session_chatbot, get_session_id
+from src.api.middleware import ProfilingMiddleware, RequestContextMiddleware, TenantMiddleware
+from src.api import admin, checkpoints, files, jobs, workspace
+from src.api.responses import FastJSONResponse, dumps_json
+from src.config.settings import FILE_BATCH_MAX_OPERATIONS
+from src.services.chat_cancellation import CHAT_ID, ChatCancelledError, get_chat_registry
+from src.services.file_batch import run_batch
+from src.services.file_io import (
+    FileIOBusyError,
+    FileIOTimeoutError,
+    get_file_io_pool,
+    run_file_io
+)
+from src.services.job_queue import ChatJobQueue
+from src.services.session_locks import session_turn_lock
+from src.tools.text_editor import TextEditorTool
+from src.utils.workspace_files import ensure_workspace_directories
+from src.utils.logging_config import configure_logging, stop_logging
+from src.utils.replace_all import shutdown_process_pool
+from src.utils.workspace import get_workspace_dir
+
+# ----------------------------------------------------------------------
+# Application lifespan (startup and shutdown)
+# ----------------------------------------------------------------------
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start logging, prepare the workspace and start the chat job queue; runs once per worker process."""
+    # Records are written by a background thread (JSON by default, see LOG_FORMAT)
+    started_logging = configure_logging()
+    ensure_workspace_directories()
+    app.state.chat_jobs = ChatJobQueue(get_session_chatbot)
+    await app.state.chat_jobs.start()
+    yield
+    await app.state.chat_jobs.stop()
+    get_file_io_pool().shutdown()
+    shutdown_process_pool()
+    if started_logging:
+        stop_logging()
 
 # ----------------------------------------------------------------------
 # Create FastAPI app
@@ -36,7 +81,8 @@ from src.api.dependencies import get_chatbot
 app = FastAPI(
     title="Claude Text Editor API",
     description="API for interacting with Claude Text Editor Tool",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # ----------------------------------------------------------------------
@@ -51,13 +97,32 @@ app.add_middleware(
 )
 
 # ----------------------------------------------------------------------
-# Configure logging
+# Configure profiling, request logging, tenant workspaces and routes
 # ----------------------------------------------------------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestContextMiddleware)
+app.add_middleware(TenantMiddleware)
+app.include_router(admin.router)
+app.include_router(jobs.router)
+app.include_router(files.router)
+app.include_router(checkpoints.router)
+app.include_router(workspace.router)
+
+# ----------------------------------------------------------------------
+# File I/O pool errors
+# ----------------------------------------------------------------------
+
+@app.exception_handler(FileIOBusyError)
+async def file_io_busy_handler(request, exc: FileIOBusyError):
+    """Too many file operations are queued: ask the client to retry shortly."""
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(FileIOTimeoutError)
+async def file_io_timeout_handler(request, exc: FileIOTimeoutError):
+    """A file operation took longer than FILE_IO_TIMEOUT_SECONDS."""
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": str(exc)})
+
+# Logging is configured in the lifespan, so importing this module starts no threads
 logger = logging.getLogger(__name__)
 
 # ----------------------------------------------------------------------
@@ -74,11 +139,38 @@ async def root():
     }
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(message: UserMessage, chatbot: ClaudeTextEditorChatbot = Depends(get_chatbot)):
-    """Send a message to Claude and get a response."""
+async def chat(
+    message: UserMessage,
+    request: Request,
+    chatbot: ClaudeTextEditorChatbot = Depends(get_chatbot),
+    x_chat_id: Optional[str] = Header(None)
+):
+    """
+    Send a message to Claude and get a response.
+    The turn is cancelled if the client disconnects, or through
+    /api/chat/{chat_id}/cancel using the id sent in the X-Chat-ID header.
+    """
+    if x_chat_id is not None and not CHAT_ID.match(x_chat_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid X-Chat-ID header"
+        )
+    chat_id = x_chat_id or uuid.uuid4().hex
+    if get_chat_registry().is_running(chat_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"A chat turn with id {chat_id} is already running"
+        )
+    async def turn():
+        # One turn at a time per session, whether from here or a chat job
+        async with session_turn_lock(chatbot.session_id):
+            return await chatbot.chat_async(message.content)
+        
     try:
-        response = chatbot.chat(message.content)
-        return ChatResponse(response=response)
+        response = await get_chat_registry().run(chat_id, turn(), request.is_disconnected)
+        return ChatResponse(response=response, chat_id=chat_id)
+    except ChatCancelledError:
+        return ChatResponse(response="", chat_id=chat_id, cancelled=True)
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(
@@ -86,30 +178,44 @@ async def chat(message: UserMessage, chatbot: ClaudeTextEditorChatbot = Depends(
             detail=f"Error processing request: {str(e)}"
         )
 
-@app.post("/api/file/operation", response_model=FileOperationResponse)
-async def file_operation(operation: FileOperation, chatbot: ClaudeTextEditorChatbot = Depends(get_chatbot)):
+@app.post("/api/chat/{chat_id}/cancel", response_model=ChatCancelResponse, status_code=status.HTTP_202_ACCEPTED)
+async def cancel_chat(chat_id: str, queue: ChatJobQueue = Depends(get_job_queue)):
+    """Cancel a running /api/chat turn or a chat job; it stops at its next safe point."""
+    if not get_chat_registry().cancel(chat_id) and not queue.cancel(chat_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No running chat turn or job: {chat_id}"
+        )
+    return ChatCancelResponse(chat_id=chat_id, status="cancelling")
+
+@app.post("/api/file/operation", response_model=FileOperationResponse, response_class=FastJSONResponse)
+async def file_operation(
+    operation: Dict[str, Any] = Body(..., description='A text editor command: {"command": "...", "path": "...", "parameters": {...}}'),
+    session_id: str = Depends(get_session_id)
+):
     """Perform a file operation using the text editor tool."""
     try:
-        # Convert the operation to a tool use format Claude would use
-        tool_use = {
-            "id": "api_tool_use",
-            "name": "str_replace_editor",
-            "input": {
-                "command": operation.command,
-                "path": operation.path,
-                **operation.parameters
-            }
-        }
-        
-        # Handle the tool use directly
-        result = chatbot.handle_tool_use(tool_use)
+        command = parse_editor_command(operation)
+    except ValidationError as e:
+        # An invalid command fails like any other operation: 200 with success false
+        return FastJSONResponse({
+            "success": False,
+            "message": f"Error: Invalid parameters: {describe_validation_error(e)}",
+            "error": True
+        })
+    
+    try:
+        # Run the typed command on the file I/O pool so the event loop stays free
+        result = await run_file_io(TextEditorTool.run, command, session_id, name=command.command)
         
-        # Return the result
-        return FileOperationResponse(
-            success=not result.get("is_error", False),
-            message=result.get("content", ""),
-            error=result.get("is_error", False)
-        )
+        # Large view results are serialized once, by the fast encoder
+        return FastJSONResponse({
+            "success": not result["is_error"],
+            "message": result["content"],
+            "error": result["is_error"]
+        })
+    except (FileIOBusyError, FileIOTimeoutError):
+        raise
     except Exception as e:
         logger.error(f"Error in file operation endpoint: {str(e)}")
         raise HTTPException(
@@ -117,48 +223,32 @@ async def file_operation(operation: FileOperation, chatbot: ClaudeTextEditorChat
             detail=f"Error processing file operation: {str(e)}"
         )
 
+@app.post("/api/file/operations")
+async def file_operations(batch: FileOperationBatch, session_id: str = Depends(get_session_id)):
+    """
+    Perform many file operations in one request. Operations on different paths
+    run concurrently; operations on the same path run in the order given.
+    Results stream back as newline-delimited JSON in completion order, each
+    with the index of its operation.
+    """
+    if len(batch.operations) > FILE_BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many operations: {len(batch.operations)} (at most {FILE_BATCH_MAX_OPERATIONS} per request)"
+        )
+    
+    async def stream_results():
+        async for result in run_batch(batch.operations, session_id=session_id):
+            yield dumps_json(result) + b"\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.get("/api/files", response_model=ListFilesResponse)
 async def list_files(path: str = ""):
     """List files in the workspace directory."""
     try:
-        import os
-        from src.utils.file_utils import validate_path, list_directory_contents
-        
-        # Validate the path
-        target_path = os.path.join(WORKSPACE_DIR, path) if path else WORKSPACE_DIR
-        is_valid, abs_path, error = validate_path(target_path)
-        
-        if not is_valid:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error or "Invalid path"
-            )
-            
-        if not os.path.isdir(abs_path):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Path is not a directory: {path}"
-            )
-            
-        # List the contents
-        contents = list_directory_contents(abs_path)
-        
-        # Parse the contents into files and directories
-        files = []
-        directories = []
-        
-        for item in contents:
-            if item.startswith("[DIR]"):
-                directories.append(item[6:].strip())
-            elif item.startswith("[FILE]"):
-                files.append(item[7:].strip())
-                
-        return ListFilesResponse(
-            path=path,
-            files=files,
-            directories=directories
-        )
-    except HTTPException:
+        return await run_file_io(list_workspace_files, path, name="listing")
+    except (HTTPException, FileIOBusyError, FileIOTimeoutError):
         raise
     except Exception as e:
         logger.error(f"Error listing files: {str(e)}")
@@ -167,11 +257,52 @@ async def list_files(path: str = ""):
             detail=f"Error listing files: {str(e)}"
         )
 
+def list_workspace_files(path: str) -> ListFilesResponse:
+    """Validate and list a workspace directory (blocking; run on the file I/O pool)."""
+    from src.utils.file_reading import list_directory_contents
+    from src.utils.file_utils import validate_path
+    
+    # Validate the path
+    workspace_dir = get_workspace_dir()
+    target_path = os.path.join(workspace_dir, path) if path else workspace_dir
+    is_valid, abs_path, error = validate_path(target_path)
+    
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error or "Invalid path"
+        )
+        
+    if not os.path.isdir(abs_path):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Path is not a directory: {path}"
+        )
+        
+    # List the contents
+    contents = list_directory_contents(abs_path)
+    
+    # Parse the contents into files and directories
+    files = []
+    directories = []
+    
+    for item in contents:
+        if item.startswith("[DIR]"):
+            directories.append(item[6:].strip())
+        elif item.startswith("[FILE]"):
+            files.append(item[7:].strip())
+            
+    return ListFilesResponse(
+        path=path,
+        files=files,
+        directories=directories
+    )
+
 @app.post("/api/reset")
-async def reset_conversation(background_tasks: BackgroundTasks):
-    """Reset the conversation with Claude."""
-    # We'll recreate the chatbot in the background
-    background_tasks.add_task(ClaudeTextEditorChatbot)
+async def reset_conversation(chatbot: ClaudeTextEditorChatbot = Depends(get_chatbot)):
+    """Reset the conversation with Claude for the current session."""
+    async with session_turn_lock(chatbot.session_id):
+        chatbot.reset_conversation()
     return {"status": "success", "message": "Conversation reset"}
 
 # ----------------------------------------------------------------------
@@ -181,10 +312,9 @@ async def reset_conversation(background_tasks: BackgroundTasks):
 @app.post("/api/sample", response_model=FileOperationResponse)
 async def create_sample_file():
     """Create a sample Python file in the workspace for demonstration."""
-    import os
     from src.utils.file_utils import create_new_file
     
-    sample_path = os.path.join(WORKSPACE_DIR, "sample.py")
+    sample_path = os.path.join(get_workspace_dir(), "sample.py")
     sample_content = '''def calculate_factorial(n):
     """Calculate the factorial of a number."""
     if n == 0 or n == 1:
@@ -199,7 +329,7 @@ if __name__ == "__main__":
     main()
 '''
     
-    success, message = create_new_file(sample_path, sample_content)
+    success, message = await run_file_io(create_new_file, sample_path, sample_content, name="create")
     
     return FileOperationResponse(
         success=success,
@@ -212,19 +342,13 @@ if __name__ == "__main__":
 # ----------------------------------------------------------------------
 
 def main():
-    """Main function to run the FastAPI application with Uvicorn."""
-    # Create workspace directory if it doesn't exist
-    if not os.path.exists(WORKSPACE_DIR):
-        os.makedirs(WORKSPACE_DIR)
-        print(f"Created workspace directory: {WORKSPACE_DIR}")
-        
-    # Create .backups directory if it doesn't exist
-    backups_dir = os.path.join(WORKSPACE_DIR, ".backups")
-    if not os.path.exists(backups_dir):
-        os.makedirs(backups_dir)
-        print(f"Created backups directory: {backups_dir}")
-    
-    # Run the application with Uvicorn
+    """
+    Main function to run the FastAPI application with Uvicorn for development.
+    Use serve.py to run the application in production.
+    """
+    import uvicorn
+
+    # Run the application with Uvicorn (workspace directories are created on startup)
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
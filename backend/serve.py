@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the Claude Text Editor API.
+Runs the FastAPI application with multiple Uvicorn worker processes,
+using uvloop and httptools when they are installed.
+"""
+
+# ----------------------------------------------------------------------
+# Imports
+# ----------------------------------------------------------------------
+import argparse
+from importlib.util import find_spec
+
+from dotenv import load_dotenv
+
+# Load .env before the settings module reads the environment
+load_dotenv()
+
+from src.config.settings import (
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_WORKERS,
+    GRACEFUL_SHUTDOWN_SECONDS
+)
+from src.utils.logging_config import configure_logging
+
+# ----------------------------------------------------------------------
+# Server Options
+# ----------------------------------------------------------------------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line options, defaulting to the values in settings."""
+    parser = argparse.ArgumentParser(description="Run the Claude Text Editor API in production")
+    parser.add_argument("--host", default=SERVER_HOST, help="Interface to bind to")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="Port to bind to")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Number of worker processes")
+    parser.add_argument(
+        "--graceful-shutdown",
+        type=int,
+        default=GRACEFUL_SHUTDOWN_SECONDS,
+        help="Seconds to wait for in-flight requests on shutdown"
+    )
+    return parser.parse_args()
+
+
+def select_loop() -> str:
+    """Use uvloop when it is installed, otherwise the default asyncio loop."""
+    return "uvloop" if find_spec("uvloop") else "asyncio"
+
+
+def select_http() -> str:
+    """Use httptools when it is installed, otherwise the pure Python h11 parser."""
+    return "httptools" if find_spec("httptools") else "h11"
+
+# ----------------------------------------------------------------------
+# Main function for running the application
+# ----------------------------------------------------------------------
+
+def main():
+    """Run the FastAPI application with Uvicorn worker processes."""
+    import uvicorn
+
+    args = parse_args()
+
+    # This process's own records (uvicorn's supervisor messages) go through the
+    # logging queue too. Each worker process sets up its own in the app's
+    # lifespan (a single in-process worker reuses this one), and log_config=None
+    # keeps uvicorn from installing its handlers over it.
+    configure_logging()
+
+    # The app is passed as an import string so each worker imports it itself;
+    # workspace directories are created in the app's lifespan on startup.
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=max(1, args.workers),
+        loop=select_loop(),
+        http=select_http(),
+        timeout_graceful_shutdown=args.graceful_shutdown,
+        proxy_headers=True,
+        access_log=False,
+        log_config=None
+    )
+
+# ----------------------------------------------------------------------
+# Script Execution
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Admin routes for the Claude Text Editor API.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+from src.api.dependencies import require_admin
+from src.api.models import ProfilingToggle
+from src.services.file_io import NO_TIMEOUT, run_file_io
+from src.utils import metrics
+from src.utils.profiler import (
+    get_profile_path,
+    is_profiling_enabled,
+    list_profiles,
+    set_profiling_enabled
+)
+from src.utils.quota import get_usage, recount_usage
+from src.utils.workspace import is_valid_tenant_id
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+# ----------------------------------------------------------------------
+# --- Profiling Routes
+# ----------------------------------------------------------------------
+
+@router.get("/profiling")
+async def get_profiling():
+    """Show whether all profiled requests are being captured."""
+    return {"enabled": is_profiling_enabled()}
+
+
+@router.post("/profiling")
+async def update_profiling(toggle: ProfilingToggle):
+    """Turn profiling of every chat and file operation request on or off."""
+    set_profiling_enabled(toggle.enabled)
+    return {"enabled": is_profiling_enabled()}
+
+
+@router.get("/profiles")
+async def get_profiles():
+    """List the stored request profiles, newest first."""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str):
+    """Download a stored profile in pstats format."""
+    path = get_profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile not found: {name}"
+        )
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+# ----------------------------------------------------------------------
+# --- Metrics Routes
+# ----------------------------------------------------------------------
+
+@router.get("/metrics")
+async def get_metrics():
+    """Get this worker's counters, gauges and timing summaries."""
+    return metrics.snapshot()
+
+# ----------------------------------------------------------------------
+# --- Workspace Usage Routes
+# ----------------------------------------------------------------------
+
+def _check_tenant_id(tenant_id: str) -> None:
+    if not is_valid_tenant_id(tenant_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid tenant id: {tenant_id!r}"
+        )
+
+
+@router.get("/tenants/{tenant_id}/usage")
+async def get_tenant_usage(tenant_id: str):
+    """Get a tenant's workspace usage (bytes and files) and quotas."""
+    _check_tenant_id(tenant_id)
+    return await run_file_io(get_usage, tenant_id, timeout=NO_TIMEOUT, name="usage count")
+
+
+@router.post("/tenants/{tenant_id}/usage/recount")
+async def recount_tenant_usage(tenant_id: str):
+    """Recount a tenant's usage from disk, e.g. after files were changed outside the API."""
+    _check_tenant_id(tenant_id)
+    return await run_file_io(recount_usage, tenant_id, timeout=NO_TIMEOUT, name="usage count")
@@ -0,0 +1,69 @@
+"""
+Workspace checkpoint routes for the Claude Text Editor API.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from src.api.dependencies import get_session_id
+from src.api.models import (
+    CheckpointDiff,
+    CheckpointInfo,
+    CheckpointRequest,
+    CheckpointRestoreResponse
+)
+from src.services.checkpoints import (
+    CheckpointNotFoundError,
+    create_checkpoint,
+    diff_checkpoint,
+    diff_checkpoint_file,
+    list_checkpoints,
+    restore_checkpoint
+)
+from src.services.file_io import NO_TIMEOUT, run_file_io
+
+router = APIRouter(prefix="/api/checkpoints", tags=["checkpoints"])
+
+# ----------------------------------------------------------------------
+# --- Checkpoint Routes
+# ----------------------------------------------------------------------
+
+@router.get("", response_model=List[CheckpointInfo])
+async def get_checkpoints():
+    """List the retained workspace checkpoints, newest first."""
+    return await run_file_io(list_checkpoints, name="listing")
+
+
+@router.post("", response_model=CheckpointInfo, status_code=status.HTTP_201_CREATED)
+async def take_checkpoint(request: CheckpointRequest, session_id: str = Depends(get_session_id)):
+    """Checkpoint the workspace now (one is also taken at the start of every chat turn)."""
+    return await run_file_io(create_checkpoint, request.label, session_id, timeout=NO_TIMEOUT, name="checkpoint")
+
+
+@router.get("/{checkpoint_id}/diff", response_model=CheckpointDiff)
+async def get_checkpoint_diff(checkpoint_id: str, path: Optional[str] = None):
+    """
+    List the files changed since a checkpoint. With `path`, also return a
+    unified diff of that file from the checkpoint to the current workspace.
+    """
+    try:
+        changes = await run_file_io(diff_checkpoint, checkpoint_id, name="diff")
+        diff = await run_file_io(diff_checkpoint_file, checkpoint_id, path, name="diff") if path else None
+    except CheckpointNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return CheckpointDiff(checkpoint_id=checkpoint_id, diff=diff, **changes)
+
+
+@router.post("/{checkpoint_id}/restore", response_model=CheckpointRestoreResponse)
+async def restore_workspace(checkpoint_id: str):
+    """
+    Put the whole workspace back to a checkpoint. The current state is
+    checkpointed first, so a restore can be undone by restoring that one.
+    """
+    try:
+        return await run_file_io(restore_checkpoint, checkpoint_id, timeout=NO_TIMEOUT, name="restore")
+    except CheckpointNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -2,21 +2,40 @@
 FastAPI dependencies for the Claude Text Editor API.
 """
 
+import hmac
 from functools import lru_cache
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Request, status
 
 from src.chatbot import ClaudeTextEditorChatbot
-from src.config.settings import ANTHROPIC_API_KEY
+from src.config.settings import (
+    ADMIN_TOKEN,
+    ANTHROPIC_API_KEY,
+    CONVERSATION_CACHE_SIZE,
+    DEFAULT_SESSION_ID,
+    DEFAULT_TENANT_ID
+)
+from src.utils.workspace import get_tenant
 
 # ----------------------------------------------------------------------
 # --- Chatbot Dependencies
 # ----------------------------------------------------------------------
 
-@lru_cache()
-def get_chatbot():
+def get_chatbot(x_session_id: Optional[str] = Header(None)):
+    """
+    Get the ClaudeTextEditorChatbot for the session named by the X-Session-ID
+    header, falling back to the default session.
+    """
+    return get_session_chatbot(get_session_id(x_session_id))
+
+
+@lru_cache(maxsize=CONVERSATION_CACHE_SIZE)
+def get_session_chatbot(session_id: str):
     """
-    Create and cache a ClaudeTextEditorChatbot instance.
-    This function is cached to avoid creating a new instance for each request.
+    Create and cache a ClaudeTextEditorChatbot instance per session.
+    This function is cached to avoid creating a new instance for each request;
+    the session's history itself lives in the conversation store.
     """
     if not ANTHROPIC_API_KEY:
         raise HTTPException(
@@ -25,9 +44,52 @@ def get_chatbot():
         )
     
     try:
-        return ClaudeTextEditorChatbot()
+        return ClaudeTextEditorChatbot(session_id)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to initialize chatbot: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+def get_session_id(x_session_id: Optional[str] = Header(None)) -> str:
+    """
+    Get the session named by the X-Session-ID header, falling back to the
+    default session. Sessions of other tenants are prefixed with the tenant
+    id so tenants never share conversation history.
+    """
+    session_id = x_session_id or DEFAULT_SESSION_ID
+    tenant_id = get_tenant()
+    return session_id if tenant_id == DEFAULT_TENANT_ID else f"{tenant_id}:{session_id}"
+
+
+def get_job_queue(request: Request):
+    """Get the chat job queue started in the application's lifespan."""
+    return request.app.state.chat_jobs
+
+# ----------------------------------------------------------------------
+# --- Admin Dependencies
+# ----------------------------------------------------------------------
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a token against ADMIN_TOKEN; nothing matches when ADMIN_TOKEN is not configured."""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Check the X-Admin-Token header against ADMIN_TOKEN.
+    Admin endpoints are closed when ADMIN_TOKEN is not configured.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled: ADMIN_TOKEN is not set"
+        )
+
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or missing admin token"
+        )
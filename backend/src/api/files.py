@@ -0,0 +1,100 @@
+"""
+Raw file routes for the Claude Text Editor API.
+"""
+
+import mimetypes
+import os
+import stat
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from fastapi.responses import FileResponse
+
+from src.services.file_io import run_file_io
+from src.utils.file_utils import validate_path
+from src.utils.file_versions import file_version
+
+router = APIRouter(prefix="/api/files", tags=["files"])
+
+# ----------------------------------------------------------------------
+# --- ETag Helpers
+# ----------------------------------------------------------------------
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """
+    Build a strong ETag from a file's version token, so it matches the
+    version returned by the view command.
+    """
+    return f'"{file_version(stat_result)}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison, RFC 9110).
+
+    Args:
+        if_none_match: The header value, a list of ETags or "*"
+        etag: The file's current ETag
+
+    Returns:
+        True if the client already has the current version
+    """
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+# ----------------------------------------------------------------------
+# --- Raw File Routes
+# ----------------------------------------------------------------------
+
+def stat_workspace_file(path: str) -> Tuple[str, os.stat_result]:
+    """
+    Validate a workspace path and stat the regular file it names (blocking;
+    run on the file I/O pool).
+
+    Returns:
+        The absolute path and its stat result
+
+    Raises:
+        HTTPException: 400 for an invalid path, 404 if it is not a file
+    """
+    is_valid, abs_path, error = validate_path(path)
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error or "Invalid path"
+        )
+
+    try:
+        stat_result = os.stat(abs_path)
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"File not found: {path}"
+        )
+    return abs_path, stat_result
+
+
+@router.get("/raw/{path:path}")
+async def get_raw_file(path: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Download a workspace file's bytes.
+    Supports conditional requests (If-None-Match -> 304) and Range requests.
+    """
+    abs_path, stat_result = await run_file_io(stat_workspace_file, path, name="stat")
+
+    etag = make_etag(stat_result)
+    headers = {"etag": etag, "cache-control": "no-cache"}
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = mimetypes.guess_type(abs_path)[0] or "text/plain"
+    if media_type.startswith("text/"):
+        media_type += "; charset=utf-8"
+
+    # FileResponse streams the file with sendfile when the server supports it
+    # and answers Range / If-Range requests itself.
+    return FileResponse(abs_path, media_type=media_type, headers=headers, stat_result=stat_result)
@@ -0,0 +1,71 @@
+"""
+Chat job routes for the Claude Text Editor API.
+"""
+
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from src.api.dependencies import get_job_queue, get_session_id
+from src.api.models import ChatJobResponse, UserMessage
+from src.services.job_queue import FINISHED_STATES, ChatJobQueue, QueueFullError
+
+router = APIRouter(prefix="/api/chat/jobs", tags=["chat"])
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_KEEPALIVE_SECONDS = 15
+
+# ----------------------------------------------------------------------
+# --- Job Routes
+# ----------------------------------------------------------------------
+
+@router.post("", response_model=ChatJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_chat_job(
+    message: UserMessage,
+    session_id: str = Depends(get_session_id),
+    queue: ChatJobQueue = Depends(get_job_queue)
+):
+    """Queue a message for Claude and return the job immediately."""
+    try:
+        job = queue.submit(session_id, message.content)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+    return ChatJobResponse(**job.to_dict())
+
+
+@router.get("/{job_id}", response_model=ChatJobResponse)
+async def get_chat_job(job_id: str, queue: ChatJobQueue = Depends(get_job_queue)):
+    """Get the status of a chat job, including the response once it has completed."""
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat job not found: {job_id}"
+        )
+    return ChatJobResponse(**job.to_dict())
+
+
+@router.get("/{job_id}/events")
+async def stream_chat_job(job_id: str, queue: ChatJobQueue = Depends(get_job_queue)):
+    """Stream a chat job's status changes as server-sent events until it finishes."""
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat job not found: {job_id}"
+        )
+
+    async def events():
+        while True:
+            yield f"event: {job.status}\ndata: {json.dumps(job.to_dict())}\n\n"
+            if job.status in FINISHED_STATES:
+                return
+            while not await job.wait_for_update(EVENT_KEEPALIVE_SECONDS):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,186 @@
+"""
+ASGI middleware for the Claude Text Editor API.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+
+from src.api.dependencies import is_admin_token
+from src.config.settings import (
+    DEFAULT_SESSION_ID,
+    PROFILE_HEADER,
+    PROFILED_PATHS,
+    REQUEST_ID_HEADER,
+    TENANT_HEADER,
+    WORKSPACE_PER_SESSION
+)
+from src.utils.logging_config import bind_log_context, reset_log_context
+from src.utils.profiler import (
+    finish_request_profile,
+    is_profiling_enabled,
+    profile_coroutine,
+    start_request_profile
+)
+from src.utils.workspace import is_valid_tenant_id, reset_tenant, set_tenant
+
+# ----------------------------------------------------------------------
+# --- Profiling Middleware
+# ----------------------------------------------------------------------
+
+_PROFILE_HEADER_BYTES = PROFILE_HEADER.encode("latin-1")
+_ADMIN_TOKEN_HEADER_BYTES = b"x-admin-token"
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests to PROFILED_PATHS when the admin toggle is on or the
+    request sends the profile header with a valid admin token. Other requests
+    pass straight through. The profile covers the request's steps on the
+    event loop and its work on the file I/O pool (see src.utils.profiler).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in PROFILED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        if not (is_profiling_enabled() or self._header_requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        # Set in this task's context, so the request's pool operations see it
+        profile = start_request_profile(scope["path"])
+        try:
+            await profile_coroutine(self.app(scope, receive, send), profile)
+        finally:
+            await asyncio.get_running_loop().run_in_executor(None, finish_request_profile, profile)
+
+    @staticmethod
+    def _header_requested(scope) -> bool:
+        """Check whether the request asked to be profiled and is allowed to (profiles cost every request time)."""
+        headers = dict(scope["headers"])
+        if headers.get(_PROFILE_HEADER_BYTES, b"").strip().lower() not in (b"1", b"true", b"yes"):
+            return False
+        return is_admin_token(headers.get(_ADMIN_TOKEN_HEADER_BYTES, b"").decode("latin-1"))
+
+# ----------------------------------------------------------------------
+# --- Request Context Middleware
+# ----------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+_REQUEST_ID_HEADER_BYTES = REQUEST_ID_HEADER.encode("latin-1")
+_SESSION_HEADER_BYTES = b"x-session-id"
+# Caller-supplied request ids are logged as-is, so only simple ones are accepted
+_REQUEST_ID = re.compile(rb"^[A-Za-z0-9._-]{1,128}$")
+
+
+class RequestContextMiddleware:
+    """
+    Give each request an id (the caller's request id header, or a new one),
+    returned in the same header. The request and session ids are added to
+    every log record of the request, and one record is logged when the
+    request finishes, with its status, response bytes and duration.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        request_id = headers.get(_REQUEST_ID_HEADER_BYTES, b"")
+        if not _REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex.encode("latin-1")
+        session_id = headers.get(_SESSION_HEADER_BYTES, b"").decode("latin-1") or DEFAULT_SESSION_ID
+        token = bind_log_context(request_id=request_id.decode("latin-1"), session_id=session_id)
+
+        started = time.perf_counter()
+        response = {"status": 500, "bytes": 0}
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(_REQUEST_ID_HEADER_BYTES, request_id)]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            logger.info("request finished", extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": response["status"],
+                "bytes_sent": response["bytes"],
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3)
+            })
+            reset_log_context(token)
+
+# ----------------------------------------------------------------------
+# --- Tenant Middleware
+# ----------------------------------------------------------------------
+
+_TENANT_HEADER_BYTES = TENANT_HEADER.encode("latin-1")
+
+
+class TenantMiddleware:
+    """
+    Select the workspace for a request: the tenant named by the tenant header,
+    or with WORKSPACE_PER_SESSION the session, or else the default workspace.
+    The tenant is kept in a context variable for the rest of the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tenant_id = self._tenant_for(scope)
+        if tenant_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not is_valid_tenant_id(tenant_id):
+            await self._reject(send, f"Invalid tenant id: {tenant_id!r}")
+            return
+
+        token = set_tenant(tenant_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_tenant(token)
+
+    @staticmethod
+    def _tenant_for(scope):
+        """Return the tenant named by the request's headers, if any."""
+        headers = dict(scope["headers"])
+        value = headers.get(_TENANT_HEADER_BYTES)
+        if value is None and WORKSPACE_PER_SESSION:
+            value = headers.get(_SESSION_HEADER_BYTES)
+        return value.decode("latin-1").strip() if value is not None else None
+
+    @staticmethod
+    async def _reject(send, detail: str) -> None:
+        """Answer 400 without calling the application."""
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -2,9 +2,27 @@
 Pydantic models for the Claude Text Editor API.
 """
 
-from typing import Dict, List, Any, Optional, Union
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
+# The command models live with the tool, which must not depend on the API
+# layer; they are re-exported here for the routes and API clients
+from src.tools.commands import (  # noqa: F401
+    ApplyPatchCommand,
+    CreateCommand,
+    EditorCommand,
+    EditorCommandBase,
+    InsertCommand,
+    OutlineCommand,
+    ReplaceAllCommand,
+    StrReplaceCommand,
+    UndoEditCommand,
+    ViewCommand,
+    ViewDiffCommand,
+    describe_validation_error,
+    parse_editor_command
+)
+
 # ----------------------------------------------------------------------
 # --- Chat Models
 # ----------------------------------------------------------------------
@@ -16,16 +34,36 @@ class UserMessage(BaseModel):
 class ChatResponse(BaseModel):
     """Model for chatbot responses."""
     response: str = Field(..., description="The chatbot's response")
+    chat_id: Optional[str] = Field(None, description="The turn's chat id, usable with /api/chat/{chat_id}/cancel")
+    cancelled: bool = Field(False, description="Whether the turn was cancelled before it finished")
+
+class ChatCancelResponse(BaseModel):
+    """Model for the response to a cancel request."""
+    chat_id: str = Field(..., description="The chat turn or job being cancelled")
+    status: str = Field(..., description="Always cancelling; the turn stops at its next safe point")
+
+class ChatJobResponse(BaseModel):
+    """Model for the state of a queued chat turn."""
+    job_id: str = Field(..., description="The job's id")
+    session_id: str = Field(..., description="The session the turn runs in")
+    status: str = Field(..., description="One of queued, running, completed, failed or cancelled")
+    response: Optional[str] = Field(None, description="The chatbot's response once completed")
+    error: Optional[str] = Field(None, description="The error message if the job failed")
+    created_at: float = Field(..., description="When the job was queued (Unix time)")
+    started_at: Optional[float] = Field(None, description="When a worker started the job (Unix time)")
+    finished_at: Optional[float] = Field(None, description="When the job finished (Unix time)")
 
 # ----------------------------------------------------------------------
 # --- File Operation Models
 # ----------------------------------------------------------------------
 
-class FileOperation(BaseModel):
-    """Model for file operations using the text editor tool."""
-    command: str = Field(..., description="The command to execute (view, str_replace, create, insert, undo_edit)")
-    path: str = Field(..., description="The path to the file or directory")
-    parameters: Dict[str, Any] = Field(default_factory=dict, description="Additional parameters for the command")
+# A file operation request is a text editor command:
+# {"command": "...", "path": "...", "parameters": {...}}
+FileOperation = EditorCommand
+
+class FileOperationBatch(BaseModel):
+    """Model for several file operations sent in one request."""
+    operations: List[FileOperation] = Field(..., description="The operations; those on the same path run in this order")
     
 class FileOperationResponse(BaseModel):
     """Model for file operation responses."""
@@ -33,6 +71,12 @@ class FileOperationResponse(BaseModel):
     message: str = Field(..., description="A message describing the result")
     error: bool = Field(False, description="Whether an error occurred")
     
+class FileOperationResult(FileOperationResponse):
+    """Model for one result line streamed back for a batch of file operations."""
+    index: int = Field(..., description="The position of the operation in the batch")
+    command: str = Field(..., description="The operation's command")
+    path: str = Field(..., description="The operation's path")
+    
 class ListFilesResponse(BaseModel):
     """Model for the response when listing files."""
     path: str = Field(..., description="The path that was listed")
@@ -40,23 +84,54 @@ class ListFilesResponse(BaseModel):
     directories: List[str] = Field(default_factory=list, description="List of directories in the path")
 
 # ----------------------------------------------------------------------
-# --- Text Editor Command Parameter Models
+# --- Workspace Archive Models
 # ----------------------------------------------------------------------
 
-class ViewParams(BaseModel):
-    """Parameters for the view command."""
-    view_range: Optional[List[int]] = Field(None, description="Range of lines to view [start, end]")
-    
-class StrReplaceParams(BaseModel):
-    """Parameters for the str_replace command."""
-    old_str: str = Field(..., description="Text to replace")
-    new_str: str = Field(..., description="New text to insert")
-    
-class CreateParams(BaseModel):
-    """Parameters for the create command."""
-    file_text: str = Field(..., description="Content for the new file")
-    
-class InsertParams(BaseModel):
-    """Parameters for the insert command."""
-    insert_line: int = Field(..., description="Line number after which to insert text")
-    new_str: str = Field(..., description="Text to insert") 
\ No newline at end of file
+class WorkspaceImportResponse(BaseModel):
+    """Model for the result of importing a tar archive into the workspace."""
+    files: int = Field(0, description="Files written")
+    directories: int = Field(0, description="Directory entries created")
+    bytes: int = Field(0, description="Bytes written")
+    skipped: List[str] = Field(default_factory=list, description="Members that were not imported, with the reason (first 100)")
+    skipped_count: int = Field(0, description="Total number of members that were not imported")
+
+# ----------------------------------------------------------------------
+# --- Checkpoint Models
+# ----------------------------------------------------------------------
+
+class CheckpointInfo(BaseModel):
+    """Model for a workspace checkpoint."""
+    id: str = Field(..., description="The checkpoint's id")
+    created_at: float = Field(..., description="When the checkpoint was taken (Unix time)")
+    label: str = Field("", description="What the checkpoint was taken for, e.g. the chat message starting a turn")
+    session_id: Optional[str] = Field(None, description="The session the checkpoint was taken for")
+    file_count: int = Field(..., description="Number of files in the checkpoint")
+    mode: str = Field(..., description="How files were cloned: reflink, hardlink and/or copy")
+    seconds: float = Field(..., description="How long taking the checkpoint took")
+
+class CheckpointRequest(BaseModel):
+    """Model for taking a checkpoint on demand."""
+    label: str = Field("", description="A short description of the checkpoint")
+
+class CheckpointDiff(BaseModel):
+    """Model for the workspace changes since a checkpoint."""
+    checkpoint_id: str = Field(..., description="The checkpoint compared against")
+    added: List[str] = Field(default_factory=list, description="Files created since the checkpoint")
+    removed: List[str] = Field(default_factory=list, description="Files deleted since the checkpoint")
+    modified: List[str] = Field(default_factory=list, description="Files changed since the checkpoint")
+    diff: Optional[str] = Field(None, description="Unified diff of the requested file, if a path was given")
+
+class CheckpointRestoreResponse(BaseModel):
+    """Model for the result of restoring a checkpoint."""
+    checkpoint_id: str = Field(..., description="The checkpoint that was restored")
+    restored: List[str] = Field(default_factory=list, description="Files put back to their checkpointed content")
+    deleted: List[str] = Field(default_factory=list, description="Files deleted because they did not exist at the checkpoint")
+    safety_checkpoint_id: str = Field(..., description="Checkpoint of the workspace taken just before restoring")
+
+# ----------------------------------------------------------------------
+# --- Admin Models
+# ----------------------------------------------------------------------
+
+class ProfilingToggle(BaseModel):
+    """Model for turning request profiling on or off."""
+    enabled: bool = Field(..., description="Whether to profile every chat and file operation request")
@@ -0,0 +1,32 @@
+"""
+Fast JSON serialization for large responses (such as big view results):
+orjson when it is installed, the standard library otherwise.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the json module
+    orjson = None
+
+
+def dumps_json(content: Any) -> bytes:
+    """Serialize a JSON value to UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    A JSONResponse rendered with dumps_json. Routes return it with plain dicts
+    so the response is serialized once, without a second pass through the
+    route's response_model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
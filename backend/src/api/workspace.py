@@ -0,0 +1,100 @@
+"""
+Workspace archive routes for the Claude Text Editor API.
+"""
+
+import asyncio
+import os
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+
+from src.api.models import WorkspaceImportResponse
+from src.services.file_io import NO_TIMEOUT, run_file_io
+from src.services.workspace_archive import (
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    check_compression,
+    import_archive,
+    iter_export
+)
+from src.utils.file_utils import validate_path
+from src.utils.quota import QuotaExceededError
+
+router = APIRouter(prefix="/api/workspace", tags=["workspace"])
+
+# ----------------------------------------------------------------------
+# --- Helpers
+# ----------------------------------------------------------------------
+
+def _resolve_directory(path: str) -> str:
+    """Validate a workspace directory path and return it as an absolute path."""
+    is_valid, abs_path, error = validate_path(path or ".")
+    if not is_valid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error or "Invalid path")
+    return abs_path
+
+
+def _check_compression(compression: str, allow_auto: bool = False) -> None:
+    try:
+        check_compression(compression, allow_auto)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+# ----------------------------------------------------------------------
+# --- Workspace Archive Routes
+# ----------------------------------------------------------------------
+
+@router.get("/export")
+async def export_workspace(path: str = "", compression: str = "none"):
+    """
+    Download the workspace (or one of its directories) as a tar archive,
+    optionally gzip or zstd compressed. Backups and checkpoints are left out.
+    The archive is built while it is sent, reading files straight from disk.
+    """
+    _check_compression(compression)
+    abs_path = _resolve_directory(path)
+    if not os.path.isdir(abs_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Directory not found: {path}")
+
+    name = (os.path.basename(os.path.normpath(path)) if path else "workspace") + FILE_EXTENSIONS[compression]
+    return StreamingResponse(
+        iter_export(abs_path, compression),
+        media_type=MEDIA_TYPES[compression],
+        headers={"content-disposition": f'attachment; filename="{name}"'}
+    )
+
+
+@router.post("/import", response_model=WorkspaceImportResponse)
+async def import_workspace(request: Request, path: str = "", compression: str = "auto", overwrite: bool = False):
+    """
+    Upload a tar archive (the raw request body, optionally gzip or zstd
+    compressed) and unpack it into the workspace, or into one of its
+    directories. Members are checked and written as the body streams in;
+    existing files are skipped unless overwrite is set.
+    """
+    _check_compression(compression, allow_auto=True)
+    abs_path = _resolve_directory(path)
+    if os.path.exists(abs_path) and not os.path.isdir(abs_path):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Not a directory: {path}")
+
+    # The archive is unpacked on the file I/O pool, which pulls the body
+    # from the event loop one piece at a time as it needs it
+    loop = asyncio.get_running_loop()
+    body = request.stream().__aiter__()
+
+    async def next_chunk() -> bytes:
+        try:
+            return await body.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+    def read_chunk() -> bytes:
+        return asyncio.run_coroutine_threadsafe(next_chunk(), loop).result()
+
+    try:
+        result = await run_file_io(import_archive, read_chunk, abs_path, compression, overwrite, timeout=NO_TIMEOUT, name="import")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    return WorkspaceImportResponse(**result)
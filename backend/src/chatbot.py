@@ -2,21 +2,61 @@
 Main ChatBot implementation with Claude text editor tool integration.
 """
 
-import json
+import asyncio
+import logging
 import os
+from functools import lru_cache
 from typing import Dict, List, Optional, Any, Union, Tuple
 
-import anthropic
-from anthropic import Anthropic
-
 from src.config.settings import (
     ANTHROPIC_API_KEY,
     MODEL_NAME,
     MAX_TOKENS,
-    TEXT_EDITOR_TOOL_DEFINITION
+    TEXT_EDITOR_TOOL_DEFINITION,
+    CONVERSATION_HISTORY_LIMIT,
+    DEFAULT_SESSION_ID,
+    CHECKPOINTS_ENABLED,
+    CONVERSATION_COMPRESS_COLD,
+    CHAT_MAX_TOOL_ROUNDS
+)
+from src.services.checkpoints import create_checkpoint
+from src.services.file_io import (
+    NO_TIMEOUT,
+    FileIOBusyError,
+    FileIOTimeoutError,
+    run_file_io
 )
+from src.services.model_scheduler import PRIORITY_INTERACTIVE, get_model_scheduler
+from src.storage.conversation_store import ConversationStore, get_conversation_store
+from src.storage.message_records import MessageRecord, to_api_messages
 from src.tools.text_editor import TextEditorTool
 
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------------------------------------
+# --- Client Factory ---------------------------------------------------
+# ----------------------------------------------------------------------
+
+
+@lru_cache()
+def get_anthropic_client():
+    """
+    Create and cache the Anthropic client shared by all chatbot sessions.
+    The SDK is imported here so it is only loaded when a chatbot is first needed.
+    Retries are left to the model call scheduler.
+    """
+    from anthropic import Anthropic
+
+    return Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+
+
+@lru_cache()
+def get_async_anthropic_client():
+    """Create and cache the async Anthropic client shared by all chatbot sessions."""
+    from anthropic import AsyncAnthropic
+
+    return AsyncAnthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+
 # ----------------------------------------------------------------------
 # --- Class Definition -------------------------------------------------
 # ----------------------------------------------------------------------
@@ -31,15 +71,47 @@ class ClaudeTextEditorChatbot:
     # --- Initialization -----------------------------------------------
     # ------------------------------------------------------------------
     
-    def __init__(self):
-        """Initialize the chatbot with Claude client and conversation history."""
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
-        self.conversation: List[Dict[str, Any]] = []
+    def __init__(self, session_id: str = DEFAULT_SESSION_ID, store: Optional[ConversationStore] = None):
+        """
+        Initialize the chatbot with Claude client and conversation history.
+        
+        Args:
+            session_id: The session whose history this chatbot reads and appends to
+            store: The conversation store to use (defaults to the configured store)
+        """
+        self.client = get_anthropic_client()
+        self.session_id = session_id
+        self.store = store or get_conversation_store()
+        self.conversation: List[MessageRecord] = []
         self.tools = [TEXT_EDITOR_TOOL_DEFINITION]
 
     # ------------------------------------------------------------------
     # --- Conversation Management Methods --------------------------------
     # ------------------------------------------------------------------
+
+    def _append_message(self, message: Dict[str, Any]) -> None:
+        """Append a message to the in-memory history and the conversation store as a compact record."""
+        record = MessageRecord.from_dict(message)
+        self.conversation.append(record)
+        self.store.append(self.session_id, record)
+
+    def load_history(self) -> None:
+        """
+        Load the tail of this session's history from the conversation store.
+        The history is trimmed to start at a plain user message so that
+        tool_use/tool_result pairs are never split.
+        """
+        history = self.store.load_tail(self.session_id, CONVERSATION_HISTORY_LIMIT)
+        start = 0
+        while start < len(history) and not history[start].is_user_text:
+            start += 1
+        self.conversation = history[start:]
+
+    def compress_history(self) -> None:
+        """Compress the large strings in this session's history once a turn is over."""
+        if CONVERSATION_COMPRESS_COLD:
+            for record in self.conversation:
+                record.compress()
         
     def add_user_message(self, message: str) -> None:
         """
@@ -48,7 +120,7 @@ class ClaudeTextEditorChatbot:
         Args:
             message: The user's message text
         """
-        self.conversation.append({
+        self._append_message({
             "role": "user",
             "content": message
         })
@@ -60,9 +132,13 @@ class ClaudeTextEditorChatbot:
         Args:
             content: The assistant's message content (list of content blocks)
         """
-        self.conversation.append({
+        # Store SDK content blocks as plain dicts so the history can be persisted
+        self._append_message({
             "role": "assistant",
-            "content": content
+            "content": [
+                block.model_dump(exclude_none=True) if hasattr(block, "model_dump") else block
+                for block in content
+            ]
         })
         
     def add_tool_result(self, tool_use_id: str, content: str, is_error: bool = False) -> None:
@@ -74,7 +150,7 @@ class ClaudeTextEditorChatbot:
             content: The result content
             is_error: Whether the tool execution resulted in an error
         """
-        self.conversation.append({
+        self._append_message({
             "role": "user",
             "content": [{
                 "type": "tool_result",
@@ -84,35 +160,81 @@ class ClaudeTextEditorChatbot:
             }]
         })
 
+    def add_tool_results(self, results: List[Dict[str, Any]]) -> None:
+        """
+        Add the results of all tool uses of an assistant message as one user message.
+        
+        Args:
+            results: Tool results with tool_use_id, content and is_error
+        """
+        self._append_message({
+            "role": "user",
+            "content": [{
+                "type": "tool_result",
+                "tool_use_id": result["tool_use_id"],
+                "content": result["content"],
+                "is_error": result.get("is_error", False)
+            } for result in results]
+        })
+
+    def rollback_conversation(self, length: int) -> None:
+        """
+        Drop the messages added after the history had `length` messages,
+        from memory and from the conversation store.
+        
+        Args:
+            length: The history's length to go back to
+        """
+        removed = len(self.conversation) - length
+        if removed > 0:
+            del self.conversation[length:]
+            self.store.remove_last(self.session_id, removed)
+
     def reset_conversation(self) -> None:
         """Reset the conversation history."""
         self.conversation = []
+        self.store.clear(self.session_id)
 
     def get_conversation_history(self) -> List[Dict[str, Any]]:
-        """Get the current conversation history."""
-        return self.conversation.copy()
+        """Get the current conversation history as API messages."""
+        return to_api_messages(self.conversation)
 
     # ------------------------------------------------------------------
     # --- Claude Interaction Methods -------------------------------------
     # ------------------------------------------------------------------
         
-    def get_assistant_response(self):
+    def _estimate_tokens(self) -> int:
+        """Roughly estimate the tokens the next request will use (about 4 characters per token)."""
+        return sum(record.char_count() for record in self.conversation) // 4 + MAX_TOKENS
+
+    def get_assistant_response(self, priority: int = PRIORITY_INTERACTIVE):
         """
         Get a response from Claude based on the current conversation.
+        The call goes through the model call scheduler, which queues it
+        within the rate limits and retries rate-limited or overloaded calls.
         
+        Args:
+            priority: The scheduling priority of the call (lower runs first)
+            
         Returns:
             The response from Claude
         """
         try:
-            response = self.client.messages.create(
-                model=MODEL_NAME,
-                messages=self.conversation,
-                tools=self.tools,
-                max_tokens=MAX_TOKENS
+            # Build the API payload from the compact history only for this request
+            messages = to_api_messages(self.conversation)
+            response = get_model_scheduler().call(
+                lambda: self.client.messages.with_raw_response.create(
+                    model=MODEL_NAME,
+                    messages=messages,
+                    tools=self.tools,
+                    max_tokens=MAX_TOKENS
+                ),
+                self._estimate_tokens(),
+                priority
             )
             return response
         except Exception as e:
-            print(f"Error getting response from Claude: {str(e)}")
+            logger.error("Error getting response from Claude: %s", e)
             # Create a minimal object to represent an error
             class ErrorResponse:
                 def __init__(self, error_message):
@@ -121,26 +243,32 @@ class ClaudeTextEditorChatbot:
             
             return ErrorResponse(str(e))
 
-    async def get_assistant_response_async(self):
+    async def get_assistant_response_async(self, priority: int = PRIORITY_INTERACTIVE):
         """
         Get a response from Claude asynchronously.
         
+        Args:
+            priority: The scheduling priority of the call (lower runs first)
+            
         Returns:
             The response from Claude
         """
         try:
-            from anthropic import AsyncAnthropic
-            
-            async_client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
-            response = await async_client.messages.create(
-                model=MODEL_NAME,
-                messages=self.conversation,
-                tools=self.tools,
-                max_tokens=MAX_TOKENS
+            async_client = get_async_anthropic_client()
+            messages = to_api_messages(self.conversation)
+            response = await get_model_scheduler().call_async(
+                lambda: async_client.messages.with_raw_response.create(
+                    model=MODEL_NAME,
+                    messages=messages,
+                    tools=self.tools,
+                    max_tokens=MAX_TOKENS
+                ),
+                self._estimate_tokens(),
+                priority
             )
             return response
         except Exception as e:
-            print(f"Error getting async response from Claude: {str(e)}")
+            logger.error("Error getting async response from Claude: %s", e)
             # Create a minimal object to represent an error
             class ErrorResponse:
                 def __init__(self, error_message):
@@ -169,7 +297,7 @@ class ClaudeTextEditorChatbot:
             tool_name = tool_use.get("name", "")
         
         if tool_name == "str_replace_editor":
-            return TextEditorTool.handle_tool_use(tool_use)
+            return TextEditorTool.handle_tool_use(tool_use, self.session_id)
         else:
             tool_id = getattr(tool_use, "id", None)
             if tool_id is None and isinstance(tool_use, dict):
@@ -182,103 +310,130 @@ class ClaudeTextEditorChatbot:
                 "is_error": True
             }
 
+    async def handle_tool_use_async(self, tool_use) -> Dict[str, Any]:
+        """
+        Handle a tool use request on the file I/O pool, keeping the event loop free.
+        A busy pool or a timeout becomes an error result Claude can react to.
+        
+        Args:
+            tool_use: The tool use request object
+            
+        Returns:
+            The tool result
+        """
+        try:
+            return await run_file_io(self.handle_tool_use, tool_use, name="tool use")
+        except (FileIOBusyError, FileIOTimeoutError) as e:
+            return self._error_result(tool_use, f"Error: {str(e)}")
+
     # ------------------------------------------------------------------
     # --- Response Processing Methods ------------------------------------
     # ------------------------------------------------------------------
             
-    def process_response(self, response):
+    def process_response(self, response, priority: int = PRIORITY_INTERACTIVE):
         """
-        Process a response from Claude, handling tool use if necessary.
+        Process a response from Claude, running the tool loop: while Claude asks
+        for tools, run every tool it asked for and send all the results back,
+        for at most CHAT_MAX_TOOL_ROUNDS rounds.
         
         Args:
             response: The response object from Claude
+            priority: The scheduling priority of follow-up model calls
             
         Returns:
             The final response after handling any tool use
         """
-        # Add the response to the conversation history - handle object attributes
-        content = getattr(response, "content", None)
-        if content is None and isinstance(response, dict):
-            content = response.get("content", [])
-            
-        self.add_assistant_message(content)
-        
-        # Check if Claude wants to use a tool
-        stop_reason = getattr(response, "stop_reason", None)
-        if stop_reason is None and isinstance(response, dict):
-            stop_reason = response.get("stop_reason", "")
+        rounds = 0
+        while True:
+            self.add_assistant_message(self._response_content(response))
+            tool_uses = self._requested_tool_uses(response)
+            if not tool_uses:
+                return response
+            if rounds >= CHAT_MAX_TOOL_ROUNDS:
+                self.add_tool_results([self._error_result(block, "Error: Tool call limit for this turn reached") for block in tool_uses])
+                return response
+            rounds += 1
             
-        if stop_reason == "tool_use":
-            for content_block in content:
-                # Handle both dict-like and object-like access for content blocks
-                block_type = None
-                if isinstance(content_block, dict):
-                    block_type = content_block.get("type", "")
-                else:
-                    block_type = getattr(content_block, "type", "")
-                    
-                if block_type == "tool_use":
-                    # Handle the tool use and get the result
-                    tool_result = self.handle_tool_use(content_block)
-                    
-                    # Add the tool result to the conversation
-                    self.add_tool_result(
-                        tool_result["tool_use_id"],
-                        tool_result["content"],
-                        tool_result.get("is_error", False)
-                    )
-                    
-                    # Get a new response from Claude with the tool result
-                    return self.get_assistant_response()
-                    
-        return response
+            # Handle every tool use and send the results back in one message
+            self.add_tool_results([self.handle_tool_use(block) for block in tool_uses])
+            response = self.get_assistant_response(priority)
 
-    async def process_response_async(self, response):
+    async def process_response_async(self, response, priority: int = PRIORITY_INTERACTIVE):
         """
-        Process a response from Claude asynchronously, handling tool use if necessary.
+        Process a response from Claude asynchronously, running the tool loop.
+        
+        The turn can be cancelled (its task cancelled) at any point. A pending
+        model call is abandoned at once. A running tool call is allowed to
+        finish, so a file is never left half-written; the tools after it are
+        skipped, and every tool use gets a result in the history.
         
         Args:
             response: The response object from Claude
+            priority: The scheduling priority of follow-up model calls
             
         Returns:
             The final response after handling any tool use
         """
-        # Add the response to the conversation history - handle object attributes
-        content = getattr(response, "content", None)
-        if content is None and isinstance(response, dict):
-            content = response.get("content", [])
+        rounds = 0
+        while True:
+            self.add_assistant_message(self._response_content(response))
+            tool_uses = self._requested_tool_uses(response)
+            if not tool_uses:
+                return response
+            if rounds >= CHAT_MAX_TOOL_ROUNDS:
+                self.add_tool_results([self._error_result(block, "Error: Tool call limit for this turn reached") for block in tool_uses])
+                return response
+            rounds += 1
             
-        self.add_assistant_message(content)
-        
-        # Check if Claude wants to use a tool
-        stop_reason = getattr(response, "stop_reason", None)
-        if stop_reason is None and isinstance(response, dict):
-            stop_reason = response.get("stop_reason", "")
+            results = []
+            cancelled = False
+            for block in tool_uses:
+                if cancelled:
+                    results.append(self._error_result(block, "Error: Cancelled before this tool ran"))
+                    continue
+                tool_task = asyncio.ensure_future(self.handle_tool_use_async(block))
+                while True:
+                    try:
+                        result = await asyncio.shield(tool_task)
+                        break
+                    except asyncio.CancelledError:
+                        # Safe point: wait for the running tool call, then stop
+                        cancelled = True
+                        if tool_task.done():
+                            result = tool_task.result()
+                            break
+                results.append(result)
+            self.add_tool_results(results)
+            if cancelled:
+                raise asyncio.CancelledError()
             
-        if stop_reason == "tool_use":
-            for content_block in content:
-                # Handle both dict-like and object-like access for content blocks
-                block_type = None
-                if isinstance(content_block, dict):
-                    block_type = content_block.get("type", "")
-                else:
-                    block_type = getattr(content_block, "type", "")
-                    
-                if block_type == "tool_use":
-                    # Handle the tool use and get the result
-                    tool_result = self.handle_tool_use(content_block)
-                    
-                    # Add the tool result to the conversation
-                    self.add_tool_result(
-                        tool_result["tool_use_id"],
-                        tool_result["content"],
-                        tool_result.get("is_error", False)
-                    )
-                    
-                    # Get a new response from Claude with the tool result
-                    return await self.get_assistant_response_async()
-                    
-        return response
+            response = await self.get_assistant_response_async(priority)
+
+    @staticmethod
+    def _field(item, name: str, default=None):
+        """Read a field from an SDK object or a plain dict."""
+        if isinstance(item, dict):
+            return item.get(name, default)
+        return getattr(item, name, default)
+
+    def _response_content(self, response) -> List[Any]:
+        """Get a response's content blocks."""
+        return self._field(response, "content", None) or []
+
+    def _requested_tool_uses(self, response) -> List[Any]:
+        """Get the tool_use blocks of a response that stopped to use tools."""
+        if self._field(response, "stop_reason", "") != "tool_use":
+            return []
+        return [block for block in self._response_content(response) if self._field(block, "type", "") == "tool_use"]
+
+    def _error_result(self, tool_use, message: str) -> Dict[str, Any]:
+        """Build an error tool result for a tool use that was not run."""
+        return {
+            "type": "tool_result",
+            "tool_use_id": self._field(tool_use, "id", ""),
+            "content": message,
+            "is_error": True
+        }
 
     # ------------------------------------------------------------------
     # --- Utility Methods -----------------------------------------------
@@ -321,47 +476,86 @@ class ClaudeTextEditorChatbot:
     # ------------------------------------------------------------------
     # --- Main Chat Methods ---------------------------------------------
     # ------------------------------------------------------------------
+
+    def checkpoint_turn(self, message: str) -> Optional[str]:
+        """
+        Checkpoint the workspace before a turn so all of its edits can be rolled back together.
+        
+        Args:
+            message: The user's message starting the turn (used as the label)
+            
+        Returns:
+            The checkpoint id, or None if checkpoints are disabled or it failed
+        """
+        if not CHECKPOINTS_ENABLED:
+            return None
+        try:
+            return create_checkpoint(label=message, session_id=self.session_id)["id"]
+        except Exception as e:
+            logger.error("Error creating checkpoint: %s", e)
+            return None
         
-    def chat(self, message: str) -> str:
+    def chat(self, message: str, priority: int = PRIORITY_INTERACTIVE) -> str:
         """
         Send a message to the chatbot and get a response.
         
         Args:
             message: The user's message
+            priority: The scheduling priority of the turn's model calls
             
         Returns:
             The chatbot's response text
         """
-        # Add the user message to the conversation
+        # Pick up turns other workers may have added, then add the user message
+        self.load_history()
+        self.checkpoint_turn(message)
         self.add_user_message(message)
         
         # Get the initial response from Claude
-        response = self.get_assistant_response()
+        response = self.get_assistant_response(priority)
         
         # Process the response, handling any tool use
-        final_response = self.process_response(response)
+        final_response = self.process_response(response, priority)
+        self.compress_history()
         
         # Extract the text content from the response
         return self.extract_text_content(final_response)
 
-    async def chat_async(self, message: str) -> str:
+    async def chat_async(self, message: str, priority: int = PRIORITY_INTERACTIVE) -> str:
         """
         Send a message to the chatbot asynchronously and get a response.
         
+        A cancelled turn leaves no messages in the history, so the next turn
+        does not resume its half-finished tool loop. Its file edits stay (the
+        turn's checkpoint can roll them back).
+        
         Args:
             message: The user's message
+            priority: The scheduling priority of the turn's model calls
             
         Returns:
             The chatbot's response text
         """
-        # Add the user message to the conversation
-        self.add_user_message(message)
-        
-        # Get the initial response from Claude
-        response = await self.get_assistant_response_async()
-        
-        # Process the response, handling any tool use
-        final_response = await self.process_response_async(response)
+        # Pick up turns other workers may have added, then add the user message
+        self.load_history()
+        turn_start = len(self.conversation)
+        try:
+            try:
+                await run_file_io(self.checkpoint_turn, message, timeout=NO_TIMEOUT, name="checkpoint")
+            except FileIOBusyError as e:
+                logger.warning("Skipping checkpoint: %s", e)
+            self.add_user_message(message)
+            
+            # Get the initial response from Claude
+            response = await self.get_assistant_response_async(priority)
+            
+            # Process the response, handling any tool use (stops early if the turn is cancelled)
+            final_response = await self.process_response_async(response, priority)
+        except asyncio.CancelledError:
+            self.rollback_conversation(turn_start)
+            raise
+        finally:
+            self.compress_history()
         
         # Extract the text content from the response
         return self.extract_text_content(final_response)
@@ -376,7 +570,8 @@ class ClaudeTextEditorChatbot:
         Returns:
             A tuple of (response_text, tool_uses)
         """
-        # Add the user message to the conversation
+        # Pick up turns other workers may have added, then add the user message
+        self.load_history()
         self.add_user_message(message)
         
         # Save conversation length before chat to track new messages
@@ -393,10 +588,11 @@ class ClaudeTextEditorChatbot:
         
         # Extract tool uses from conversation history
         tool_uses = []
-        for message in self.conversation[prev_conversation_length:]:
+        for message in to_api_messages(self.conversation[prev_conversation_length:]):
             if message["role"] == "assistant":
                 for content_block in message["content"]:
                     if isinstance(content_block, dict) and content_block.get("type") == "tool_use":
                         tool_uses.append(content_block)
                         
+        self.compress_history()
         return response_text, tool_uses
@@ -3,14 +3,9 @@ Configuration settings for the Claude Text Editor Chatbot application.
 """
 
 import os
-from dotenv import load_dotenv
 
-# ----------------------------------------------------------------------
-# --- Environment Variable Loading
-# ----------------------------------------------------------------------
-
-# Load environment variables from .env file
-load_dotenv()
+# Environment variables from .env are loaded by the application entry point
+# (main.py) before this module is imported, so importing it has no side effects.
 
 # ----------------------------------------------------------------------
 # --- API Configuration
@@ -28,7 +23,205 @@ MAX_TOKENS = 4096
 # File system configuration
 WORKSPACE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "workspace"))
 BACKUP_DIR = os.path.join(WORKSPACE_DIR, ".backups")
-os.makedirs(BACKUP_DIR, exist_ok=True)
+CHECKPOINT_DIR = os.path.join(WORKSPACE_DIR, ".checkpoints")
+# One empty lock file per edited path, so edits of a file are serialized
+# across worker processes as well as threads
+FILE_LOCK_DIR = os.getenv("FILE_LOCK_DIR", os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "locks")))
+
+# ----------------------------------------------------------------------
+# --- Tenant Workspace Settings
+# ----------------------------------------------------------------------
+
+# Requests naming a tenant in TENANT_HEADER work in their own workspace under
+# TENANTS_DIR; requests without one use WORKSPACE_DIR (the "default" tenant)
+TENANTS_DIR = os.getenv("TENANTS_DIR", os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "tenants")))
+TENANT_HEADER = "x-tenant-id"
+DEFAULT_TENANT_ID = "default"
+# Give each session (X-Session-ID) its own workspace when no tenant is named
+WORKSPACE_PER_SESSION = os.getenv("WORKSPACE_PER_SESSION", "false").lower() == "true"
+# Per-workspace quotas (0 = unlimited). Bytes include backups; files do not.
+WORKSPACE_MAX_BYTES = int(os.getenv("WORKSPACE_MAX_BYTES", "0"))
+WORKSPACE_MAX_FILES = int(os.getenv("WORKSPACE_MAX_FILES", "0"))
+# Backups kept per file name; older ones are deleted and their bytes released from the quota (0 = keep all)
+BACKUP_MAX_PER_FILE = int(os.getenv("BACKUP_MAX_PER_FILE", "10"))
+# Where usage counters are kept: "sqlite" (shared across workers) or "memory"
+WORKSPACE_USAGE_STORE = os.getenv("WORKSPACE_USAGE_STORE", "sqlite")
+WORKSPACE_USAGE_DB_PATH = os.getenv("WORKSPACE_USAGE_DB_PATH", os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "workspace_usage.db")))
+
+# ----------------------------------------------------------------------
+# --- Write Durability Settings
+# ----------------------------------------------------------------------
+
+# How file writes are flushed to disk: "fsync" (every write), "group"
+# (fsync batched across concurrent writes) or "none" (atomic but not synced)
+WRITE_DURABILITY = os.getenv("WRITE_DURABILITY", "fsync")
+# How long a group commit waits for other writers to join the batch
+WRITE_GROUP_COMMIT_WINDOW_MS = float(os.getenv("WRITE_GROUP_COMMIT_WINDOW_MS", "2"))
+
+# ----------------------------------------------------------------------
+# --- File I/O Pool Settings
+# ----------------------------------------------------------------------
+
+# Threads that run blocking file operations for async endpoints (per worker
+# process), kept apart from the default executor used for model calls
+FILE_IO_WORKERS = int(os.getenv("FILE_IO_WORKERS", "8"))
+# Operations waiting beyond this are rejected with 503
+FILE_IO_MAX_PENDING = int(os.getenv("FILE_IO_MAX_PENDING", "256"))
+# How long a request waits for its file operation before getting 504
+FILE_IO_TIMEOUT_SECONDS = float(os.getenv("FILE_IO_TIMEOUT_SECONDS", "30"))
+# Maximum number of operations in one POST /api/file/operations request
+FILE_BATCH_MAX_OPERATIONS = int(os.getenv("FILE_BATCH_MAX_OPERATIONS", "500"))
+
+# ----------------------------------------------------------------------
+# --- View Output Settings
+# ----------------------------------------------------------------------
+
+# Maximum bytes of file or directory listing returned by one 'view' (about 4 bytes per token)
+VIEW_MAX_BYTES = int(os.getenv("VIEW_MAX_BYTES", "65536"))
+# Lines of context shown around an edit in str_replace/insert results (0 disables the snippet)
+EDIT_SNIPPET_CONTEXT_LINES = int(os.getenv("EDIT_SNIPPET_CONTEXT_LINES", "4"))
+
+# ----------------------------------------------------------------------
+# --- View Diff Settings
+# ----------------------------------------------------------------------
+
+# Bytes (compressed) of file contents remembered per worker as last seen by each session, for view_diff
+VIEW_DIFF_SNAPSHOT_BYTES = int(os.getenv("VIEW_DIFF_SNAPSHOT_BYTES", str(32 * 1024 * 1024)))
+# Larger files are not remembered, so view_diff shows them in full
+VIEW_DIFF_MAX_FILE_BYTES = int(os.getenv("VIEW_DIFF_MAX_FILE_BYTES", str(4 * 1024 * 1024)))
+# Unchanged lines shown around each change in a view_diff result
+VIEW_DIFF_CONTEXT_LINES = int(os.getenv("VIEW_DIFF_CONTEXT_LINES", "3"))
+
+# ----------------------------------------------------------------------
+# --- Checkpoint Settings
+# ----------------------------------------------------------------------
+
+# Take a workspace checkpoint at the start of every chat turn
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "true").lower() == "true"
+# How checkpoint files share data with the workspace: "auto" (reflink, then
+# hardlink, then copy), "reflink", "hardlink" or "copy"
+CHECKPOINT_MODE = os.getenv("CHECKPOINT_MODE", "auto")
+# Oldest checkpoints beyond this are deleted
+CHECKPOINT_MAX_COUNT = int(os.getenv("CHECKPOINT_MAX_COUNT", "20"))
+# Oldest checkpoints are also deleted while the data only checkpoints still
+# hold (files changed or deleted in the workspace since) exceeds this; 0 = unlimited
+CHECKPOINT_MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# ----------------------------------------------------------------------
+# --- Outline Settings
+# ----------------------------------------------------------------------
+
+# Number of file outlines kept in memory per worker
+OUTLINE_CACHE_SIZE = int(os.getenv("OUTLINE_CACHE_SIZE", "256"))
+
+# ----------------------------------------------------------------------
+# --- Content Cache Settings
+# ----------------------------------------------------------------------
+
+# Bytes of file content kept in memory per worker for view and str_replace (0 disables the cache)
+CONTENT_CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Files larger than this are always read from disk
+CONTENT_CACHE_MAX_FILE_BYTES = int(os.getenv("CONTENT_CACHE_MAX_FILE_BYTES", str(4 * 1024 * 1024)))
+
+# ----------------------------------------------------------------------
+# --- Patch Settings
+# ----------------------------------------------------------------------
+
+# Threads used to validate, back up and write the files of one apply_patch or replace_all call
+PATCH_MAX_WORKERS = int(os.getenv("PATCH_MAX_WORKERS", "8"))
+
+# ----------------------------------------------------------------------
+# --- Replace All Settings
+# ----------------------------------------------------------------------
+
+# Processes used to search files for replace_all (0 searches in the request's own thread)
+REPLACE_ALL_WORKERS = int(os.getenv("REPLACE_ALL_WORKERS", str(os.cpu_count() or 1)))
+# Larger files are skipped by replace_all
+REPLACE_ALL_MAX_FILE_BYTES = int(os.getenv("REPLACE_ALL_MAX_FILE_BYTES", str(8 * 1024 * 1024)))
+
+# ----------------------------------------------------------------------
+# --- Workspace Archive Settings
+# ----------------------------------------------------------------------
+
+# Size of the pieces workspace tar archives are read, written and streamed in
+WORKSPACE_ARCHIVE_CHUNK_BYTES = int(os.getenv("WORKSPACE_ARCHIVE_CHUNK_BYTES", str(1024 * 1024)))
+# Compression levels for exported archives
+WORKSPACE_ARCHIVE_GZIP_LEVEL = int(os.getenv("WORKSPACE_ARCHIVE_GZIP_LEVEL", "6"))
+WORKSPACE_ARCHIVE_ZSTD_LEVEL = int(os.getenv("WORKSPACE_ARCHIVE_ZSTD_LEVEL", "3"))
+
+# ----------------------------------------------------------------------
+# --- Model Call Scheduling
+# ----------------------------------------------------------------------
+
+# Limits apply per worker process; divide the account's limits by SERVER_WORKERS
+MODEL_REQUESTS_PER_MINUTE = int(os.getenv("MODEL_REQUESTS_PER_MINUTE", "50"))
+MODEL_TOKENS_PER_MINUTE = int(os.getenv("MODEL_TOKENS_PER_MINUTE", "40000"))
+# Upper bound for the adaptive number of concurrent model calls
+MODEL_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "8"))
+MODEL_MAX_RETRIES = int(os.getenv("MODEL_MAX_RETRIES", "5"))
+MODEL_RETRY_BASE_DELAY = float(os.getenv("MODEL_RETRY_BASE_DELAY", "1.0"))
+MODEL_RETRY_MAX_DELAY = float(os.getenv("MODEL_RETRY_MAX_DELAY", "60.0"))
+
+# ----------------------------------------------------------------------
+# --- Conversation Storage Settings
+# ----------------------------------------------------------------------
+
+# Conversation store backend: "sqlite" (shared across workers) or "memory"
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "sqlite")
+CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH", os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "conversations.db")))
+# Number of most recent messages loaded and sent to Claude for each turn
+CONVERSATION_HISTORY_LIMIT = int(os.getenv("CONVERSATION_HISTORY_LIMIT", "200"))
+# Number of sessions whose recent history is cached in memory per worker
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "256"))
+# Strings in history at least this long are stored once per worker, however many messages hold them
+CONVERSATION_INTERN_MIN_CHARS = int(os.getenv("CONVERSATION_INTERN_MIN_CHARS", "1024"))
+# Compress interned strings between turns (they are decompressed when a request is sent)
+CONVERSATION_COMPRESS_COLD = os.getenv("CONVERSATION_COMPRESS_COLD", "true").lower() in ("1", "true", "yes")
+DEFAULT_SESSION_ID = "default"
+
+# ----------------------------------------------------------------------
+# --- Chat Turn Settings
+# ----------------------------------------------------------------------
+
+# Most rounds of tool calls Claude may make in one turn before the turn is ended
+CHAT_MAX_TOOL_ROUNDS = int(os.getenv("CHAT_MAX_TOOL_ROUNDS", "25"))
+# How often a running /api/chat request checks whether its client disconnected
+CHAT_DISCONNECT_POLL_SECONDS = float(os.getenv("CHAT_DISCONNECT_POLL_SECONDS", "0.5"))
+
+# ----------------------------------------------------------------------
+# --- Chat Job Queue Settings
+# ----------------------------------------------------------------------
+
+# Number of chat turns run concurrently by the job queue in each worker
+CHAT_JOB_WORKERS = int(os.getenv("CHAT_JOB_WORKERS", "4"))
+# Jobs waiting beyond this are rejected with 429
+CHAT_JOB_QUEUE_SIZE = int(os.getenv("CHAT_JOB_QUEUE_SIZE", "100"))
+# How long finished jobs can still be fetched
+CHAT_JOB_RETENTION_SECONDS = int(os.getenv("CHAT_JOB_RETENTION_SECONDS", "3600"))
+
+# ----------------------------------------------------------------------
+# --- Server Settings
+# ----------------------------------------------------------------------
+
+# Production server configuration (used by serve.py)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+
+# ----------------------------------------------------------------------
+# --- Logging Settings
+# ----------------------------------------------------------------------
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for one JSON object per line, or "text" for plain lines
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Records waiting for the log writer thread; more are dropped (and counted) rather than blocking requests
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of DEBUG records kept (per-tool-call events are high volume)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+# Header carrying a caller-supplied request id (a new one is generated otherwise)
+REQUEST_ID_HEADER = "x-request-id"
 
 # ----------------------------------------------------------------------
 # --- Security Settings
@@ -40,6 +233,20 @@ ALLOWED_EXTENSIONS = {
     ".html", ".css", ".js", ".ts", ".jsx", ".tsx"
 }
 
+# ----------------------------------------------------------------------
+# --- Admin & Profiling Settings
+# ----------------------------------------------------------------------
+
+# Shared secret for /api/admin endpoints (admin endpoints are open if unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Profile every request when enabled; otherwise only requests sending PROFILE_HEADER
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_HEADER = "x-profile"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "profiles")))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILED_PATHS = {"/api/chat", "/api/file/operation", "/api/file/operations"}
+
 # ----------------------------------------------------------------------
 # --- Tool Definitions
 # ----------------------------------------------------------------------
@@ -47,26 +254,26 @@ ALLOWED_EXTENSIONS = {
 # Tool definitions
 TEXT_EDITOR_TOOL_DEFINITION = {
     "name": "str_replace_editor",
-    "description": "A text editor tool that can view and modify text files. Use this tool to read files, make precise edits, create new files, or insert text at specific locations. This tool operates on files within the allowed workspace directory.",
+    "description": "A text editor tool that can view and modify text files. Use this tool to read files, make precise edits, create new files, or insert text at specific locations. This tool operates on files within the allowed workspace directory. The results of str_replace and insert include the edited region with line numbers and the file's new version, so there is no need to view the file again to check an edit. To see what changed in a file since you last viewed or edited it, use view_diff rather than viewing it again.",
     "input_schema": {
         "type": "object",
         "properties": {
             "command": {
                 "type": "string",
-                "enum": ["view", "str_replace", "create", "insert", "undo_edit"],
-                "description": "The command to execute: 'view' to read a file/directory, 'str_replace' to replace text, 'create' to make a new file, 'insert' to add text at a position, 'undo_edit' to revert changes."
+                "enum": ["view", "view_diff", "outline", "str_replace", "create", "insert", "undo_edit", "apply_patch", "replace_all"],
+                "description": "The command to execute: 'view' to read a file/directory, 'view_diff' to see only what changed in a file since you last viewed or edited it (as a unified diff), 'outline' to list a file's classes, functions and sections with their line ranges (then view just the range you need), 'str_replace' to replace text, 'create' to make a new file, 'insert' to add text at a position, 'undo_edit' to revert changes, 'apply_patch' to apply a unified diff touching one or more files, 'replace_all' to replace every occurrence of a string or regex in all files under a directory."
             },
             "path": {
                 "type": "string",
-                "description": "The path to the file or directory to operate on, relative to the workspace directory."
+                "description": "The path to the file or directory to operate on, relative to the workspace directory. For replace_all, the directory to search (\".\" for the whole workspace)."
             },
             "old_str": {
                 "type": "string",
-                "description": "The text to replace (for str_replace command). Must match exactly with whitespace and indentation."
+                "description": "The text to replace (for str_replace command). Must match exactly one place in the file; if there is no exact match, differences in line endings and indentation/whitespace are tolerated. For replace_all, the text (or regex) to replace everywhere it occurs."
             },
             "new_str": {
                 "type": "string",
-                "description": "The new text to insert (for str_replace and insert commands)."
+                "description": "The new text to insert (for str_replace, insert and replace_all commands). With regex, it may refer to groups as \\1 or \\g<name>."
             },
             "file_text": {
                 "type": "string",
@@ -80,6 +287,35 @@ TEXT_EDITOR_TOOL_DEFINITION = {
                 "type": "array",
                 "items": {"type": "integer"},
                 "description": "The range of lines to view [start, end] (for view command). Line numbers start at 1, and -1 for end means read to the end of the file."
+            },
+            "patch": {
+                "type": "string",
+                "description": "A unified diff (for apply_patch command), e.g. the output of 'git diff'. File paths are relative to the workspace directory; use /dev/null as the old or new path to create or delete a file. Every hunk is checked before any file is changed, and if one file fails, all files are left as they were. Set path to \".\" for this command."
+            },
+            "regex": {
+                "type": "boolean",
+                "description": "Treat old_str as a Python regular expression, in multi-line mode (for replace_all command)."
+            },
+            "glob": {
+                "type": "string",
+                "description": "Only change files whose workspace-relative path matches this pattern, e.g. \"*.py\" or \"src/*.ts\"; * also matches across directories (for replace_all command)."
+            },
+            "dry_run": {
+                "type": "boolean",
+                "description": "Only report the number of matches in each file, without changing anything (for replace_all command). Use it first to check the scope of a replacement."
+            },
+            "expected_version": {
+                "type": "string",
+                "description": "The version token from the first line of a view result, or from a previous edit's result (for str_replace and insert commands). The edit fails with a version conflict if the file has changed since; view it again and retry."
+            },
+            "expected_versions": {
+                "type": "object",
+                "additionalProperties": {"type": "string"},
+                "description": "Version tokens by file path, as for expected_version (for apply_patch command). The patch is not applied if any of those files has changed since."
+            },
+            "cursor": {
+                "type": "string",
+                "description": "A continuation cursor from a truncated view result (for view command). Pass it unchanged with the same path to get the next page."
             }
         },
         "required": ["command", "path"]
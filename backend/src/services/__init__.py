@@ -0,0 +1,3 @@
+"""
+Background services for the Claude Text Editor Chatbot.
+"""
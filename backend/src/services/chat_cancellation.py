@@ -0,0 +1,128 @@
+"""
+Cancellation of chat turns in progress, on client disconnect or on request.
+"""
+
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from src.config.settings import CHAT_DISCONNECT_POLL_SECONDS
+from src.utils import metrics
+from src.utils.workspace import get_tenant
+
+T = TypeVar("T")
+
+# Client-chosen chat ids are echoed in logs and URLs, so keep them simple
+CHAT_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+CANCEL_DISCONNECT = "disconnect"
+CANCEL_REQUEST = "request"
+
+
+class ChatCancelledError(Exception):
+    """Raised when a chat turn was cancelled before it finished."""
+
+    def __init__(self, chat_id: str, reason: str):
+        super().__init__(f"Chat turn {chat_id} was cancelled ({reason})")
+        self.chat_id = chat_id
+        self.reason = reason
+
+# ----------------------------------------------------------------------
+# --- Chat Registry
+# ----------------------------------------------------------------------
+
+
+class ChatRegistry:
+    """
+    The chat turns running in this worker, by chat id. Cancelling one cancels
+    its task: a pending model call is abandoned at once, while a running tool
+    call is allowed to finish so no file is left half-written.
+    """
+
+    def __init__(self):
+        # chat_id -> (tenant_id, task, cancel reason once cancelled)
+        self._running: Dict[str, Tuple[str, asyncio.Task, Optional[str]]] = {}
+
+    def is_running(self, chat_id: str) -> bool:
+        """Whether a turn with this chat id is running."""
+        return chat_id in self._running
+
+    def cancel(self, chat_id: str, reason: str = CANCEL_REQUEST, tenant_id: Optional[str] = None) -> bool:
+        """
+        Cancel a running chat turn of a tenant.
+
+        Args:
+            chat_id: The turn's chat id
+            reason: Why it is cancelled (CANCEL_DISCONNECT or CANCEL_REQUEST)
+            tenant_id: The tenant asking (defaults to the current tenant)
+
+        Returns:
+            True if a running turn of that tenant was found
+        """
+        entry = self._running.get(chat_id)
+        if entry is None or entry[0] != (tenant_id or get_tenant()):
+            return False
+        if entry[2] is None and not entry[1].done():
+            self._running[chat_id] = (entry[0], entry[1], reason)
+            entry[1].cancel()
+        return True
+
+    async def run(
+        self,
+        chat_id: str,
+        turn: Awaitable[T],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> T:
+        """
+        Run a chat turn so it can be cancelled by id or when the client goes away.
+
+        Args:
+            chat_id: The turn's chat id
+            turn: The coroutine running the turn
+            is_disconnected: Polled every CHAT_DISCONNECT_POLL_SECONDS; the turn
+                is cancelled once it returns True
+
+        Returns:
+            The turn's result
+
+        Raises:
+            ChatCancelledError: If the turn was cancelled
+            ValueError: If a turn with this chat id is already running
+        """
+        if chat_id in self._running:
+            turn.close()
+            raise ValueError(f"A chat turn with id {chat_id} is already running")
+        task = asyncio.ensure_future(turn)
+        tenant_id = get_tenant()
+        self._running[chat_id] = (tenant_id, task, None)
+        watcher = asyncio.ensure_future(self._watch(chat_id, tenant_id, is_disconnected)) if is_disconnected else None
+        try:
+            await asyncio.wait({task})
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            reason = self._running.pop(chat_id)[2]
+            if not task.done():
+                # The caller itself was cancelled (e.g. on shutdown)
+                task.cancel()
+
+        if task.cancelled():
+            reason = reason or CANCEL_REQUEST
+            metrics.increment("chat.cancelled")
+            metrics.increment(f"chat.cancelled.{reason}")
+            raise ChatCancelledError(chat_id, reason)
+        return task.result()
+
+    async def _watch(self, chat_id: str, tenant_id: str, is_disconnected: Callable[[], Awaitable[bool]]) -> None:
+        """Cancel a turn once its client has disconnected."""
+        while not await is_disconnected():
+            await asyncio.sleep(CHAT_DISCONNECT_POLL_SECONDS)
+        self.cancel(chat_id, CANCEL_DISCONNECT, tenant_id)
+
+
+_registry = ChatRegistry()
+
+
+def get_chat_registry() -> ChatRegistry:
+    """Return this worker's chat registry."""
+    return _registry
@@ -0,0 +1,419 @@
+"""
+Copy-on-write workspace checkpoints.
+
+A checkpoint is a directory in the current tenant's checkpoint directory
+holding a clone of every workspace file. Files are cloned with reflinks where the filesystem supports
+them, otherwise hardlinked, so taking a checkpoint costs one syscall per file
+rather than a copy of the bytes. Hardlinks are safe because every write made
+through file_utils replaces the file (atomic_write) instead of modifying it
+in place, leaving the checkpoint's link pointing at the old content. From
+then on that old content is held by checkpoints alone; checkpoints are not
+charged to the workspace quota, so that data is capped by
+CHECKPOINT_MAX_BYTES instead.
+"""
+
+import difflib
+import errno
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.settings import CHECKPOINT_MAX_BYTES, CHECKPOINT_MAX_COUNT, CHECKPOINT_MODE
+from src.utils.content_cache import invalidate_file
+from src.utils.file_versions import path_locks
+from src.utils.quota import quotas_enabled, recount_usage
+from src.utils.workspace import (
+    BACKUP_DIR_NAME,
+    CHECKPOINT_DIR_NAME,
+    get_checkpoint_dir,
+    get_workspace_dir,
+    is_within
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl request that clones a file's extents (Linux btrfs, XFS, bcachefs...)
+FICLONE = 0x40049409
+
+CHECKPOINT_MODES = ("auto", "reflink", "hardlink", "copy")
+EXCLUDED_DIRS = {CHECKPOINT_DIR_NAME, BACKUP_DIR_NAME}
+INFO_FILE = "checkpoint.json"
+MANIFEST_FILE = "files.json"
+FILES_DIR = "files"
+CHECKPOINT_ID = re.compile(r"^\d{8}-\d{6}-\d{6}-[0-9a-f]{4}$")
+
+# Serializes checkpoint creation, restore and pruning within this process
+_lock = threading.RLock()
+
+# relative path -> (mtime_ns, size); restores keep both, so equal stats mean unchanged
+FileStats = Dict[str, Tuple[int, int]]
+
+
+class CheckpointNotFoundError(Exception):
+    """Raised when a checkpoint id is unknown or malformed."""
+
+# ----------------------------------------------------------------------
+# --- File Cloning
+# ----------------------------------------------------------------------
+
+
+class _Cloner:
+    """Clones files with the cheapest method that works, remembering failures."""
+
+    def __init__(self, mode: str = CHECKPOINT_MODE):
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Unknown checkpoint mode: {mode}")
+        self.strict = mode != "auto"
+        self.methods = ["reflink", "hardlink", "copy"] if mode == "auto" else [mode]
+        self.used = set()
+
+    def clone(self, src: str, dst: str) -> None:
+        while True:
+            method = self.methods[0]
+            try:
+                if method == "reflink":
+                    _reflink(src, dst)
+                elif method == "hardlink":
+                    os.link(src, dst)
+                else:
+                    shutil.copy2(src, dst)
+                self.used.add(method)
+                return
+            except OSError as e:
+                # Cross-device links and filesystems without reflinks fall back
+                if self.strict or len(self.methods) == 1 or isinstance(e, FileNotFoundError):
+                    raise
+                self.methods.pop(0)
+
+
+def _reflink(src: str, dst: str) -> None:
+    """Clone src to a new file dst sharing its data blocks."""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform")
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        except OSError:
+            os.close(dst_fd)
+            os.unlink(dst)
+            raise
+        os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copystat(src, dst)
+
+# ----------------------------------------------------------------------
+# --- Workspace Scanning
+# ----------------------------------------------------------------------
+
+def _scan(root: str, skip_excluded: bool) -> FileStats:
+    """Stat every regular file under root (symlinks are not followed)."""
+    files: FileStats = {}
+    prefix = len(root) + 1
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not (skip_excluded and directory == root and entry.name in EXCLUDED_DIRS):
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    if entry.name.startswith(".") and entry.name.endswith(".tmp"):
+                        continue  # an atomic_write in progress
+                    stat_result = entry.stat(follow_symlinks=False)
+                    files[entry.path[prefix:]] = (stat_result.st_mtime_ns, stat_result.st_size)
+    return files
+
+
+def _compare(checkpoint: FileStats, current: FileStats) -> Dict[str, List[str]]:
+    """Classify paths as added, removed or modified since the checkpoint."""
+    return {
+        "added": sorted(path for path in current if path not in checkpoint),
+        "removed": sorted(path for path in checkpoint if path not in current),
+        "modified": sorted(
+            path for path, stats in current.items()
+            if path in checkpoint and tuple(checkpoint[path]) != stats
+        )
+    }
+
+# ----------------------------------------------------------------------
+# --- Checkpoint Storage
+# ----------------------------------------------------------------------
+
+def _checkpoint_path(checkpoint_id: str) -> str:
+    path = os.path.join(get_checkpoint_dir(), checkpoint_id)
+    if not CHECKPOINT_ID.match(checkpoint_id) or not os.path.isdir(path):
+        raise CheckpointNotFoundError(f"Checkpoint not found: {checkpoint_id}")
+    return path
+
+
+def _load_manifest(checkpoint_id: str) -> FileStats:
+    with open(os.path.join(_checkpoint_path(checkpoint_id), MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return {path: tuple(stats) for path, stats in json.load(f).items()}
+
+
+def list_checkpoints() -> List[Dict[str, Any]]:
+    """Return the retained checkpoints' info, newest first."""
+    checkpoint_dir = get_checkpoint_dir()
+    if not os.path.isdir(checkpoint_dir):
+        return []
+    checkpoints = []
+    for name in sorted(os.listdir(checkpoint_dir), reverse=True):
+        if not CHECKPOINT_ID.match(name):
+            continue
+        try:
+            with open(os.path.join(checkpoint_dir, name, INFO_FILE), "r", encoding="utf-8") as f:
+                checkpoints.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return checkpoints
+
+
+def _prune() -> None:
+    """
+    Delete the oldest checkpoints beyond CHECKPOINT_MAX_COUNT, then the oldest
+    ones whose data pushes the total held by checkpoints alone past
+    CHECKPOINT_MAX_BYTES. The newest checkpoint is always kept.
+    """
+    checkpoint_dir = get_checkpoint_dir()
+    names = sorted(name for name in os.listdir(checkpoint_dir) if CHECKPOINT_ID.match(name))
+    excess = max(0, len(names) - CHECKPOINT_MAX_COUNT)
+    for name in names[:excess]:
+        shutil.rmtree(os.path.join(checkpoint_dir, name), ignore_errors=True)
+    names = names[excess:]
+    if CHECKPOINT_MAX_BYTES <= 0 or len(names) <= 1:
+        return
+
+    current = _scan(get_workspace_dir(), skip_excluded=True)
+    seen: set = set()
+    held = 0
+    for keep, name in enumerate(reversed(names)):
+        held += _held_bytes(os.path.join(checkpoint_dir, name), current, seen)
+        if keep > 0 and held > CHECKPOINT_MAX_BYTES:
+            for old_name in names[:len(names) - keep]:
+                shutil.rmtree(os.path.join(checkpoint_dir, old_name), ignore_errors=True)
+            return
+
+
+def _held_bytes(checkpoint_path: str, current: FileStats, seen: set) -> int:
+    """
+    Count the bytes a checkpoint holds that the workspace no longer shares:
+    its files that were changed or deleted since, once per inode (a file can
+    be linked into several checkpoints).
+
+    Args:
+        checkpoint_path: The checkpoint's directory
+        current: The workspace's current file stats
+        seen: (device, inode) pairs already counted; updated in place
+    """
+    try:
+        with open(os.path.join(checkpoint_path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    held = 0
+    for path, stats in manifest.items():
+        if current.get(path) == tuple(stats):
+            continue  # unchanged, so still shared with the workspace file
+        try:
+            stat_result = os.stat(os.path.join(checkpoint_path, FILES_DIR, path))
+        except FileNotFoundError:
+            continue
+        key = (stat_result.st_dev, stat_result.st_ino)
+        if key not in seen:
+            seen.add(key)
+            held += stat_result.st_size
+    return held
+
+# ----------------------------------------------------------------------
+# --- Checkpoint Operations
+# ----------------------------------------------------------------------
+
+def create_checkpoint(label: str = "", session_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Checkpoint the current tenant's whole workspace.
+
+    Args:
+        label: A short description, e.g. the chat message that started the turn
+        session_id: The session the checkpoint was taken for, if any
+
+    Returns:
+        The checkpoint's info (id, created_at, label, session_id, file_count, mode)
+    """
+    with _lock:
+        info = _create(label, session_id)
+        _prune()
+        return info
+
+
+def _create(label: str, session_id: Optional[str]) -> Dict[str, Any]:
+    """Take a checkpoint without pruning old ones (callers hold _lock)."""
+    started = time.perf_counter()
+    root = get_workspace_dir()
+    checkpoint_dir = get_checkpoint_dir()
+    checkpoint_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:4]}"
+    temp_dir = os.path.join(checkpoint_dir, f".{checkpoint_id}.tmp")
+    files_dir = os.path.join(temp_dir, FILES_DIR)
+    os.makedirs(files_dir)
+
+    try:
+        files = _scan(root, skip_excluded=True)
+        cloner = _Cloner()
+        created_dirs = {files_dir}
+        for path in list(files):
+            dst = os.path.join(files_dir, path)
+            parent = os.path.dirname(dst)
+            if parent not in created_dirs:
+                os.makedirs(parent, exist_ok=True)
+                created_dirs.add(parent)
+            try:
+                cloner.clone(os.path.join(root, path), dst)
+            except FileNotFoundError:
+                del files[path]  # deleted since the scan
+
+        info = {
+            "id": checkpoint_id,
+            "created_at": time.time(),
+            "label": label[:200],
+            "session_id": session_id,
+            "file_count": len(files),
+            "mode": "+".join(sorted(cloner.used)) or "empty",
+            "seconds": round(time.perf_counter() - started, 4)
+        }
+        with open(os.path.join(temp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(files, f, separators=(",", ":"))
+        with open(os.path.join(temp_dir, INFO_FILE), "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        # The checkpoint only becomes visible once it is complete
+        os.rename(temp_dir, os.path.join(checkpoint_dir, checkpoint_id))
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    return info
+
+
+def diff_checkpoint(checkpoint_id: str) -> Dict[str, List[str]]:
+    """
+    List the workspace files added, removed or modified since a checkpoint.
+
+    Raises:
+        CheckpointNotFoundError: If the checkpoint does not exist
+    """
+    return _compare(_load_manifest(checkpoint_id), _scan(get_workspace_dir(), skip_excluded=True))
+
+
+def diff_checkpoint_file(checkpoint_id: str, path: str) -> str:
+    """
+    Build a unified diff of one file between a checkpoint and the workspace.
+
+    Args:
+        checkpoint_id: The checkpoint to compare against
+        path: The file's path relative to the workspace
+
+    Returns:
+        The diff text (empty if the file is unchanged)
+
+    Raises:
+        CheckpointNotFoundError: If the checkpoint does not exist
+    """
+    files_dir = os.path.join(_checkpoint_path(checkpoint_id), FILES_DIR)
+    old_path = os.path.normpath(os.path.join(files_dir, path))
+    root = get_workspace_dir()
+    new_path = os.path.normpath(os.path.join(root, path))
+    if not is_within(old_path, files_dir) or not is_within(new_path, root) or new_path == root:
+        raise ValueError(f"Path must be within the workspace directory: {path}")
+    old_lines = _read_lines(old_path)
+    new_lines = _read_lines(new_path)
+    return "".join(difflib.unified_diff(
+        old_lines, new_lines, fromfile=f"a/{path}", tofile=f"b/{path}"
+    ))
+
+
+def _read_lines(file_path: str) -> List[str]:
+    try:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            return f.readlines()
+    except FileNotFoundError:
+        return []
+
+
+def restore_checkpoint(checkpoint_id: str) -> Dict[str, Any]:
+    """
+    Put the workspace back to a checkpoint. Only files that changed since the
+    checkpoint are touched, under their edit locks, and the current state is
+    checkpointed first so the restore can itself be undone.
+
+    Returns:
+        A summary with the restored/deleted paths and the safety checkpoint's id
+
+    Raises:
+        CheckpointNotFoundError: If the checkpoint does not exist
+    """
+    with _lock:
+        files_dir = os.path.join(_checkpoint_path(checkpoint_id), FILES_DIR)
+        manifest = _load_manifest(checkpoint_id)
+        # Pruned only after the restore, which may need the oldest checkpoint
+        safety = _create(f"Before restoring {checkpoint_id}", None)
+        root = get_workspace_dir()
+        changes = _compare(manifest, _scan(root, skip_excluded=True))
+        while True:
+            touched = [os.path.normpath(os.path.join(root, path)) for group in changes.values() for path in group]
+            with path_locks(touched):
+                # An edit may have landed before the locks were taken; start
+                # over if it touched a path that is not locked
+                locked = changes
+                changes = _compare(manifest, _scan(root, skip_excluded=True))
+                if changes == locked:
+                    _restore_files(root, files_dir, changes)
+                    break
+
+        _prune()
+        if quotas_enabled():
+            # A restore changes many files at once; recount rather than charge each
+            recount_usage()
+        return {
+            "checkpoint_id": checkpoint_id,
+            "restored": changes["removed"] + changes["modified"],
+            "deleted": changes["added"],
+            "safety_checkpoint_id": safety["id"]
+        }
+
+
+def _restore_files(root: str, files_dir: str, changes: Dict[str, List[str]]) -> None:
+    """Delete the added files and put back the removed and modified ones (their locks are held)."""
+    for path in changes["added"]:
+        os.remove(os.path.join(root, path))
+        invalidate_file(os.path.join(root, path))
+        _remove_empty_parents(os.path.dirname(os.path.join(root, path)), root)
+
+    cloner = _Cloner()
+    for path in changes["removed"] + changes["modified"]:
+        target = os.path.join(root, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.{uuid.uuid4().hex[:8]}.tmp")
+        cloner.clone(os.path.join(files_dir, path), temp_path)
+        os.replace(temp_path, target)
+        invalidate_file(target)
+
+
+def _remove_empty_parents(directory: str, root: str) -> None:
+    """Remove directories left empty by a restore, up to the workspace root."""
+    while directory != root and is_within(directory, root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
@@ -0,0 +1,125 @@
+"""
+Batches of text editor operations: concurrent across paths, in order within a path.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from src.api.models import FileOperation
+from src.config.settings import DEFAULT_SESSION_ID, FILE_IO_WORKERS
+from src.services.file_io import FileIOBusyError, FileIOTimeoutError, run_file_io
+from src.tools.text_editor import TextEditorTool
+from src.utils import metrics
+from src.utils.workspace import get_workspace_dir
+
+# Commands that can touch any file; they run alone, after everything
+# submitted before them and before anything submitted after them
+EXCLUSIVE_COMMANDS = {"apply_patch", "replace_all"}
+
+# ----------------------------------------------------------------------
+# --- Scheduling
+# ----------------------------------------------------------------------
+
+def path_key(path: str) -> str:
+    """Normalize an operation's path so spellings of the same file share a queue."""
+    workspace_dir = get_workspace_dir()
+    return os.path.normpath(path if os.path.isabs(path) else os.path.join(workspace_dir, path))
+
+
+def plan_batch(operations: List[FileOperation]) -> List[List[List[Tuple[int, FileOperation]]]]:
+    """
+    Split a batch into stages that run one after another. A stage is a list of
+    per-path queues that run concurrently; each queue runs in submission order.
+
+    Returns:
+        stages -> queues -> (index, operation)
+    """
+    stages: List[List[List[Tuple[int, FileOperation]]]] = []
+    queues: "OrderedDict[str, List[Tuple[int, FileOperation]]]" = OrderedDict()
+    for index, operation in enumerate(operations):
+        if operation.command in EXCLUSIVE_COMMANDS:
+            if queues:
+                stages.append(list(queues.values()))
+                queues = OrderedDict()
+            stages.append([[(index, operation)]])
+        else:
+            queues.setdefault(path_key(operation.path), []).append((index, operation))
+    if queues:
+        stages.append(list(queues.values()))
+    return stages
+
+# ----------------------------------------------------------------------
+# --- Execution
+# ----------------------------------------------------------------------
+
+async def _run_operation(index: int, operation: FileOperation, session_id: str = DEFAULT_SESSION_ID) -> Dict[str, Any]:
+    """Run one operation on the file I/O pool and describe its result."""
+    try:
+        result = await run_file_io(TextEditorTool.run, operation, session_id, name=operation.command)
+        error = bool(result["is_error"])
+        message = result["content"]
+    except (FileIOBusyError, FileIOTimeoutError) as e:
+        error, message = True, f"Error: {str(e)}"
+    except Exception as e:
+        error, message = True, f"Error processing file operation: {str(e)}"
+    metrics.increment("file_batch.failed" if error else "file_batch.succeeded")
+    return {
+        "index": index,
+        "command": operation.command,
+        "path": operation.path,
+        "success": not error,
+        "message": message,
+        "error": error
+    }
+
+
+async def run_batch(
+    operations: List[FileOperation],
+    concurrency: int = FILE_IO_WORKERS,
+    session_id: str = DEFAULT_SESSION_ID
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run a batch of operations and yield each result as soon as it is ready.
+    Results carry their operation's index since they arrive in completion order.
+
+    Args:
+        operations: The operations, in submission order
+        concurrency: How many operations of the batch may be on the pool at
+            once, so one large batch cannot fill the pool's queue
+        session_id: The session running the batch (for view_diff)
+
+    Yields:
+        Result dicts shaped like FileOperationResult (index, command, path,
+        success, message and error)
+    """
+    results: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run_queue(queue: List[Tuple[int, FileOperation]]) -> None:
+        for index, operation in queue:
+            async with slots:
+                result = await _run_operation(index, operation, session_id)
+            await results.put(result)
+
+    async def run_stages() -> None:
+        try:
+            for stage in plan_batch(operations):
+                await asyncio.gather(*(run_queue(queue) for queue in stage))
+        finally:
+            await results.put(None)
+
+    metrics.increment("file_batch.requests")
+    runner = asyncio.create_task(run_stages())
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            yield result
+        await runner
+    finally:
+        # The client went away: do not start the operations still waiting
+        if not runner.done():
+            runner.cancel()
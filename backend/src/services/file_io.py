@@ -0,0 +1,129 @@
+"""
+Bounded thread pool for blocking file operations made by async endpoints.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from src.config.settings import (
+    FILE_IO_WORKERS,
+    FILE_IO_MAX_PENDING,
+    FILE_IO_TIMEOUT_SECONDS
+)
+from src.utils import metrics
+from src.utils.profiler import profiled_call
+
+T = TypeVar("T")
+
+# Passed as timeout to wait however long the operation takes
+NO_TIMEOUT = None
+
+
+class FileIOBusyError(Exception):
+    """Raised when too many file operations are already queued."""
+
+
+class FileIOTimeoutError(Exception):
+    """Raised when a file operation does not finish within its timeout."""
+
+# ----------------------------------------------------------------------
+# --- File I/O Pool
+# ----------------------------------------------------------------------
+
+
+class FileIOPool:
+    """
+    A fixed-size thread pool with a cap on queued operations. Each operation
+    runs in a copy of the caller's context (so the tenant carries over) and
+    records how long it queued and ran.
+    """
+
+    def __init__(self, workers: int = FILE_IO_WORKERS, max_pending: int = FILE_IO_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-io")
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the worker threads once queued operations have finished."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    async def run(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        timeout: Optional[float] = FILE_IO_TIMEOUT_SECONDS,
+        name: str = "operation"
+    ) -> T:
+        """
+        Run a blocking function on the pool.
+
+        Args:
+            fn: The function to call
+            *args: Its positional arguments
+            timeout: Seconds to wait for the result (NO_TIMEOUT waits indefinitely)
+            name: Label used in the timeout error message
+
+        Returns:
+            The function's return value
+
+        Raises:
+            FileIOBusyError: If FILE_IO_MAX_PENDING operations are already waiting or running
+            FileIOTimeoutError: If the operation does not finish in time
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                metrics.increment("file_io.rejected")
+                raise FileIOBusyError(f"File I/O pool is busy ({self._pending} operations pending)")
+            self._pending += 1
+            metrics.set_gauge("file_io.pending", self._pending)
+
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+
+        def call() -> T:
+            started = time.perf_counter()
+            metrics.observe("file_io.queue_seconds", started - submitted)
+            try:
+                return context.run(profiled_call, fn, *args)
+            finally:
+                metrics.observe("file_io.run_seconds", time.perf_counter() - started)
+                with self._lock:
+                    self._pending -= 1
+                    metrics.set_gauge("file_io.pending", self._pending)
+
+        future = asyncio.get_running_loop().run_in_executor(self._get_executor(), call)
+        try:
+            # shield: a timed-out operation keeps its thread until it finishes,
+            # and still releases its pending slot when it does
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            metrics.increment("file_io.timeouts")
+            raise FileIOTimeoutError(f"File {name} did not finish within {timeout} seconds")
+
+
+_file_io_pool = FileIOPool()
+
+
+def get_file_io_pool() -> FileIOPool:
+    """Return the process-wide file I/O pool."""
+    return _file_io_pool
+
+
+async def run_file_io(fn: Callable[..., T], *args: Any, timeout: Optional[float] = FILE_IO_TIMEOUT_SECONDS, name: str = "operation") -> T:
+    """Run a blocking file operation on the process-wide pool (see FileIOPool.run)."""
+    return await _file_io_pool.run(fn, *args, timeout=timeout, name=name)
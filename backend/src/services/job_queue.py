@@ -0,0 +1,258 @@
+"""
+Asynchronous chat job queue with a bounded worker pool.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from src.config.settings import (
+    CHAT_JOB_WORKERS,
+    CHAT_JOB_QUEUE_SIZE,
+    CHAT_JOB_RETENTION_SECONDS
+)
+from src.services.chat_cancellation import CANCEL_REQUEST, ChatCancelledError, get_chat_registry
+from src.services.model_scheduler import PRIORITY_BACKGROUND
+from src.services.session_locks import session_turn_lock
+from src.utils import metrics
+from src.utils.workspace import get_tenant, tenant_scope
+
+# ----------------------------------------------------------------------
+# --- Job Definition
+# ----------------------------------------------------------------------
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = {JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is full."""
+
+
+class ChatJob:
+    """A single chat turn waiting for, or being run by, the worker pool."""
+
+    def __init__(self, session_id: str, message: str, tenant_id: str):
+        self.job_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.tenant_id = tenant_id
+        self.message = message
+        self.status = JOB_QUEUED
+        self.response: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._updated = asyncio.Event()
+
+    def set_status(self, status: str) -> None:
+        """Move the job to a new status and wake anyone waiting for an update."""
+        self.status = status
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait_for_update(self, timeout: float) -> bool:
+        """
+        Wait until the job's status changes.
+
+        Args:
+            timeout: The maximum number of seconds to wait
+
+        Returns:
+            True if the status changed, False on timeout
+        """
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the job's public fields."""
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "response": self.response,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+# ----------------------------------------------------------------------
+# --- Job Queue
+# ----------------------------------------------------------------------
+
+
+class ChatJobQueue:
+    """
+    Runs chat turns on a fixed number of workers. Jobs for the same session
+    run one at a time in submission order; jobs for different sessions run
+    concurrently. Each session has its own FIFO, and only sessions with no
+    job running are handed to a worker, so a session's backlog never ties
+    up more than one worker.
+    """
+
+    def __init__(
+        self,
+        chatbot_factory: Callable[[str], Any],
+        workers: int = CHAT_JOB_WORKERS,
+        max_queue: int = CHAT_JOB_QUEUE_SIZE,
+        retention_seconds: int = CHAT_JOB_RETENTION_SECONDS
+    ):
+        self.chatbot_factory = chatbot_factory
+        self.workers = workers
+        self.retention_seconds = retention_seconds
+        self.max_queue = max_queue
+        # session_id -> its queued jobs; present while the session has a job queued or running
+        self._sessions: Dict[str, Deque[ChatJob]] = {}
+        # Sessions with queued jobs and none running, in the order they became ready
+        self._ready: "asyncio.Queue[str]" = asyncio.Queue()
+        self._queued = 0
+        self._jobs: "OrderedDict[str, ChatJob]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the worker tasks."""
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; running turns stop at their next safe point."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ------------------------------------------------------------------
+    # --- Job Submission and Lookup
+    # ------------------------------------------------------------------
+
+    def submit(self, session_id: str, message: str) -> ChatJob:
+        """
+        Queue a chat turn. It runs in the current tenant's workspace.
+
+        Args:
+            session_id: The session to run the turn in
+            message: The user's message
+
+        Returns:
+            The queued job
+
+        Raises:
+            QueueFullError: If the queue has no room for another job
+        """
+        self._purge_expired()
+        if self.max_queue > 0 and self._queued >= self.max_queue:
+            metrics.increment("chat_jobs.rejected")
+            raise QueueFullError(f"Chat job queue is full ({self.max_queue} jobs waiting)")
+
+        job = ChatJob(session_id, message, get_tenant())
+        pending = self._sessions.get(session_id)
+        if pending is None:
+            # The session is idle, so it is ready to run at once
+            self._sessions[session_id] = deque([job])
+            self._ready.put_nowait(session_id)
+        else:
+            # Dispatched once the session's running or earlier jobs are done
+            pending.append(job)
+        self._queued += 1
+
+        self._jobs[job.job_id] = job
+        metrics.increment("chat_jobs.submitted")
+        metrics.set_gauge("chat_jobs.queue_depth", self._queued)
+        return job
+
+    def get(self, job_id: str) -> Optional[ChatJob]:
+        """Return a job of the current tenant by id, or None if it is unknown, expired or another tenant's."""
+        job = self._jobs.get(job_id)
+        if job is None or job.tenant_id != get_tenant():
+            return None
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job of the current tenant. A queued job is dropped; a running
+        job stops at its next safe point.
+
+        Returns:
+            True if the job was found and had not finished yet
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.tenant_id != get_tenant() or job.status in FINISHED_STATES:
+            return False
+        if job.status == JOB_QUEUED:
+            job.error = f"Chat turn {job_id} was cancelled ({CANCEL_REQUEST})"
+            job.finished_at = time.time()
+            metrics.increment(f"chat_jobs.{JOB_CANCELLED}")
+            job.set_status(JOB_CANCELLED)
+            return True
+        return get_chat_registry().cancel(job_id)
+
+    def _purge_expired(self) -> None:
+        """Forget finished jobs older than the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            if job.created_at >= cutoff:
+                break
+            if job.status in FINISHED_STATES:
+                del self._jobs[job_id]
+
+    # ------------------------------------------------------------------
+    # --- Workers
+    # ------------------------------------------------------------------
+
+    async def _worker(self) -> None:
+        """Take the next ready session and run its oldest job."""
+        while True:
+            session_id = await self._ready.get()
+            pending = self._sessions[session_id]
+            job = pending.popleft()
+            self._queued -= 1
+            metrics.set_gauge("chat_jobs.queue_depth", self._queued)
+
+            try:
+                # Shared with /api/chat turns of the same session; no other
+                # job of the session can be waiting for it
+                async with session_turn_lock(session_id):
+                    if job.status != JOB_CANCELLED:
+                        await self._run(job)
+            finally:
+                if pending:
+                    # Back of the line, behind sessions that became ready meanwhile
+                    self._ready.put_nowait(session_id)
+                else:
+                    del self._sessions[session_id]
+
+    async def _run(self, job: ChatJob) -> None:
+        """Run a single job's chat turn; it can be cancelled by its job id."""
+        job.started_at = time.time()
+        metrics.observe("chat_jobs.wait_seconds", job.started_at - job.created_at)
+        job.set_status(JOB_RUNNING)
+
+        try:
+            chatbot = self.chatbot_factory(job.session_id)
+            # The turn's task copies the context, tenant included
+            with tenant_scope(job.tenant_id):
+                job.response = await get_chat_registry().run(
+                    job.job_id, chatbot.chat_async(job.message, PRIORITY_BACKGROUND)
+                )
+            status = JOB_COMPLETED
+        except ChatCancelledError as e:
+            job.error = str(e)
+            status = JOB_CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            status = JOB_FAILED
+
+        job.finished_at = time.time()
+        metrics.observe("chat_jobs.run_seconds", job.finished_at - job.started_at)
+        metrics.increment(f"chat_jobs.{status}")
+        job.set_status(status)
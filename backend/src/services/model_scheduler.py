@@ -0,0 +1,359 @@
+"""
+Central scheduler for model calls: rate limits, adaptive concurrency and retries.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Optional
+
+from src.config.settings import (
+    MODEL_REQUESTS_PER_MINUTE,
+    MODEL_TOKENS_PER_MINUTE,
+    MODEL_MAX_CONCURRENCY,
+    MODEL_MAX_RETRIES,
+    MODEL_RETRY_BASE_DELAY,
+    MODEL_RETRY_MAX_DELAY
+)
+from src.utils import metrics
+from src.utils.rate_limit import TokenBucket
+
+# ----------------------------------------------------------------------
+# --- Constants
+# ----------------------------------------------------------------------
+
+# Lower values are scheduled first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+RATE_LIMIT_STATUS = {429, 529}
+RETRYABLE_STATUS = {408, 409, 500, 502, 503, 504} | RATE_LIMIT_STATUS
+
+
+class _Waiter:
+    """A call waiting to be admitted by the scheduler."""
+
+    __slots__ = ("priority", "seq", "tokens", "wake", "admitted", "cancelled")
+
+    def __init__(self, priority: int, seq: int, tokens: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.wake = wake
+        self.admitted = False
+        self.cancelled = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+# ----------------------------------------------------------------------
+# --- Scheduler
+# ----------------------------------------------------------------------
+
+
+class ModelCallScheduler:
+    """
+    Admits model calls in priority order while staying within request and
+    token budgets and an adaptive (AIMD) concurrency limit. Rate-limited and
+    overloaded calls are retried with jittered backoff, honoring retry-after,
+    and pause every other call until the server is ready again.
+
+    Calls are passed as functions that return a raw SDK response
+    (`client.messages.with_raw_response.create(...)`) so rate-limit headers
+    can be read before the response is parsed.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = MODEL_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = MODEL_TOKENS_PER_MINUTE,
+        max_concurrency: int = MODEL_MAX_CONCURRENCY,
+        max_retries: int = MODEL_MAX_RETRIES,
+        base_delay: float = MODEL_RETRY_BASE_DELAY,
+        max_delay: float = MODEL_RETRY_MAX_DELAY
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._timer_due = float("inf")
+
+    # ------------------------------------------------------------------
+    # --- Public Call Methods
+    # ------------------------------------------------------------------
+
+    def call(self, create: Callable[[], Any], tokens: int, priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """
+        Run a model call from a worker thread, waiting for admission and retrying.
+
+        Args:
+            create: A function performing the call and returning a raw response
+            tokens: The estimated number of tokens the call will use
+            priority: The call's priority (lower runs first)
+
+        Returns:
+            The parsed response
+        """
+        seq = next(self._seq)
+        for attempt in range(self.max_retries + 1):
+            event = threading.Event()
+            self._enqueue(_Waiter(priority, seq, tokens, event.set))
+            started = time.monotonic()
+            event.wait()
+            metrics.observe("model.queue_wait_seconds", time.monotonic() - started)
+
+            try:
+                raw = create()
+                response = raw.parse() if hasattr(raw, "parse") else raw
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+            else:
+                return self._on_success(raw, response, tokens)
+            finally:
+                self._release()
+            time.sleep(delay)
+
+    async def call_async(
+        self,
+        create: Callable[[], Awaitable[Any]],
+        tokens: int,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Any:
+        """
+        Run a model call from the event loop, waiting for admission and retrying.
+
+        Args:
+            create: A coroutine function performing the call and returning a raw response
+            tokens: The estimated number of tokens the call will use
+            priority: The call's priority (lower runs first)
+
+        Returns:
+            The parsed response
+        """
+        loop = asyncio.get_running_loop()
+        seq = next(self._seq)
+        for attempt in range(self.max_retries + 1):
+            admitted = loop.create_future()
+
+            def wake(future=admitted):
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+            waiter = _Waiter(priority, seq, tokens, wake)
+            self._enqueue(waiter)
+            started = time.monotonic()
+            try:
+                await admitted
+            except asyncio.CancelledError:
+                self._cancel(waiter)
+                raise
+            metrics.observe("model.queue_wait_seconds", time.monotonic() - started)
+
+            try:
+                raw = await create()
+                # The async client's raw response parses its body asynchronously
+                response = await raw.parse() if hasattr(raw, "parse") else raw
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+            else:
+                return self._on_success(raw, response, tokens)
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    # ------------------------------------------------------------------
+    # --- Admission
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        """Add a waiter to the priority queue and admit whoever can run."""
+        with self._lock:
+            heapq.heappush(self._heap, waiter)
+            self._dispatch()
+
+    def _cancel(self, waiter: _Waiter) -> None:
+        """Withdraw a waiter, giving back its slot if it was already admitted."""
+        with self._lock:
+            if waiter.admitted:
+                self._in_flight -= 1
+                self._dispatch()
+            else:
+                waiter.cancelled = True
+
+    def _release(self) -> None:
+        """Free a concurrency slot after a call finishes."""
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit waiters from the head of the queue while budgets allow. Lock held."""
+        while self._heap:
+            head = self._heap[0]
+            if head.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            if self._in_flight >= max(1, int(self._limit)):
+                break
+
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self._requests.time_until(1),
+                self._tokens.time_until(head.tokens)
+            )
+            if wait > 0:
+                self._schedule_dispatch(wait)
+                break
+
+            heapq.heappop(self._heap)
+            self._requests.consume(1)
+            self._tokens.consume(min(head.tokens, self._tokens.capacity))
+            self._in_flight += 1
+            head.admitted = True
+            head.wake()
+
+        metrics.set_gauge("model.in_flight", self._in_flight)
+        metrics.set_gauge("model.queued", len(self._heap))
+
+    def _schedule_dispatch(self, wait: float) -> None:
+        """Run _dispatch again once the budget has refilled. Lock held."""
+        due = time.monotonic() + wait
+        if self._timer is not None and self._timer_due <= due:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(wait, self._on_timer)
+        self._timer.daemon = True
+        self._timer_due = due
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        """Timer callback that retries admission."""
+        with self._lock:
+            self._timer = None
+            self._timer_due = float("inf")
+            self._dispatch()
+
+    # ------------------------------------------------------------------
+    # --- Feedback from Responses
+    # ------------------------------------------------------------------
+
+    def _on_success(self, raw: Any, response: Any, tokens: int) -> Any:
+        """Adapt budgets and concurrency to a successful response (raw for its headers, parsed for its usage)."""
+        headers = getattr(raw, "headers", None) or {}
+        usage = getattr(response, "usage", None)
+
+        with self._lock:
+            requests_left = _header_float(headers, "anthropic-ratelimit-requests-remaining")
+            tokens_left = _header_float(headers, "anthropic-ratelimit-tokens-remaining")
+            if requests_left is not None:
+                self._requests.limit_to(requests_left)
+            if tokens_left is not None:
+                self._tokens.limit_to(tokens_left)
+            if usage is not None:
+                # Replace the estimate with the tokens actually used
+                used = (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0)
+                self._tokens.consume(used - min(tokens, self._tokens.capacity))
+
+            # Additive increase, unless the server reports the window is nearly used up
+            if requests_left is None or requests_left > self._in_flight:
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+            metrics.set_gauge("model.concurrency_limit", self._limit)
+
+        metrics.increment("model.calls")
+        return response
+
+    def _on_error(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Decide whether a failed call should be retried.
+
+        Returns:
+            The delay before retrying, or None if the error should be raised
+        """
+        from anthropic import APIConnectionError
+
+        status = getattr(error, "status_code", None)
+        if not (isinstance(error, APIConnectionError) or status in RETRYABLE_STATUS):
+            metrics.increment("model.errors")
+            return None
+        if attempt >= self.max_retries:
+            metrics.increment("model.retries_exhausted")
+            return None
+
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        delay = _retry_after(headers)
+        if delay is None:
+            # Full jitter spreads retries out instead of synchronizing them
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        else:
+            delay += random.uniform(0, self.base_delay)
+
+        if status in RATE_LIMIT_STATUS:
+            with self._lock:
+                # Multiplicative decrease, and hold back everyone else too
+                self._limit = max(1.0, self._limit / 2)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                metrics.set_gauge("model.concurrency_limit", self._limit)
+            metrics.increment("model.rate_limited")
+
+        metrics.increment("model.retries")
+        return delay
+
+# ----------------------------------------------------------------------
+# --- Header Helpers
+# ----------------------------------------------------------------------
+
+
+def _header_float(headers: Any, name: str) -> Optional[float]:
+    """Read a numeric header, returning None if it is missing or malformed."""
+    try:
+        value = headers.get(name)
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    """Read the server's requested retry delay in seconds, if any."""
+    retry_after_ms = _header_float(headers, "retry-after-ms")
+    if retry_after_ms is not None:
+        return max(0.0, retry_after_ms / 1000)
+
+    retry_after = _header_float(headers, "retry-after")
+    if retry_after is not None:
+        return max(0.0, retry_after)
+
+    try:
+        value = headers.get("retry-after")
+        if value:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+# ----------------------------------------------------------------------
+# --- Scheduler Factory
+# ----------------------------------------------------------------------
+
+
+@lru_cache()
+def get_model_scheduler() -> ModelCallScheduler:
+    """Create and cache the scheduler shared by every chatbot in this process."""
+    return ModelCallScheduler()
@@ -0,0 +1,32 @@
+"""
+Per-session turn locks. Each session's chatbot (and its in-memory history)
+is shared by /api/chat and the chat job workers, so every chat turn holds
+its session's lock while it runs. The locks are per process: turns of one
+session only serialize if they reach the same worker, so with several
+workers /api/chat, /api/reset and the job routes need sticky routing on
+X-Session-ID.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+# session_id -> [lock, number of turns holding or waiting for it]
+_session_locks: Dict[str, List[Any]] = {}
+
+
+@asynccontextmanager
+async def session_turn_lock(session_id: str) -> AsyncIterator[None]:
+    """
+    Hold a session's turn lock. Waiters get it in the order they asked, and
+    acquiring an uncontended lock does not yield to the event loop.
+    """
+    entry = _session_locks.setdefault(session_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _session_locks[session_id]
@@ -0,0 +1,340 @@
+"""
+Streaming tar import and export of a workspace.
+
+Archives pass through in WORKSPACE_ARCHIVE_CHUNK_BYTES pieces in both
+directions: export reads files straight from disk into tar blocks, and
+import writes each member to disk as it arrives. Memory use therefore does
+not depend on the size of the workspace or of any file in it.
+"""
+
+import io
+import os
+import tarfile
+import zlib
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.config.settings import (
+    WORKSPACE_ARCHIVE_CHUNK_BYTES,
+    WORKSPACE_ARCHIVE_GZIP_LEVEL,
+    WORKSPACE_ARCHIVE_ZSTD_LEVEL
+)
+from src.utils import metrics
+from src.utils.backups import create_backup
+from src.utils.file_utils import validate_path
+from src.utils.file_versions import path_lock
+from src.utils.workspace import BACKUP_DIR_NAME, CHECKPOINT_DIR_NAME, get_workspace_dir, is_within
+from src.utils.workspace_files import write_workspace_file_chunks
+
+try:
+    import zstandard
+except ImportError:  # zstd archives need the optional zstandard package
+    zstandard = None
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+MEDIA_TYPES = {"none": "application/x-tar", "gzip": "application/gzip", "zstd": "application/zstd"}
+FILE_EXTENSIONS = {"none": ".tar", "gzip": ".tar.gz", "zstd": ".tar.zst"}
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+EXCLUDED_DIRS = {BACKUP_DIR_NAME, CHECKPOINT_DIR_NAME}
+
+# Longest list of skipped members in an import result
+MAX_REPORTED_SKIPS = 100
+
+
+def check_compression(compression: str, allow_auto: bool = False) -> None:
+    """
+    Check that a compression name is known and supported here.
+
+    Raises:
+        ValueError: If it is unknown, or zstd without the zstandard package
+    """
+    if compression not in COMPRESSIONS and not (allow_auto and compression == "auto"):
+        choices = ", ".join(("auto",) + COMPRESSIONS if allow_auto else COMPRESSIONS)
+        raise ValueError(f"Unknown compression '{compression}' (expected one of: {choices})")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression needs the zstandard package")
+
+# ----------------------------------------------------------------------
+# --- Export
+# ----------------------------------------------------------------------
+
+def _walk(root: str) -> Iterator[Tuple[str, str, bool]]:
+    """
+    List the directories and regular files under root, parents first
+    (symlinks, backups and checkpoints are left out).
+
+    Yields:
+        (absolute path, archive name, is_directory)
+    """
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        if prefix:
+            yield directory, prefix.rstrip("/"), True
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name, reverse=True)
+        except OSError:
+            continue
+        for entry in entries:
+            name = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in EXCLUDED_DIRS:
+                    stack.append((entry.path, name + "/"))
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.path, name, False
+
+
+def _tar_blocks(root: str, chunk_bytes: int) -> Iterator[bytes]:
+    """Produce a tar archive of root as headers and file pieces, reading each file straight from disk."""
+    for abs_path, name, is_dir in _walk(root):
+        if is_dir:
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            yield info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+            continue
+
+        try:
+            f = open(abs_path, 'rb')
+        except OSError:
+            # Deleted since it was listed
+            continue
+        with f:
+            # The header is built from the open file, so it describes exactly the bytes sent
+            stat_result = os.fstat(f.fileno())
+            info = tarfile.TarInfo(name)
+            info.size = stat_result.st_size
+            info.mtime = int(stat_result.st_mtime)
+            info.mode = stat_result.st_mode & 0o777
+            yield info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+            remaining = info.size
+            while remaining:
+                chunk = f.read(min(chunk_bytes, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+            # The file shrank while it was read: pad to the size in its header
+            while remaining:
+                filler = min(chunk_bytes, remaining)
+                remaining -= filler
+                yield bytes(filler)
+        yield bytes(-info.size % tarfile.BLOCKSIZE)
+
+
+def _compressor(compression: str) -> Any:
+    """An object with compress() and flush(), or None for an uncompressed archive."""
+    if compression == "gzip":
+        return zlib.compressobj(WORKSPACE_ARCHIVE_GZIP_LEVEL, zlib.DEFLATED, 31)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=WORKSPACE_ARCHIVE_ZSTD_LEVEL).compressobj()
+    return None
+
+
+def iter_export(root: str, compression: str = "none", chunk_bytes: int = WORKSPACE_ARCHIVE_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Stream a directory of the workspace as a tar archive.
+
+    Args:
+        root: The absolute path to the directory; member names are relative to it
+        compression: "none", "gzip" or "zstd"
+        chunk_bytes: Pieces of about this size are yielded
+
+    Yields:
+        The archive, a piece at a time
+    """
+    check_compression(compression)
+    compressor = _compressor(compression)
+    pending = bytearray()
+    size = 0
+
+    def flush() -> Iterator[bytes]:
+        data = bytes(pending)
+        pending.clear()
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            metrics.increment("workspace_archive.exported_bytes", len(data))
+            yield data
+
+    for block in _tar_blocks(root, chunk_bytes):
+        pending += block
+        size += len(block)
+        if len(pending) >= chunk_bytes:
+            yield from flush()
+
+    # End-of-archive marker, padded to a whole record like tarfile and GNU tar do
+    end = 2 * tarfile.BLOCKSIZE
+    pending += bytes(end + (-(size + end) % tarfile.RECORDSIZE))
+    yield from flush()
+    if compressor is not None:
+        tail = compressor.flush()
+        metrics.increment("workspace_archive.exported_bytes", len(tail))
+        yield tail
+
+# ----------------------------------------------------------------------
+# --- Import
+# ----------------------------------------------------------------------
+
+
+class ChunkReader(io.RawIOBase):
+    """A read-only file over a function returning the next piece of a stream (b"" at its end)."""
+
+    def __init__(self, read_chunk: Callable[[], bytes]):
+        self._read_chunk = read_chunk
+        self._pending = memoryview(b"")
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._done:
+            chunk = self._read_chunk()
+            if chunk:
+                self._pending = memoryview(chunk)
+            else:
+                self._done = True
+        count = min(len(buffer), len(self._pending))
+        buffer[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+
+
+def _open_archive(read_chunk: Callable[[], bytes], compression: str) -> tarfile.TarFile:
+    """Open a streamed tar archive, decompressing it as given or as detected from its first bytes."""
+    stream: BinaryIO = io.BufferedReader(ChunkReader(read_chunk), WORKSPACE_ARCHIVE_CHUNK_BYTES)
+    if compression == "auto" and stream.peek(len(ZSTD_MAGIC)).startswith(ZSTD_MAGIC):
+        compression = "zstd"
+        check_compression(compression)
+    if compression == "zstd":
+        stream = zstandard.ZstdDecompressor().stream_reader(stream)
+
+    # "r|*" also detects gzip, bzip2 and xz by their magic bytes
+    mode = {"none": "r|", "gzip": "r|gz"}.get(compression, "r|*")
+    try:
+        return tarfile.open(fileobj=stream, mode=mode, bufsize=WORKSPACE_ARCHIVE_CHUNK_BYTES)
+    except (tarfile.TarError, zlib.error, OSError) as e:
+        raise ValueError(f"Invalid archive: {str(e)}")
+
+
+def _member_chunks(source: BinaryIO, chunk_bytes: int) -> Iterator[bytes]:
+    while True:
+        chunk = source.read(chunk_bytes)
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_archive(
+    read_chunk: Callable[[], bytes],
+    target_dir: str,
+    compression: str = "auto",
+    overwrite: bool = False
+) -> Dict[str, Any]:
+    """
+    Unpack a streamed tar archive into the current tenant's workspace. Each
+    member is checked with the editor's path rules (validate_path, so it must
+    stay in the workspace and have an allowed extension) and written
+    atomically as it arrives; members that fail are skipped and reported.
+    The import is not a transaction: files written before an error stay.
+
+    Args:
+        read_chunk: Returns the next piece of the archive, b"" at its end
+        target_dir: The absolute path to the directory to unpack into
+        compression: "auto", "none", "gzip" or "zstd"
+        overwrite: Replace existing files instead of skipping them
+
+    Returns:
+        A dict with files, directories, bytes, skipped (reasons, at most
+        MAX_REPORTED_SKIPS) and skipped_count
+
+    Raises:
+        ValueError: If the archive cannot be read
+        QuotaExceededError: If a file would exceed the workspace quota
+    """
+    check_compression(compression, allow_auto=True)
+    workspace_dir = os.path.realpath(get_workspace_dir())
+    result = {"files": 0, "directories": 0, "bytes": 0, "skipped": [], "skipped_count": 0}
+
+    def skip(name: str, reason: str) -> None:
+        result["skipped_count"] += 1
+        if len(result["skipped"]) < MAX_REPORTED_SKIPS:
+            result["skipped"].append(f"{name}: {reason}")
+
+    archive = _open_archive(read_chunk, compression)
+    with archive:
+        while True:
+            try:
+                member = archive.next()
+            except (tarfile.TarError, zlib.error, EOFError) as e:
+                raise ValueError(f"Invalid archive: {str(e)}")
+            if member is None:
+                break
+            # Stream mode remembers every member; forget them to keep memory flat
+            archive.members.clear()
+
+            reason = _import_member(archive, member, target_dir, workspace_dir, overwrite)
+            if reason:
+                skip(member.name, reason)
+            elif member.isdir():
+                result["directories"] += 1
+            else:
+                result["files"] += 1
+                result["bytes"] += member.size
+
+    metrics.increment("workspace_archive.imported_files", result["files"])
+    metrics.increment("workspace_archive.imported_bytes", result["bytes"])
+    return result
+
+
+def _import_member(archive: tarfile.TarFile, member: tarfile.TarInfo, target_dir: str, workspace_dir: str, overwrite: bool) -> Optional[str]:
+    """Write one archive member; returns why it was skipped, or None."""
+    parts: List[str] = [part for part in member.name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if member.name.startswith(("/", "\\")) or not parts:
+        return "absolute or empty path"
+    if ".." in parts:
+        return "path contains '..'"
+    abs_path = os.path.normpath(os.path.join(target_dir, *parts))
+    if not is_within(os.path.realpath(abs_path), workspace_dir):
+        return "outside the workspace"
+    if os.path.relpath(os.path.realpath(abs_path), workspace_dir).split(os.sep)[0] in EXCLUDED_DIRS:
+        return "reserved directory"
+
+    if member.isdir():
+        try:
+            os.makedirs(abs_path, exist_ok=True)
+        except OSError as e:
+            return str(e)
+        return None
+    if not member.isfile():
+        return "not a regular file"
+
+    is_valid, abs_path, error = validate_path(abs_path)
+    if not is_valid:
+        return error
+    if not overwrite and os.path.lexists(abs_path):
+        return "already exists"
+
+    try:
+        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+        # Like any other edit of the file: under its lock, and an overwritten
+        # file is backed up first so undo_edit can restore it
+        with path_lock(abs_path):
+            if overwrite and os.path.lexists(abs_path) and not create_backup(abs_path):
+                return "could not back up the existing file"
+            source = archive.extractfile(member)
+            write_workspace_file_chunks(
+                abs_path,
+                _member_chunks(source, WORKSPACE_ARCHIVE_CHUNK_BYTES),
+                member.size,
+                exclusive=not overwrite
+            )
+    except FileExistsError:
+        return "already exists"
+    except (tarfile.TarError, zlib.error, EOFError) as e:
+        raise ValueError(f"Invalid archive: {str(e)}")
+    except OSError as e:
+        return str(e)
+    return None
@@ -0,0 +1,269 @@
+"""
+Pluggable conversation stores that keep chat history outside the worker process.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from src.config.settings import (
+    CONVERSATION_STORE,
+    CONVERSATION_DB_PATH,
+    CONVERSATION_CACHE_SIZE
+)
+from src.storage.message_records import MessageRecord
+
+# ----------------------------------------------------------------------
+# --- Base Store
+# ----------------------------------------------------------------------
+
+
+class ConversationStore(ABC):
+    """An append-only message log per session, kept in memory as compact records."""
+
+    @abstractmethod
+    def append(self, session_id: str, message: MessageRecord) -> None:
+        """
+        Append a message to a session's history.
+
+        Args:
+            session_id: The session the message belongs to
+            message: The message record
+        """
+
+    @abstractmethod
+    def load_tail(self, session_id: str, limit: int) -> List[MessageRecord]:
+        """
+        Load the most recent messages of a session, oldest first.
+
+        Args:
+            session_id: The session to load
+            limit: The maximum number of messages to return
+
+        Returns:
+            A list of message records
+        """
+
+    @abstractmethod
+    def remove_last(self, session_id: str, count: int) -> None:
+        """
+        Remove the most recent messages of a session (those of an abandoned turn).
+
+        Args:
+            session_id: The session
+            count: The number of messages to remove
+        """
+
+    @abstractmethod
+    def clear(self, session_id: str) -> None:
+        """
+        Delete a session's history.
+
+        Args:
+            session_id: The session to clear
+        """
+
+# ----------------------------------------------------------------------
+# --- In-Memory Store
+# ----------------------------------------------------------------------
+
+
+class InMemoryConversationStore(ConversationStore):
+    """A process-local store; history is lost on restart and not shared between workers."""
+
+    def __init__(self):
+        self._sessions: Dict[str, List[MessageRecord]] = {}
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, message: MessageRecord) -> None:
+        with self._lock:
+            self._sessions.setdefault(session_id, []).append(message)
+
+    def load_tail(self, session_id: str, limit: int) -> List[MessageRecord]:
+        with self._lock:
+            return list(self._sessions.get(session_id, [])[-limit:])
+
+    def remove_last(self, session_id: str, count: int) -> None:
+        with self._lock:
+            messages = self._sessions.get(session_id)
+            if messages and count > 0:
+                del messages[-count:]
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+# ----------------------------------------------------------------------
+# --- SQLite Store
+# ----------------------------------------------------------------------
+
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    A SQLite store in WAL mode shared by every worker process.
+    The recent tail of each session is cached in memory and refreshed
+    incrementally when another worker has appended to the session.
+    Sequence numbers are reused after clear or remove_last, so each session
+    also has a generation that those bump; a cached tail is only trusted
+    while its generation is current.
+    """
+
+    def __init__(self, db_path: str, cache_size: int = CONVERSATION_CACHE_SIZE):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        # session_id -> (generation, last_seq, cached tail)
+        self._cache: "OrderedDict[str, Tuple[int, int, List[MessageRecord]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " message TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq)"
+            ") WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " generation INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _head(conn: sqlite3.Connection, session_id: str) -> Tuple[int, int]:
+        """Return a session's (generation, last seq)."""
+        return conn.execute(
+            "SELECT COALESCE((SELECT generation FROM sessions WHERE session_id = ?), 0),"
+            " COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?",
+            (session_id, session_id)
+        ).fetchone()
+
+    def _rewrite(self, session_id: str, sql: str, params: tuple) -> None:
+        """Delete messages of a session and bump its generation, in one transaction."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(sql, params)
+            conn.execute(
+                "INSERT INTO sessions (session_id, generation) VALUES (?, 1)"
+                " ON CONFLICT (session_id) DO UPDATE SET generation = generation + 1",
+                (session_id,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+
+    # ------------------------------------------------------------------
+    # --- Store Methods
+    # ------------------------------------------------------------------
+
+    def append(self, session_id: str, message: MessageRecord) -> None:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            generation, last_seq = self._head(conn, session_id)
+            seq = last_seq + 1
+            conn.execute(
+                "INSERT INTO messages (session_id, seq, message) VALUES (?, ?, ?)",
+                (session_id, seq, json.dumps(message.to_dict()))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._cache_lock:
+            cached = self._cache.get(session_id)
+            if cached and cached[:2] == (generation, seq - 1):
+                # Nobody else changed the session in between, so extend the cached tail in place
+                cached[2].append(message)
+                self._cache[session_id] = (generation, seq, cached[2])
+                self._cache.move_to_end(session_id)
+            else:
+                self._cache.pop(session_id, None)
+
+    def load_tail(self, session_id: str, limit: int) -> List[MessageRecord]:
+        conn = self._connection()
+        with self._cache_lock:
+            cached = self._cache.get(session_id)
+
+        # One read transaction, so the rows fetched belong to the generation read
+        conn.execute("BEGIN")
+        try:
+            generation, last_seq = self._head(conn, session_id)
+            if cached and cached[:2] == (generation, last_seq):
+                tail = cached[2]
+            elif cached and cached[0] == generation and cached[1] < last_seq:
+                # Only fetch what other workers appended since we cached the session
+                rows = conn.execute(
+                    "SELECT message FROM messages WHERE session_id = ? AND seq > ? AND seq <= ? ORDER BY seq",
+                    (session_id, cached[1], last_seq)
+                ).fetchall()
+                tail = cached[2] + [MessageRecord.from_dict(json.loads(row[0])) for row in rows]
+            else:
+                rows = conn.execute(
+                    "SELECT message FROM messages WHERE session_id = ? AND seq <= ? ORDER BY seq DESC LIMIT ?",
+                    (session_id, last_seq, limit)
+                ).fetchall()
+                tail = [MessageRecord.from_dict(json.loads(row[0])) for row in reversed(rows)]
+        finally:
+            conn.execute("COMMIT")
+
+        tail = tail[-limit:]
+        with self._cache_lock:
+            self._cache[session_id] = (generation, last_seq, tail)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return list(tail)
+
+    def remove_last(self, session_id: str, count: int) -> None:
+        if count <= 0:
+            return
+        self._rewrite(
+            session_id,
+            "DELETE FROM messages WHERE session_id = ? AND seq IN"
+            " (SELECT seq FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?)",
+            (session_id, session_id, count)
+        )
+
+    def clear(self, session_id: str) -> None:
+        self._rewrite(session_id, "DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+# ----------------------------------------------------------------------
+# --- Store Factory
+# ----------------------------------------------------------------------
+
+
+@lru_cache()
+def get_conversation_store() -> ConversationStore:
+    """Create and cache the conversation store selected by CONVERSATION_STORE."""
+    if CONVERSATION_STORE == "memory":
+        return InMemoryConversationStore()
+    if CONVERSATION_STORE == "sqlite":
+        return SQLiteConversationStore(CONVERSATION_DB_PATH)
+    raise ValueError(f"Unknown conversation store: {CONVERSATION_STORE}")
@@ -0,0 +1,198 @@
+"""
+Compact in-memory conversation messages. Messages are slotted records, and
+large strings (file contents from view results, file_text of created files...)
+are stored once per worker by content hash and compressed between turns.
+API payloads are only built when a request is sent.
+"""
+
+import hashlib
+import sys
+import threading
+import weakref
+import zlib
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+from src.config.settings import CONVERSATION_INTERN_MIN_CHARS
+from src.utils import metrics
+
+# --------------------------------------------------
+# --- Shared Payloads
+# --------------------------------------------------
+
+
+class Payload:
+    """A large string shared by every message (of any session) that contains it."""
+
+    __slots__ = ("digest", "size", "_text", "_compressed", "__weakref__")
+
+    def __init__(self, digest: bytes, text: str):
+        self.digest = digest
+        self.size = len(text)
+        self._text = text
+        self._compressed = None
+
+    @property
+    def text(self) -> str:
+        """The string, decompressed on each access if it is cold (not kept, to save memory)."""
+        text = self._text
+        if text is None:
+            return zlib.decompress(self._compressed).decode("utf-8", "surrogatepass")
+        return text
+
+    def compress(self) -> None:
+        """Keep only a compressed copy until the string is next needed."""
+        if self._text is not None:
+            # Set the compressed copy first so concurrent readers always find one of them
+            self._compressed = zlib.compress(self._text.encode("utf-8", "surrogatepass"), 1)
+            self._text = None
+
+
+# digest -> payload; a payload is freed once no message refers to it
+_payloads: "weakref.WeakValueDictionary[bytes, Payload]" = weakref.WeakValueDictionary()
+_payloads_lock = threading.Lock()
+
+
+def intern_text(text: str) -> Union[str, Payload]:
+    """
+    Return the shared payload for a large string, or a short string unchanged.
+
+    Args:
+        text: A string from a message
+
+    Returns:
+        A Payload if text has at least CONVERSATION_INTERN_MIN_CHARS characters, else text
+    """
+    if len(text) < CONVERSATION_INTERN_MIN_CHARS:
+        return text
+    digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _payloads_lock:
+        payload = _payloads.get(digest)
+        if payload is None:
+            payload = Payload(digest, text)
+            _payloads[digest] = payload
+        else:
+            metrics.increment("conversation.payloads_shared")
+    return payload
+
+
+def _pack(value: Any) -> Any:
+    """Replace large strings in a JSON value with shared payloads."""
+    if isinstance(value, str):
+        return intern_text(value)
+    if isinstance(value, dict):
+        return {key: _pack(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_pack(item) for item in value]
+    return value
+
+
+def _unpack(value: Any) -> Any:
+    """Turn a packed value back into plain JSON."""
+    if isinstance(value, Payload):
+        return value.text
+    if isinstance(value, dict):
+        return {key: _unpack(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unpack(item) for item in value]
+    return value
+
+
+def _payloads_in(value: Any) -> Iterator[Payload]:
+    if isinstance(value, Payload):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _payloads_in(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _payloads_in(item)
+
+
+def _char_count(value: Any) -> int:
+    """Approximate a packed value's JSON length without building it."""
+    if isinstance(value, Payload):
+        return value.size
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(key) + _char_count(item) + 6 for key, item in value.items())
+    if isinstance(value, list):
+        return sum(_char_count(item) + 2 for item in value)
+    return 8
+
+# --------------------------------------------------
+# --- Message Records
+# --------------------------------------------------
+
+
+class BlockRecord:
+    """A content block: its type plus its other fields as (key, packed value) pairs."""
+
+    __slots__ = ("type", "fields")
+
+    def __init__(self, block: Dict[str, Any]):
+        self.type = sys.intern(block.get("type", ""))
+        self.fields: Tuple[Tuple[str, Any], ...] = tuple(
+            (sys.intern(key), _pack(value)) for key, value in block.items() if key != "type"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        block = {"type": self.type}
+        for key, value in self.fields:
+            block[key] = _unpack(value)
+        return block
+
+
+class MessageRecord:
+    """A conversation message; content is a (possibly shared) string or a tuple of blocks."""
+
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: Union[str, Payload, Tuple[BlockRecord, ...]]):
+        self.role = role
+        self.content = content
+
+    @classmethod
+    def from_dict(cls, message: Dict[str, Any]) -> "MessageRecord":
+        """
+        Build a record from an API message.
+
+        Args:
+            message: A message with "role" and "content" (a string or a list of block dicts)
+        """
+        content = message["content"]
+        if isinstance(content, str):
+            return cls(sys.intern(message["role"]), intern_text(content))
+        return cls(sys.intern(message["role"]), tuple(BlockRecord(block) for block in content))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Build the API message."""
+        if isinstance(self.content, tuple):
+            return {"role": self.role, "content": [block.to_dict() for block in self.content]}
+        return {"role": self.role, "content": _unpack(self.content)}
+
+    @property
+    def is_user_text(self) -> bool:
+        """Whether this is a plain user message (not a tool_result)."""
+        return self.role == "user" and not isinstance(self.content, tuple)
+
+    def char_count(self) -> int:
+        """Approximate the length of the message's JSON."""
+        if isinstance(self.content, tuple):
+            return sum(_char_count(dict(block.fields)) + len(block.type) + 16 for block in self.content)
+        return _char_count(self.content) + 32
+
+    def compress(self) -> None:
+        """Compress the message's shared payloads."""
+        if isinstance(self.content, tuple):
+            for block in self.content:
+                for _, value in block.fields:
+                    for payload in _payloads_in(value):
+                        payload.compress()
+        elif isinstance(self.content, Payload):
+            self.content.compress()
+
+
+def to_api_messages(records: List[MessageRecord]) -> List[Dict[str, Any]]:
+    """Build the messages list for an API request from records."""
+    return [record.to_dict() for record in records]
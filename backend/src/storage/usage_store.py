@@ -0,0 +1,166 @@
+"""
+Workspace usage counters (bytes and files per tenant) for quota checks.
+"""
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from src.config.settings import WORKSPACE_USAGE_STORE, WORKSPACE_USAGE_DB_PATH
+
+# Stands in for "unlimited" in quota comparisons
+UNLIMITED = 2 ** 62
+
+# ----------------------------------------------------------------------
+# --- Base Store
+# ----------------------------------------------------------------------
+
+
+class UsageStore(ABC):
+    """Bytes and file counts per tenant, adjusted by deltas."""
+
+    @abstractmethod
+    def get(self, tenant_id: str) -> Optional[Tuple[int, int]]:
+        """
+        Get a tenant's usage.
+
+        Returns:
+            (bytes, files), or None if the tenant has not been counted yet
+        """
+
+    @abstractmethod
+    def seed(self, tenant_id: str, used_bytes: int, used_files: int, replace: bool = False) -> None:
+        """
+        Set a tenant's usage from a full count.
+
+        Args:
+            tenant_id: The tenant
+            used_bytes: Bytes in the tenant's workspace
+            used_files: Files in the tenant's workspace
+            replace: Overwrite existing counters (otherwise only set them if missing)
+        """
+
+    @abstractmethod
+    def try_add(self, tenant_id: str, delta_bytes: int, delta_files: int, max_bytes: int, max_files: int) -> Optional[bool]:
+        """
+        Adjust a tenant's usage unless that would take a growing counter past its limit.
+        The check and the update are a single atomic step.
+
+        Returns:
+            True if applied, False if a limit would be exceeded, None if the
+            tenant has not been counted yet
+        """
+
+# ----------------------------------------------------------------------
+# --- In-Memory Store
+# ----------------------------------------------------------------------
+
+
+class InMemoryUsageStore(UsageStore):
+    """A process-local store; counters are recounted after a restart and not shared between workers."""
+
+    def __init__(self):
+        self._usage: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: str) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            return self._usage.get(tenant_id)
+
+    def seed(self, tenant_id: str, used_bytes: int, used_files: int, replace: bool = False) -> None:
+        with self._lock:
+            if replace or tenant_id not in self._usage:
+                self._usage[tenant_id] = (used_bytes, used_files)
+
+    def try_add(self, tenant_id: str, delta_bytes: int, delta_files: int, max_bytes: int, max_files: int) -> Optional[bool]:
+        with self._lock:
+            usage = self._usage.get(tenant_id)
+            if usage is None:
+                return None
+            used_bytes, used_files = usage[0] + delta_bytes, usage[1] + delta_files
+            if (delta_bytes > 0 and used_bytes > max_bytes) or (delta_files > 0 and used_files > max_files):
+                return False
+            self._usage[tenant_id] = (used_bytes, used_files)
+            return True
+
+# ----------------------------------------------------------------------
+# --- SQLite Store
+# ----------------------------------------------------------------------
+
+
+class SQLiteUsageStore(UsageStore):
+    """A SQLite store in WAL mode shared by every worker process; one row per tenant."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS workspace_usage ("
+            " tenant_id TEXT PRIMARY KEY,"
+            " used_bytes INTEGER NOT NULL,"
+            " used_files INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------------
+    # --- Store Methods
+    # ------------------------------------------------------------------
+
+    def get(self, tenant_id: str) -> Optional[Tuple[int, int]]:
+        row = self._connection().execute(
+            "SELECT used_bytes, used_files FROM workspace_usage WHERE tenant_id = ?",
+            (tenant_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def seed(self, tenant_id: str, used_bytes: int, used_files: int, replace: bool = False) -> None:
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        self._connection().execute(
+            f"{verb} INTO workspace_usage (tenant_id, used_bytes, used_files) VALUES (?, ?, ?)",
+            (tenant_id, used_bytes, used_files)
+        )
+
+    def try_add(self, tenant_id: str, delta_bytes: int, delta_files: int, max_bytes: int, max_files: int) -> Optional[bool]:
+        cursor = self._connection().execute(
+            "UPDATE workspace_usage"
+            " SET used_bytes = used_bytes + ?, used_files = used_files + ?"
+            " WHERE tenant_id = ?"
+            " AND (? <= 0 OR used_bytes + ? <= ?)"
+            " AND (? <= 0 OR used_files + ? <= ?)",
+            (delta_bytes, delta_files, tenant_id,
+             delta_bytes, delta_bytes, max_bytes,
+             delta_files, delta_files, max_files)
+        )
+        if cursor.rowcount:
+            return True
+        return False if self.get(tenant_id) is not None else None
+
+# ----------------------------------------------------------------------
+# --- Store Factory
+# ----------------------------------------------------------------------
+
+
+@lru_cache()
+def get_usage_store() -> UsageStore:
+    """Create and cache the usage store selected by WORKSPACE_USAGE_STORE."""
+    if WORKSPACE_USAGE_STORE == "memory":
+        return InMemoryUsageStore()
+    if WORKSPACE_USAGE_STORE == "sqlite":
+        return SQLiteUsageStore(WORKSPACE_USAGE_DB_PATH)
+    raise ValueError(f"Unknown workspace usage store: {WORKSPACE_USAGE_STORE}")
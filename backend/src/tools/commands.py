@@ -0,0 +1,119 @@
+"""
+Typed text editor commands, validated once from Claude's tool input or an
+API request and then passed to TextEditorTool.run.
+"""
+
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, model_validator
+
+# ----------------------------------------------------------------------
+# --- Text Editor Command Models
+# ----------------------------------------------------------------------
+
+class EditorCommandBase(BaseModel):
+    """
+    Fields shared by every text editor command. Parameters may be given flat,
+    as in Claude's tool input, or nested under "parameters", as in
+    /api/file/operation requests; unknown parameters are ignored.
+    """
+    model_config = ConfigDict(extra="ignore")
+    
+    path: str = Field(..., description="The path to the file or directory, relative to the workspace")
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _flatten_parameters(cls, data: Any) -> Any:
+        if isinstance(data, dict) and isinstance(data.get("parameters"), dict):
+            data = {**data["parameters"], **{key: value for key, value in data.items() if key != "parameters"}}
+        return data
+    
+class ViewCommand(EditorCommandBase):
+    """Read a file (with line numbers) or list a directory."""
+    command: Literal["view"]
+    view_range: Optional[List[int]] = Field(None, description="Range of lines to view [start, end]")
+    cursor: Optional[str] = Field(None, description="Continuation cursor from a truncated view")
+    
+class ViewDiffCommand(EditorCommandBase):
+    """Show what changed in a file since this session last viewed or edited it."""
+    command: Literal["view_diff"]
+    
+class OutlineCommand(EditorCommandBase):
+    """List a file's classes, functions and sections with their line ranges."""
+    command: Literal["outline"]
+    
+class StrReplaceCommand(EditorCommandBase):
+    """Replace the one occurrence of a text in a file."""
+    command: Literal["str_replace"]
+    old_str: str = Field(..., description="Text to replace")
+    new_str: str = Field("", description="New text to insert")
+    expected_version: Optional[str] = Field(None, description="Fail with a conflict unless the file is at this version")
+    
+class CreateCommand(EditorCommandBase):
+    """Create a new file."""
+    command: Literal["create"]
+    file_text: str = Field("", description="Content for the new file")
+    
+class InsertCommand(EditorCommandBase):
+    """Insert text after a line."""
+    command: Literal["insert"]
+    insert_line: int = Field(0, description="Line number after which to insert text (0 = beginning)")
+    new_str: str = Field("", description="Text to insert")
+    expected_version: Optional[str] = Field(None, description="Fail with a conflict unless the file is at this version")
+    
+class UndoEditCommand(EditorCommandBase):
+    """Restore a file from its most recent backup."""
+    command: Literal["undo_edit"]
+    
+class ApplyPatchCommand(EditorCommandBase):
+    """Apply a unified diff touching one or more files."""
+    command: Literal["apply_patch"]
+    patch: str = Field(..., description="The unified diff")
+    expected_versions: Optional[Dict[str, str]] = Field(None, description="Version tokens by path; the patch fails if any of those files has changed")
+    
+class ReplaceAllCommand(EditorCommandBase):
+    """Replace every occurrence of a text or regex in the files under a directory."""
+    command: Literal["replace_all"]
+    old_str: str = Field(..., description="Text (or regex) to replace")
+    new_str: str = Field("", description="Replacement text")
+    regex: bool = Field(False, description="Treat old_str as a regular expression")
+    glob: Optional[str] = Field(None, description="Only change files whose workspace-relative path matches")
+    dry_run: bool = Field(False, description="Only report the number of matches per file")
+
+# A text editor command, told apart by its "command" field
+EditorCommand = Annotated[
+    Union[
+        ViewCommand,
+        ViewDiffCommand,
+        OutlineCommand,
+        StrReplaceCommand,
+        CreateCommand,
+        InsertCommand,
+        UndoEditCommand,
+        ApplyPatchCommand,
+        ReplaceAllCommand
+    ],
+    Field(discriminator="command")
+]
+
+_editor_command_adapter: TypeAdapter[EditorCommand] = TypeAdapter(EditorCommand)
+
+
+def parse_editor_command(data: Any) -> EditorCommand:
+    """
+    Validate a text editor command (a dict, or an object with attributes).
+    
+    Raises:
+        pydantic.ValidationError: If the command is unknown or its parameters are invalid
+    """
+    return _editor_command_adapter.validate_python(data, from_attributes=not isinstance(data, dict))
+
+
+def describe_validation_error(error: ValidationError) -> str:
+    """Summarize a command validation error in one line, e.g. "old_str: Field required"."""
+    problems = []
+    for detail in error.errors():
+        # The first location of a union member is the command's tag
+        location = [str(part) for part in detail["loc"][1:]]
+        problems.append(f"{'.'.join(location)}: {detail['msg']}" if location else detail["msg"])
+    return "; ".join(problems)
@@ -2,18 +2,49 @@
 Implementation of the text editor tool for Claude.
 """
 
+import logging
 import os
+import time
 from typing import Dict, List, Optional, Any, Union
 
+from pydantic import ValidationError
+
+from src.tools.commands import (
+    ApplyPatchCommand,
+    CreateCommand,
+    EditorCommand,
+    InsertCommand,
+    OutlineCommand,
+    ReplaceAllCommand,
+    StrReplaceCommand,
+    UndoEditCommand,
+    ViewCommand,
+    ViewDiffCommand,
+    describe_validation_error,
+    parse_editor_command
+)
+from src.config.settings import DEFAULT_SESSION_ID
+from src.utils.file_reading import list_directory_page, read_file_with_line_numbers
 from src.utils.file_utils import (
     validate_path,
-    read_file_with_line_numbers,
-    list_directory_contents,
     replace_text_in_file,
     insert_text_at_line,
     create_new_file,
     restore_from_backup
 )
+from src.utils.logging_config import log_context
+from src.utils.outline import format_outline
+from src.utils.patch_utils import apply_patch
+from src.utils.replace_all import replace_all
+from src.utils.view_diff import seen_by, view_diff
+
+logger = logging.getLogger(__name__)
+
+# Commands whose views and writes are recorded as seen by the session (the
+# lines a view showed, or the whole version an edit wrote), so view_diff
+# starts from there
+SEEN_COMMANDS = (ViewCommand, StrReplaceCommand, CreateCommand, InsertCommand, UndoEditCommand)
+
 
 # =========================================================================
 #  TextEditorTool Class
@@ -25,79 +56,27 @@ class TextEditorTool:
     #  Handle Tool Use
     # =========================================================================
     @staticmethod
-    def handle_tool_use(tool_use) -> Dict[str, Any]:
+    def handle_tool_use(tool_use, session_id: str = DEFAULT_SESSION_ID) -> Dict[str, Any]:
         """
         Process a text editor tool use request from Claude.
         
         Args:
-            tool_use: The tool use request containing command and parameters
+            tool_use: The tool use request (a dict or an SDK object) containing command and parameters
+            session_id: The conversation session making the request
             
         Returns:
             A dictionary with the tool result
         """
-        # Handle both object and dictionary access patterns
-        tool_id = getattr(tool_use, "id", None)
-        if tool_id is None and isinstance(tool_use, dict):
-            tool_id = tool_use.get("id", "")
-            
-        # Get input parameters - handle both object and dict access
         if isinstance(tool_use, dict):
-            input_params = tool_use.get("input", {})
+            tool_id, input_params = tool_use.get("id", ""), tool_use.get("input", {})
         else:
-            input_params = getattr(tool_use, "input", {})
-            # If input is an object and not a dict, convert attributes to dict
-            if input_params and not isinstance(input_params, dict):
-                try:
-                    # Build a dictionary from the object's attributes
-                    input_params = {
-                        "command": getattr(input_params, "command", ""),
-                        "path": getattr(input_params, "path", ""),
-                        "old_str": getattr(input_params, "old_str", ""),
-                        "new_str": getattr(input_params, "new_str", ""),
-                        "file_text": getattr(input_params, "file_text", ""),
-                        "insert_line": getattr(input_params, "insert_line", 0),
-                        "view_range": getattr(input_params, "view_range", None)
-                    }
-                except Exception as e:
-                    return {
-                        "type": "tool_result",
-                        "tool_use_id": tool_id,
-                        "content": f"Error accessing tool parameters: {str(e)}",
-                        "is_error": True
-                    }
-            
-        # Now we should have input_params as a dict
-        command = input_params.get("command", "")
-        path = input_params.get("path", "")
-        
-        # Validate the path
-        is_valid, abs_path, error_message = validate_path(path)
-        if not is_valid:
-            return {
-                "type": "tool_result",
-                "tool_use_id": tool_id,
-                "content": error_message,
-                "is_error": True
-            }
+            tool_id, input_params = getattr(tool_use, "id", ""), getattr(tool_use, "input", {})
             
-        # Process the command
-        result = {"content": "", "is_error": False}
-        
+        # Validate the input once; handlers get typed fields
         try:
-            if command == "view":
-                result = TextEditorTool._handle_view(abs_path, input_params.get("view_range"))
-            elif command == "str_replace":
-                result = TextEditorTool._handle_str_replace(abs_path, input_params.get("old_str", ""), input_params.get("new_str", ""))
-            elif command == "create":
-                result = TextEditorTool._handle_create(abs_path, input_params.get("file_text", ""))
-            elif command == "insert":
-                result = TextEditorTool._handle_insert(abs_path, input_params.get("insert_line", 0), input_params.get("new_str", ""))
-            elif command == "undo_edit":
-                result = TextEditorTool._handle_undo_edit(abs_path)
-            else:
-                result = {"content": f"Error: Unknown command '{command}'", "is_error": True}
-        except Exception as e:
-            result = {"content": f"Error executing {command}: {str(e)}", "is_error": True}
+            result = TextEditorTool.run(parse_editor_command(input_params), session_id)
+        except ValidationError as e:
+            result = {"content": f"Error: Invalid tool parameters: {describe_validation_error(e)}", "is_error": True}
             
         return {
             "type": "tool_result",
@@ -105,18 +84,88 @@ class TextEditorTool:
             "content": result["content"],
             "is_error": result["is_error"]
         }
+        
+    @staticmethod
+    def run(command: EditorCommand, session_id: str = DEFAULT_SESSION_ID) -> Dict[str, Union[str, bool]]:
+        """
+        Run a validated text editor command.
+        
+        Args:
+            command: The command, e.g. parsed from a tool use or an API request
+            session_id: The session running it; view_diff compares with what this session last saw
+            
+        Returns:
+            A dictionary with content and is_error
+        """
+        is_valid, abs_path, error_message = validate_path(command.path)
+        if not is_valid:
+            return {"content": error_message, "is_error": True}
+            
+        # Process the command; records logged meanwhile carry its command and path
+        started = time.perf_counter()
+        
+        with log_context(command=command.command, path=command.path):
+            if isinstance(command, SEEN_COMMANDS):
+                with seen_by(session_id):
+                    result = TextEditorTool._run_command(command, abs_path, session_id)
+            else:
+                result = TextEditorTool._run_command(command, abs_path, session_id)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("tool call", extra={
+                    "bytes_in": sum(len(value) for value in vars(command).values() if isinstance(value, str)),
+                    "bytes_out": len(result["content"]),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "is_error": result["is_error"]
+                })
+        return result
+        
+    @staticmethod
+    def _run_command(command: EditorCommand, abs_path: str, session_id: str = DEFAULT_SESSION_ID) -> Dict[str, Union[str, bool]]:
+        """Dispatch a validated command to its handler."""
+        try:
+            if isinstance(command, ViewCommand):
+                result = TextEditorTool._handle_view(abs_path, command.view_range, command.cursor)
+            elif isinstance(command, ViewDiffCommand):
+                result = TextEditorTool._handle_view_diff(abs_path, session_id)
+            elif isinstance(command, OutlineCommand):
+                result = TextEditorTool._handle_outline(abs_path)
+            elif isinstance(command, StrReplaceCommand):
+                result = TextEditorTool._handle_str_replace(abs_path, command.old_str, command.new_str, command.expected_version)
+            elif isinstance(command, CreateCommand):
+                result = TextEditorTool._handle_create(abs_path, command.file_text)
+            elif isinstance(command, InsertCommand):
+                result = TextEditorTool._handle_insert(abs_path, command.insert_line, command.new_str, command.expected_version)
+            elif isinstance(command, UndoEditCommand):
+                result = TextEditorTool._handle_undo_edit(abs_path)
+            elif isinstance(command, ApplyPatchCommand):
+                result = TextEditorTool._handle_apply_patch(command.patch, command.expected_versions)
+            elif isinstance(command, ReplaceAllCommand):
+                result = TextEditorTool._handle_replace_all(
+                    abs_path,
+                    command.old_str,
+                    command.new_str,
+                    command.regex,
+                    command.glob,
+                    command.dry_run
+                )
+            else:
+                result = {"content": f"Error: Unknown command '{command.command}'", "is_error": True}
+        except Exception as e:
+            logger.exception("Error executing %s", command.command)
+            result = {"content": f"Error executing {command.command}: {str(e)}", "is_error": True}
+        return result
     # =========================================================================
     #  Handle 'view' Command
     # =========================================================================    
     @staticmethod
-    def _handle_view(path: str, view_range: Optional[List[int]]) -> Dict[str, Union[str, bool]]:
-        """Handle the 'view' command."""
+    def _handle_view(path: str, view_range: Optional[List[int]], cursor: Optional[str] = None) -> Dict[str, Union[str, bool]]:
+        """Handle the 'view' command; large results are paged with a continuation cursor."""
         if os.path.isdir(path):
             try:
-                contents = list_directory_contents(path)
+                content = list_directory_page(path, cursor)
                 return {
-                    "content": "\n".join(contents),
-                    "is_error": False
+                    "content": content,
+                    "is_error": content.startswith("Error:")
                 }
             except Exception as e:
                 return {
@@ -124,10 +173,10 @@ class TextEditorTool:
                     "is_error": True
                 }
         elif os.path.isfile(path):
-            content = read_file_with_line_numbers(path, view_range)
+            content = read_file_with_line_numbers(path, view_range, cursor)
             return {
                 "content": content,
-                "is_error": False
+                "is_error": content.startswith("Error")
             }
         else:
             return {
@@ -135,10 +184,38 @@ class TextEditorTool:
                 "is_error": True
             }
     # =========================================================================
+    #  Handle 'view_diff' Command
+    # =========================================================================    
+    @staticmethod
+    def _handle_view_diff(path: str, session_id: str) -> Dict[str, Union[str, bool]]:
+        """Handle the 'view_diff' command."""
+        if os.path.isdir(path):
+            return {
+                "content": f"Error: view_diff needs a file, not a directory: {path}",
+                "is_error": True
+            }
+            
+        success, message = view_diff(session_id, path)
+        return {
+            "content": message,
+            "is_error": not success
+        }
+    # =========================================================================
+    #  Handle 'outline' Command
+    # =========================================================================    
+    @staticmethod
+    def _handle_outline(path: str) -> Dict[str, Union[str, bool]]:
+        """Handle the 'outline' command."""
+        success, message = format_outline(path)
+        return {
+            "content": message,
+            "is_error": not success
+        }
+    # =========================================================================
     #  Handle 'str_replace' Command
     # =========================================================================        
     @staticmethod
-    def _handle_str_replace(path: str, old_str: str, new_str: str) -> Dict[str, Union[str, bool]]:
+    def _handle_str_replace(path: str, old_str: str, new_str: str, expected_version: Optional[str] = None) -> Dict[str, Union[str, bool]]:
         """Handle the 'str_replace' command."""
         if not old_str:
             return {
@@ -152,7 +229,7 @@ class TextEditorTool:
                 "is_error": True
             }
             
-        success, message = replace_text_in_file(path, old_str, new_str)
+        success, message = replace_text_in_file(path, old_str, new_str, expected_version)
         return {
             "content": message,
             "is_error": not success
@@ -173,9 +250,9 @@ class TextEditorTool:
     #  Handle 'insert' Command
     # =========================================================================    
     @staticmethod
-    def _handle_insert(path: str, insert_line: int, new_str: str) -> Dict[str, Union[str, bool]]:
+    def _handle_insert(path: str, insert_line: int, new_str: str, expected_version: Optional[str] = None) -> Dict[str, Union[str, bool]]:
         """Handle the 'insert' command."""
-        success, message = insert_text_at_line(path, insert_line, new_str)
+        success, message = insert_text_at_line(path, insert_line, new_str, expected_version)
         return {
             "content": message,
             "is_error": not success
@@ -191,3 +268,38 @@ class TextEditorTool:
             "content": message,
             "is_error": not success
         }
+    # =========================================================================
+    #  Handle 'apply_patch' Command
+    # =========================================================================        
+    @staticmethod
+    def _handle_apply_patch(patch: str, expected_versions: Optional[Dict[str, str]] = None) -> Dict[str, Union[str, bool]]:
+        """Handle the 'apply_patch' command; file paths come from the patch itself."""
+        if not patch:
+            return {
+                "content": "Error: patch parameter is required for apply_patch command",
+                "is_error": True
+            }
+            
+        success, message = apply_patch(patch, expected_versions)
+        return {
+            "content": message,
+            "is_error": not success
+        }
+    # =========================================================================
+    #  Handle 'replace_all' Command
+    # =========================================================================        
+    @staticmethod
+    def _handle_replace_all(
+        path: str,
+        old_str: str,
+        new_str: str,
+        regex: bool = False,
+        glob: Optional[str] = None,
+        dry_run: bool = False
+    ) -> Dict[str, Union[str, bool]]:
+        """Handle the 'replace_all' command; path is the directory (or file) to search."""
+        success, message = replace_all(path, old_str, new_str, regex, glob, dry_run)
+        return {
+            "content": message,
+            "is_error": not success
+        }
@@ -0,0 +1,229 @@
+"""
+Atomic file writes (temp file + os.replace) with configurable durability.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from src.config.settings import WRITE_DURABILITY, WRITE_GROUP_COMMIT_WINDOW_MS
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# --- Durability Modes
+# --------------------------------------------------
+
+# fsync the file and its directory on every write
+DURABILITY_FSYNC = "fsync"
+# fsync like DURABILITY_FSYNC, but batched across concurrent writers
+DURABILITY_GROUP = "group"
+# Still atomic, but left to the OS page cache (may be lost on power failure)
+DURABILITY_NONE = "none"
+
+DURABILITY_MODES = {DURABILITY_FSYNC, DURABILITY_GROUP, DURABILITY_NONE}
+
+# --------------------------------------------------
+# --- Group Commit
+# --------------------------------------------------
+
+
+class _Batch:
+    """File descriptors waiting to be fsynced together."""
+
+    def __init__(self):
+        self.fds: Dict[str, int] = {}
+        self.errors: Dict[str, OSError] = {}
+        self.done = threading.Event()
+
+
+class GroupCommitter:
+    """
+    Batches fsync calls from concurrent writers. The first writer to arrive
+    becomes the leader: it waits a short window for others to join, fsyncs
+    every descriptor in the batch back to back (so the filesystem can
+    coalesce journal commits) and wakes the followers.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._batch: Optional[_Batch] = None
+
+    def sync(self, fd: int, key: str) -> None:
+        """
+        fsync a descriptor as part of the current batch.
+
+        Args:
+            fd: The open file or directory descriptor
+            key: Identifies what fd refers to; descriptors with the same key
+                 (e.g. the same directory) are only fsynced once per batch
+        """
+        with self._lock:
+            leader = self._batch is None
+            if leader:
+                self._batch = _Batch()
+            batch = self._batch
+            batch.fds.setdefault(key, fd)
+
+        if leader:
+            time.sleep(self.window_seconds)
+            with self._lock:
+                self._batch = None
+            for batch_key, batch_fd in batch.fds.items():
+                try:
+                    os.fsync(batch_fd)
+                except OSError as e:
+                    batch.errors[batch_key] = e
+            batch.done.set()
+        else:
+            batch.done.wait()
+
+        if key in batch.errors:
+            raise batch.errors[key]
+
+
+_group_committer = GroupCommitter(WRITE_GROUP_COMMIT_WINDOW_MS / 1000)
+
+# --------------------------------------------------
+# --- Write Listeners
+# --------------------------------------------------
+
+# Called as listener(file_path, data, stat_result) after each successful write,
+# so caches of file-derived data can refresh from the bytes just written
+_write_listeners: List[Callable[[str, bytes, os.stat_result], None]] = []
+
+
+def add_write_listener(listener: Callable[[str, bytes, os.stat_result], None]) -> None:
+    """
+    Register a function to be called after every atomic_write.
+
+    Args:
+        listener: Called with the absolute file path, the bytes written and
+                  the written file's stat (taken before it was moved into
+                  place, so it describes exactly these bytes even if the path
+                  has been replaced again since); exceptions it raises are
+                  logged and ignored
+    """
+    _write_listeners.append(listener)
+
+
+def _notify_write_listeners(file_path: str, data: bytes, stat_result: os.stat_result) -> None:
+    for listener in _write_listeners:
+        try:
+            listener(file_path, data, stat_result)
+        except Exception as e:
+            logger.exception("Error in write listener for %s: %s", file_path, e)
+
+# --------------------------------------------------
+# --- Atomic Write Functions
+# --------------------------------------------------
+
+def atomic_write(
+    file_path: str,
+    data: Union[str, bytes],
+    durability: str = WRITE_DURABILITY,
+    exclusive: bool = False
+) -> None:
+    """
+    Write a file so readers see either the old or the new content, never a mix.
+    The data is written to a temporary file in the same directory, synced
+    according to `durability`, and moved over the target with os.replace.
+
+    Args:
+        file_path: The absolute path to the file
+        data: The new content (str is encoded as UTF-8)
+        durability: One of DURABILITY_FSYNC, DURABILITY_GROUP or DURABILITY_NONE
+        exclusive: Fail with FileExistsError instead of replacing an existing file
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    stat_result = _write_and_replace(file_path, (data,), durability, exclusive)
+    _notify_write_listeners(file_path, data, stat_result)
+
+
+def atomic_write_chunks(
+    file_path: str,
+    chunks: Iterable[bytes],
+    durability: str = WRITE_DURABILITY,
+    exclusive: bool = False
+) -> os.stat_result:
+    """
+    Like atomic_write, but for content produced a piece at a time (e.g. a
+    file streamed out of an archive), so it never has to be held in memory.
+    Write listeners are not called since there are no bytes to hand them;
+    caches keyed by the file's stat see the new version on their next read.
+
+    Returns:
+        The written file's stat
+    """
+    return _write_and_replace(file_path, chunks, durability, exclusive)
+
+
+def _write_and_replace(file_path: str, chunks: Iterable[bytes], durability: str, exclusive: bool) -> os.stat_result:
+    """Write chunks to a temporary file, sync it and move it over file_path."""
+    if durability not in DURABILITY_MODES:
+        raise ValueError(f"Unknown durability mode: {durability}")
+
+    directory = os.path.dirname(file_path)
+    temp_path = os.path.join(directory, f".{os.path.basename(file_path)}.{uuid.uuid4().hex[:8]}.tmp")
+
+    # Keep the permissions of the file being replaced; new files get the umask default
+    try:
+        mode = os.stat(file_path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666
+
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+    try:
+        try:
+            for chunk in chunks:
+                view = memoryview(chunk)
+                while view:
+                    written = os.write(fd, view)
+                    view = view[written:]
+            _sync(fd, temp_path, durability)
+            # The inode and mtime survive the rename below
+            stat_result = os.fstat(fd)
+        finally:
+            os.close(fd)
+
+        if exclusive:
+            os.link(temp_path, file_path)
+            os.unlink(temp_path)
+        else:
+            os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    if durability != DURABILITY_NONE:
+        _sync_directory(directory, durability)
+    return stat_result
+
+
+def _sync(fd: int, key: str, durability: str) -> None:
+    """fsync a descriptor according to the durability mode."""
+    if durability == DURABILITY_FSYNC:
+        os.fsync(fd)
+    elif durability == DURABILITY_GROUP:
+        _group_committer.sync(fd, key)
+
+
+def _sync_directory(directory: str, durability: str) -> None:
+    """fsync a directory so a rename inside it survives a crash."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Directories can't be opened for syncing on some platforms (e.g. Windows)
+        return
+    try:
+        _sync(fd, directory, durability)
+    finally:
+        os.close(fd)
@@ -0,0 +1,149 @@
+"""
+Per-file backups taken before each edit. The backup directory mirrors the
+workspace tree, so a file's backups sit under its workspace-relative
+directory and files with the same name in different directories never share
+backups.
+"""
+
+import logging
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from src.config.settings import BACKUP_MAX_PER_FILE
+from src.utils.quota import release, reserve
+from src.utils.workspace import get_backup_dir, get_workspace_dir, is_within
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# --- Backup and Restore Functions
+# --------------------------------------------------
+
+def _backup_dir_for(file_path: str) -> Optional[str]:
+    """
+    Get the directory holding a file's backups: the backup directory plus the
+    file's workspace-relative directory.
+    
+    Args:
+        file_path: The absolute path to the file
+        
+    Returns:
+        The directory, or None if the file is outside the workspace
+    """
+    workspace_dir = os.path.normpath(get_workspace_dir())
+    directory = os.path.dirname(os.path.normpath(file_path))
+    if not is_within(directory, workspace_dir):
+        return None
+    return os.path.normpath(os.path.join(get_backup_dir(), os.path.relpath(directory, workspace_dir)))
+
+def create_backup(file_path: str, backup_id: Optional[str] = None, prune: bool = True) -> Optional[str]:
+    """
+    Create a backup of a file before modifying it.
+    
+    Args:
+        file_path: The absolute path to the file
+        backup_id: Shared id for backups taken together as one set (random if omitted)
+        prune: Prune the file's older backups afterwards; a multi-file command
+               passes False and calls prune_backups once its whole set is
+               committed or rolled back, so no member of the set is pruned
+               while it may still be needed
+        
+    Returns:
+        The path to the backup file or None if creation failed
+    """
+    backup_dir = _backup_dir_for(file_path)
+    if backup_dir is None or not os.path.exists(file_path):
+        return None
+        
+    # Backups count toward the workspace's byte quota (QuotaExceededError propagates)
+    size = os.path.getsize(file_path)
+    reserve(size)
+    try:
+        # Create a unique backup file name with timestamp and UUID
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        unique_id = backup_id or str(uuid.uuid4())[:8]
+        file_name = os.path.basename(file_path)
+        backup_file = os.path.join(backup_dir, f"{file_name}.{timestamp}.{unique_id}.bak")
+        
+        # Copy the file to the backup location
+        os.makedirs(backup_dir, exist_ok=True)
+        shutil.copy2(file_path, backup_file)
+    except Exception as e:
+        release(size)
+        logger.error("Error creating backup of %s: %s", file_path, e)
+        return None
+    if prune:
+        prune_backups(file_path)
+    return backup_file
+
+def list_backups(file_path: str) -> List[str]:
+    """
+    List a file's backups, newest first.
+    
+    Args:
+        file_path: The absolute path to the file
+        
+    Returns:
+        The paths of the backups of this exact file
+    """
+    backup_dir = _backup_dir_for(file_path)
+    if backup_dir is None:
+        return []
+    pattern = re.compile(re.escape(os.path.basename(file_path)) + r"\.\d{8}-\d{6}\.[^.]+\.bak")
+    backups = []
+    try:
+        with os.scandir(backup_dir) as entries:
+            for entry in entries:
+                if pattern.fullmatch(entry.name) and entry.is_file():
+                    try:
+                        backups.append((entry.stat().st_ctime, entry.path))
+                    except FileNotFoundError:
+                        continue
+    except FileNotFoundError:
+        # No backups were ever taken in this directory
+        return []
+    
+    # Sort by creation time, newest first
+    backups.sort(reverse=True)
+    return [path for _, path in backups]
+
+def prune_backups(file_path: str, keep: int = BACKUP_MAX_PER_FILE) -> None:
+    """
+    Delete a file's backups beyond the newest `keep`, releasing their bytes
+    from the workspace's quota.
+    
+    Args:
+        file_path: The absolute path to the file
+        keep: Backups to keep (0 keeps all)
+    """
+    if keep <= 0:
+        return
+    for backup_path in list_backups(file_path)[keep:]:
+        remove_backup(backup_path)
+
+def remove_backup(backup_path: str) -> None:
+    """Delete a backup and release its bytes from the workspace's quota."""
+    try:
+        size = os.path.getsize(backup_path)
+        os.remove(backup_path)
+    except FileNotFoundError:
+        # Already pruned by a concurrent edit
+        return
+    release(size)
+
+def get_most_recent_backup(file_path: str) -> Optional[str]:
+    """
+    Get the most recent backup for a file.
+    
+    Args:
+        file_path: The absolute path to the file
+        
+    Returns:
+        The path to the most recent backup file or None if not found
+    """
+    backup_files = list_backups(file_path)
+    return backup_files[0] if backup_files else None
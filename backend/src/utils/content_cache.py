@@ -0,0 +1,159 @@
+"""
+Shared in-memory cache of file contents, capped by total size and kept
+current by the writes made through atomic_write.
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Optional, Tuple
+
+from src.config.settings import CONTENT_CACHE_MAX_BYTES, CONTENT_CACHE_MAX_FILE_BYTES
+from src.utils import metrics
+from src.utils.atomic_write import add_write_listener
+
+# Identifies one version of a file: (mtime_ns, size, inode). Files are only
+# ever replaced, never modified in place, so a matching key means the bytes
+# are still current; the inode tells apart a file restored from a checkpoint
+# that happens to have the same mtime and size
+CacheKey = Tuple[int, int, int]
+
+
+def _cache_key(stat_result: os.stat_result) -> CacheKey:
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+# --------------------------------------------------
+# --- Content Cache
+# --------------------------------------------------
+
+
+class ContentCache:
+    """
+    An LRU cache of file bytes keyed by absolute path. Entries are immutable
+    bytes, so readers can slice them through memoryviews without copying.
+    """
+
+    def __init__(self, max_bytes: int = CONTENT_CACHE_MAX_BYTES, max_file_bytes: int = CONTENT_CACHE_MAX_FILE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self._entries: "OrderedDict[str, Tuple[CacheKey, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def read(self, file_path: str) -> bytes:
+        """
+        Get a file's bytes, from memory if the cached copy is still current.
+
+        Args:
+            file_path: The absolute path to the file
+
+        Returns:
+            The file's content
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        return self.read_with_stat(file_path)[1]
+
+    def read_with_stat(self, file_path: str) -> Tuple[os.stat_result, bytes]:
+        """Like read, also returning the stat of the version the bytes belong to."""
+        stat_result = os.stat(file_path)
+        key = _cache_key(stat_result)
+        with self._lock:
+            cached = self._entries.get(file_path)
+            if cached is not None and cached[0] == key:
+                self._entries.move_to_end(file_path)
+                metrics.increment("content_cache.hits")
+                return stat_result, cached[1]
+        metrics.increment("content_cache.misses")
+
+        with open(file_path, 'rb') as f:
+            stat_result = os.fstat(f.fileno())
+            data = f.read()
+        self.store(file_path, data, stat_result)
+        return stat_result, data
+
+    def store(self, file_path: str, data: bytes, stat_result: os.stat_result) -> None:
+        """
+        Cache a file's bytes under the version described by stat_result.
+        Files larger than max_file_bytes are not cached.
+        """
+        if len(data) > self.max_file_bytes or len(data) != stat_result.st_size:
+            self.invalidate(file_path)
+            return
+        with self._lock:
+            old = self._entries.pop(file_path, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[file_path] = (_cache_key(stat_result), data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                metrics.increment("content_cache.evictions")
+            metrics.set_gauge("content_cache.bytes", self._size)
+
+    def invalidate(self, file_path: str) -> None:
+        """Drop a file from the cache (e.g. after it was deleted)."""
+        with self._lock:
+            old = self._entries.pop(file_path, None)
+            if old is not None:
+                self._size -= len(old[1])
+                metrics.set_gauge("content_cache.bytes", self._size)
+
+    def clear(self) -> None:
+        """Drop every cached file."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            metrics.set_gauge("content_cache.bytes", 0)
+
+# --------------------------------------------------
+# --- Shared Cache
+# --------------------------------------------------
+
+_content_cache: Optional[ContentCache] = ContentCache() if CONTENT_CACHE_MAX_BYTES > 0 else None
+
+
+def read_file_bytes(file_path: str) -> bytes:
+    """Read a file's bytes through the shared content cache (or from disk if it is disabled)."""
+    if _content_cache is None:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    return _content_cache.read(file_path)
+
+
+def read_file_bytes_with_stat(file_path: str) -> Tuple[os.stat_result, bytes]:
+    """Read a file's bytes like read_file_bytes, with the stat of the version they belong to."""
+    if _content_cache is None:
+        with open(file_path, 'rb') as f:
+            return os.fstat(f.fileno()), f.read()
+    return _content_cache.read_with_stat(file_path)
+
+
+def open_file_bytes(file_path: str) -> BinaryIO:
+    """
+    Open a file for binary reading, served from the shared content cache when
+    the file is small enough to be cached. BytesIO shares the cached bytes
+    rather than copying them; larger files are opened from disk so they can
+    be read a page at a time.
+    """
+    if _content_cache is None or os.path.getsize(file_path) > _content_cache.max_file_bytes:
+        return open(file_path, 'rb')
+    return io.BytesIO(_content_cache.read(file_path))
+
+
+def invalidate_file(file_path: str) -> None:
+    """Drop a file from the shared content cache."""
+    if _content_cache is not None:
+        _content_cache.invalidate(file_path)
+
+
+def _store_on_write(file_path: str, data: bytes, stat_result: os.stat_result) -> None:
+    """Write listener: keep the cache write-through so an edit is not followed by a re-read."""
+    _content_cache.store(file_path, data, stat_result)
+
+
+if _content_cache is not None:
+    add_write_listener(_store_on_write)
@@ -0,0 +1,59 @@
+"""
+Opaque continuation cursors for paginated 'view' results.
+"""
+
+import base64
+import json
+from typing import Any, Dict, Optional
+
+# --------------------------------------------------
+# --- Cursor Encoding Functions
+# --------------------------------------------------
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """
+    Encode pagination state as an opaque, URL-safe string.
+
+    Args:
+        state: The JSON-serializable pagination state
+
+    Returns:
+        The encoded cursor
+    """
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Dict[str, Any]]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: The encoded cursor
+
+    Returns:
+        The pagination state, or None if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def truncation_marker(max_bytes: int, cursor: str) -> str:
+    """
+    Build the note appended to a truncated view result.
+
+    Args:
+        max_bytes: The budget that was reached
+        cursor: The cursor for the next page
+
+    Returns:
+        The marker text
+    """
+    return (
+        f"\n[Output truncated at {max_bytes} bytes. "
+        f"To see more, call view again with the same path and cursor=\"{cursor}\"]"
+    )
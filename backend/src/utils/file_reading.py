@@ -0,0 +1,244 @@
+"""
+Paged, line-numbered file views and directory listings with continuation cursors.
+"""
+
+import io
+import logging
+import os
+from typing import Callable, List, Optional, Tuple
+
+from src.config.settings import VIEW_MAX_BYTES
+from src.utils.content_cache import open_file_bytes
+from src.utils.cursors import decode_cursor, encode_cursor, truncation_marker
+from src.utils.file_versions import file_version
+
+logger = logging.getLogger(__name__)
+
+# Chunk size used when scanning a file for line boundaries
+READ_CHUNK_SIZE = 1024 * 1024
+
+# --------------------------------------------------
+# --- Directory Listing Functions
+# --------------------------------------------------
+
+def list_directory_contents(directory_path: str) -> List[str]:
+    """
+    List the contents of a directory with [FILE] and [DIR] prefixes.
+    
+    Args:
+        directory_path: The absolute path to the directory
+        
+    Returns:
+        A list of directory entries with type prefixes
+    """
+    contents = []
+    
+    # scandir reports entry types without a stat() call per entry
+    with os.scandir(directory_path) as entries:
+        items = sorted(entries, key=lambda entry: entry.name)
+    
+    for item in items:
+        # Skip hidden files and backup directory
+        if item.name.startswith('.'):
+            continue
+            
+        prefix = "[DIR]" if item.is_dir() else "[FILE]"
+        contents.append(f"{prefix} {item.name}")
+    
+    return contents
+
+def list_directory_page(directory_path: str, cursor: Optional[str] = None, max_bytes: int = VIEW_MAX_BYTES) -> str:
+    """
+    List a directory like list_directory_contents, limited to max_bytes of output.
+    
+    Args:
+        directory_path: The absolute path to the directory
+        cursor: A cursor from a previous truncated listing
+        max_bytes: The output budget
+        
+    Returns:
+        The listing, ending with a truncation marker and cursor if it was cut short
+    """
+    entries = list_directory_contents(directory_path)
+    
+    index = 0
+    if cursor:
+        state = decode_cursor(cursor)
+        if state is None or "entry" not in state:
+            return "Error: Invalid cursor"
+        index = state["entry"]
+        
+    page = []
+    used = 0
+    for i in range(index, len(entries)):
+        size = len(entries[i]) + 1
+        if page and used + size > max_bytes:
+            return "\n".join(page) + truncation_marker(max_bytes, encode_cursor({"entry": i}))
+        page.append(entries[i])
+        used += size
+        
+    return "\n".join(page)
+
+# --------------------------------------------------
+# --- File Reading Functions
+# --------------------------------------------------
+
+# Called as listener(file_path, version, data, first_line, end_line) after a
+# view shows lines first_line up to (not including) end_line of a file at
+# `version`. data is the whole content the page was read from when it was
+# served from memory, else None (the file was paged from disk)
+_view_listeners: List[Callable[[str, str, Optional[bytes], int, int], None]] = []
+
+
+def add_view_listener(listener: Callable[[str, str, Optional[bytes], int, int], None]) -> None:
+    """
+    Register a function to be called after every successful file view.
+
+    Args:
+        listener: Called with the absolute file path, the version shown, the
+                  file's bytes (or None), and the 1-based range of lines
+                  shown (end exclusive); exceptions it raises are logged and
+                  ignored
+    """
+    _view_listeners.append(listener)
+
+
+def _notify_view_listeners(file_path: str, version: str, data: Optional[bytes], first_line: int, end_line: int) -> None:
+    for listener in _view_listeners:
+        try:
+            listener(file_path, version, data, first_line, end_line)
+        except Exception as e:
+            logger.exception("Error in view listener for %s: %s", file_path, e)
+
+def read_file_with_line_numbers(
+    file_path: str,
+    view_range: Optional[List[int]] = None,
+    cursor: Optional[str] = None,
+    max_bytes: int = VIEW_MAX_BYTES
+) -> str:
+    """
+    Read a file and add line numbers to each line, returning at most
+    max_bytes of output. Longer results end with a truncation marker
+    holding a cursor for the next page.
+    
+    Args:
+        file_path: The absolute path to the file
+        view_range: Optional range of lines to read [start, end]
+        cursor: A cursor from a previous truncated read (overrides view_range)
+        max_bytes: The output budget
+        
+    Returns:
+        The file content with line numbers, after a line with the file's version
+    """
+    if not os.path.exists(file_path):
+        return f"Error: File not found: {file_path}"
+        
+    try:
+        # Taken before reading, so if the file changes meanwhile an edit based on
+        # this version fails with a conflict rather than overwriting the change
+        version = file_version(os.stat(file_path))
+        
+        start = 1
+        end = None
+        offset = None
+        continued = False
+        
+        if view_range and len(view_range) == 2:
+            start = max(1, view_range[0])
+            if view_range[1] != -1:
+                end = view_range[1]
+                
+        if cursor:
+            state = decode_cursor(cursor)
+            if state is None or "line" not in state:
+                return "Error: Invalid cursor"
+            start = state["line"]
+            end = state.get("end")
+            # The byte offset is only trusted if the file hasn't changed since
+            if state.get("version") == version:
+                offset = state["offset"]
+                continued = state.get("continued", False)
+            
+        with open_file_bytes(file_path) as f:
+            if offset is None:
+                _skip_lines(f, start - 1)
+            else:
+                f.seek(offset)
+            page, end_line = _read_numbered_page(f, start, end, continued, max_bytes, version)
+            if _view_listeners:
+                data = f.getvalue() if isinstance(f, io.BytesIO) else None
+                _notify_view_listeners(file_path, version, data, start, end_line)
+            return f"[version: {version}]\n" + page
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+
+def _skip_lines(f, count: int) -> None:
+    """Advance a binary file past `count` lines without reading them into memory whole."""
+    remaining = count
+    while remaining > 0:
+        chunk = f.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return
+        newlines = chunk.count(b"\n")
+        if newlines < remaining:
+            remaining -= newlines
+            continue
+        index = -1
+        for _ in range(remaining):
+            index = chunk.index(b"\n", index + 1)
+        f.seek(index + 1 - len(chunk), os.SEEK_CUR)
+        return
+
+def _read_numbered_page(f, line_no: int, end: Optional[int], continued: bool, max_bytes: int, version: str) -> Tuple[str, int]:
+    """
+    Format lines from the current position of a binary file until the budget or `end` is reached.
+    
+    Returns:
+        The page, and the number of the first line it does not show in full
+    """
+    page = []
+    used = 0
+    position = f.tell()
+    
+    def truncated(next_line: int, next_offset: int, next_continued: bool) -> Tuple[str, int]:
+        cursor = encode_cursor({
+            "line": next_line,
+            "offset": next_offset,
+            "end": end,
+            "continued": next_continued,
+            "version": version
+        })
+        return "".join(page) + truncation_marker(max_bytes, cursor), next_line
+    
+    while end is None or line_no <= end:
+        raw = f.readline(max_bytes + 1)
+        if not raw:
+            break
+            
+        prefix = f"{line_no} (continued): " if continued else f"{line_no}: "
+        complete = raw.endswith(b"\n") or len(raw) <= max_bytes
+        
+        if not complete:
+            # A single line longer than the budget is split across pages
+            if page:
+                return truncated(line_no, position, continued)
+            cut = max_bytes
+            while cut > 0 and (raw[cut] & 0xC0) == 0x80:
+                cut -= 1
+            page.append(prefix + raw[:cut].decode('utf-8') + "\n")
+            return truncated(line_no, position + cut, True)
+            
+        size = len(prefix) + len(raw)
+        if page and used + size > max_bytes:
+            return truncated(line_no, position, continued)
+            
+        text = raw.decode('utf-8')
+        if text.endswith("\r\n"):
+            text = text[:-2] + "\n"
+        page.append(prefix + text)
+        used += size
+        position += len(raw)
+        line_no += 1
+        continued = False
+        
+    return "".join(page), line_no
@@ -2,14 +2,19 @@
 Utility functions for file operations with security checks.
 """
 
+import logging
 import os
-import shutil
-import uuid
-from datetime import datetime
-from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import Optional, Tuple
 
-from src.config.settings import WORKSPACE_DIR, BACKUP_DIR, ALLOWED_EXTENSIONS
+from src.config.settings import ALLOWED_EXTENSIONS, EDIT_SNIPPET_CONTEXT_LINES
+from src.utils.backups import create_backup, get_most_recent_backup
+from src.utils.content_cache import read_file_bytes
+from src.utils.file_versions import check_version, file_version, path_lock
+from src.utils.text_match import TIER_EXACT, TIER_LINE_ENDINGS, find_match
+from src.utils.workspace import get_workspace_dir, is_within
+from src.utils.workspace_files import write_workspace_file
+
+logger = logging.getLogger(__name__)
 
 # --------------------------------------------------
 # --- Path Validation Functions
@@ -17,7 +22,7 @@ from src.config.settings import WORKSPACE_DIR, BACKUP_DIR, ALLOWED_EXTENSIONS
 
 def validate_path(path: str) -> Tuple[bool, str, Optional[str]]:
     """
-    Validate that a path is within the allowed workspace directory and has allowed extension.
+    Validate that a path is within the current tenant's workspace directory and has allowed extension.
     
     Args:
         path: The path to validate (absolute or relative)
@@ -25,15 +30,17 @@ def validate_path(path: str) -> Tuple[bool, str, Optional[str]]:
     Returns:
         Tuple of (is_valid, absolute_path, error_message)
     """
+    workspace_dir = get_workspace_dir()
+    
     # Normalize the path
     if os.path.isabs(path):
         abs_path = os.path.normpath(path)
     else:
-        abs_path = os.path.normpath(os.path.join(WORKSPACE_DIR, path))
+        abs_path = os.path.normpath(os.path.join(workspace_dir, path))
     
-    # Check if the path is within the allowed directory
-    if not abs_path.startswith(WORKSPACE_DIR):
-        return False, abs_path, f"Access denied: Path must be within the workspace directory: {WORKSPACE_DIR}"
+    # Check if the path is within the current tenant's workspace, following symlinks
+    if not is_within(os.path.realpath(abs_path), os.path.realpath(workspace_dir)):
+        return False, abs_path, f"Access denied: Path must be within the workspace directory: {workspace_dir}"
     
     # Check if the extension is allowed (only for files, not directories)
     if os.path.isfile(abs_path) or not os.path.exists(abs_path):
@@ -44,135 +51,64 @@ def validate_path(path: str) -> Tuple[bool, str, Optional[str]]:
     return True, abs_path, None
 
 # --------------------------------------------------
-# --- Backup and Restore Functions
+# --- Edit Snippet Functions
 # --------------------------------------------------
 
-def create_backup(file_path: str) -> Optional[str]:
-    """
-    Create a backup of a file before modifying it.
-    
-    Args:
-        file_path: The absolute path to the file
-        
-    Returns:
-        The path to the backup file or None if creation failed
-    """
-    if not os.path.exists(file_path):
-        return None
-        
-    try:
-        # Create a unique backup file name with timestamp and UUID
-        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        file_name = os.path.basename(file_path)
-        backup_file = os.path.join(BACKUP_DIR, f"{file_name}.{timestamp}.{unique_id}.bak")
-        
-        # Copy the file to the backup location
-        shutil.copy2(file_path, backup_file)
-        return backup_file
-    except Exception as e:
-        print(f"Error creating backup: {str(e)}")
-        return None
-
-def get_most_recent_backup(file_path: str) -> Optional[str]:
+def format_edit_snippet(content: str, start: int, end: int, context: int = EDIT_SNIPPET_CONTEXT_LINES) -> str:
     """
-    Get the most recent backup for a file.
+    Format the lines around an edited region of a file with line numbers,
+    working from the new content already in memory.
     
     Args:
-        file_path: The absolute path to the file
+        content: The file's new content
+        start: The index in content where the edited text begins
+        end: The index in content where the edited text ends
+        context: Lines to show before and after the edit (0 disables the snippet)
         
     Returns:
-        The path to the most recent backup file or None if not found
+        The snippet, prefixed with a blank line and heading, or "" if disabled
     """
-    file_name = os.path.basename(file_path)
-    backup_files = [
-        os.path.join(BACKUP_DIR, f) for f in os.listdir(BACKUP_DIR)
-        if f.startswith(file_name + ".")
-    ]
-    
-    if not backup_files:
-        return None
+    if context <= 0 or not content:
+        return ""
         
-    # Sort by creation time, newest first
-    backup_files.sort(key=lambda x: os.path.getctime(x), reverse=True)
-    return backup_files[0]
-
-# --------------------------------------------------
-# --- Directory Listing Functions
-# --------------------------------------------------
-
-def list_directory_contents(directory_path: str) -> List[str]:
-    """
-    List the contents of a directory with [FILE] and [DIR] prefixes.
-    
-    Args:
-        directory_path: The absolute path to the directory
+    # Start of the first edited line, then back up `context` lines
+    window_start = content.rfind("\n", 0, start) + 1
+    for _ in range(context):
+        if window_start == 0:
+            break
+        window_start = content.rfind("\n", 0, window_start - 1) + 1
         
-    Returns:
-        A list of directory entries with type prefixes
-    """
-    contents = []
-    
-    for item in sorted(os.listdir(directory_path)):
-        item_path = os.path.join(directory_path, item)
+    # End of the last edited line, then forward `context` lines
+    last = max(start, end - 1)
+    window_end = content.find("\n", last)
+    for _ in range(context):
+        if window_end == -1:
+            break
+        window_end = content.find("\n", window_end + 1)
+    if window_end == -1:
+        # Reached the end of the file; don't show an empty line after a final newline
+        window_end = len(content) - 1 if content.endswith("\n") else len(content)
         
-        # Skip hidden files and backup directory
-        if item.startswith('.') or item_path == BACKUP_DIR:
-            continue
-            
-        prefix = "[DIR]" if os.path.isdir(item_path) else "[FILE]"
-        contents.append(f"{prefix} {item}")
-    
-    return contents
-
-# --------------------------------------------------
-# --- File Reading Functions
-# --------------------------------------------------
-
-def read_file_with_line_numbers(file_path: str, view_range: Optional[List[int]] = None) -> str:
-    """
-    Read a file and add line numbers to each line.
-    
-    Args:
-        file_path: The absolute path to the file
-        view_range: Optional range of lines to read [start, end]
-        
-    Returns:
-        The file content with line numbers
-    """
-    if not os.path.exists(file_path):
-        return f"Error: File not found: {file_path}"
-        
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        start = 1
-        end = len(lines)
-        
-        if view_range and len(view_range) == 2:
-            start = max(1, view_range[0])
-            if view_range[1] != -1:
-                end = min(len(lines), view_range[1])
-            
-        # Add line numbers to the selected range
-        numbered_lines = [f"{i}: {lines[i-1]}" for i in range(start, end + 1)]
-        return ''.join(numbered_lines)
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
+    first_line = content.count("\n", 0, window_start) + 1
+    lines = content[window_start:window_end].split("\n")
+    numbered = "\n".join(f"{first_line + i}: {line}" for i, line in enumerate(lines))
+    return f"\n\nEdited region:\n{numbered}"
 
 # --------------------------------------------------
 # --- File Modification Functions
 # --------------------------------------------------
 
-def replace_text_in_file(file_path: str, old_str: str, new_str: str) -> Tuple[bool, str]:
+def replace_text_in_file(file_path: str, old_str: str, new_str: str, expected_version: Optional[str] = None) -> Tuple[bool, str]:
     """
     Replace text in a file, ensuring there's exactly one match.
+    An exact match is tried first, then matches that ignore line-ending
+    and per-line whitespace differences.
     
     Args:
         file_path: The absolute path to the file
         old_str: The text to replace
         new_str: The new text
+        expected_version: Fail with a conflict unless the file is still at this version
         
     Returns:
         Tuple of (success, message)
@@ -181,31 +117,40 @@ def replace_text_in_file(file_path: str, old_str: str, new_str: str) -> Tuple[bo
         return False, f"Error: File not found: {file_path}"
         
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with path_lock(file_path):
+            conflict = check_version(file_path, expected_version)
+            if conflict:
+                return False, conflict
+                
+            # Keep the file's own line endings (no newline translation)
+            content = read_file_bytes(file_path).decode('utf-8')
+                
+            match = find_match(content, old_str, new_str)
             
-        # Check for the number of matches
-        match_count = content.count(old_str)
-        
-        if match_count == 0:
-            return False, "Error: No match found for replacement text"
-        elif match_count > 1:
-            return False, f"Error: Found {match_count} matches for replacement text. Please provide more context for a unique match."
+            if match.ambiguous:
+                lines = ", ".join(str(line) for line in match.candidate_lines)
+                return False, f"Error: Found {len(match.candidate_lines)} matches for replacement text at lines {lines}. Please provide more context for a unique match."
+            elif not match.found:
+                return False, "Error: No match found for replacement text"
+                
+            # Create a backup before modifying
+            backup_path = create_backup(file_path)
             
-        # Create a backup before modifying
-        backup_path = create_backup(file_path)
-        
-        # Perform the replacement
-        new_content = content.replace(old_str, new_str)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+            # Perform the replacement
+            new_content = content[:match.start] + match.replacement + content[match.end:]
             
-        return True, f"Successfully replaced text. Backup created at {os.path.basename(backup_path)}."
+            write_workspace_file(file_path, new_content)
+            version = file_version(os.stat(file_path))
+        
+        note = ""
+        if match.tier != TIER_EXACT:
+            note = f" (matched ignoring {'line endings' if match.tier == TIER_LINE_ENDINGS else 'whitespace differences'})"
+        snippet = format_edit_snippet(new_content, match.start, match.start + len(match.replacement))
+        return True, f"Successfully replaced text{note}. Backup created at {os.path.basename(backup_path) if backup_path else 'N/A'}. New version: {version}.{snippet}"
     except Exception as e:
         return False, f"Error replacing text: {str(e)}"
 
-def insert_text_at_line(file_path: str, insert_line: int, new_str: str) -> Tuple[bool, str]:
+def insert_text_at_line(file_path: str, insert_line: int, new_str: str, expected_version: Optional[str] = None) -> Tuple[bool, str]:
     """
     Insert text after a specific line in the file.
     
@@ -213,42 +158,49 @@ def insert_text_at_line(file_path: str, insert_line: int, new_str: str) -> Tuple
         file_path: The absolute path to the file
         insert_line: The line number after which to insert text (0 means beginning of file)
         new_str: The text to insert
+        expected_version: Fail with a conflict unless the file is still at this version
         
     Returns:
         Tuple of (success, message)
     """
     try:
-        # Create the file if it doesn't exist
-        if not os.path.exists(file_path):
-            directory = os.path.dirname(file_path)
-            if not os.path.exists(directory):
-                os.makedirs(directory)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                pass
-        
-        # Create a backup before modifying
-        backup_path = create_backup(file_path)
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        # Ensure the insert_line is valid
-        if insert_line < 0:
-            insert_line = 0
-        elif insert_line > len(lines):
-            insert_line = len(lines)
+        with path_lock(file_path):
+            conflict = check_version(file_path, expected_version)
+            if conflict:
+                return False, conflict
+                
+            if os.path.exists(file_path):
+                # Create a backup before modifying
+                backup_path = create_backup(file_path)
+                
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+            else:
+                # The file will be created by the write below
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                backup_path = None
+                lines = []
+                
+            # Ensure the insert_line is valid
+            if insert_line < 0:
+                insert_line = 0
+            elif insert_line > len(lines):
+                insert_line = len(lines)
+                
+            # Add a newline to the inserted text if needed
+            if not new_str.endswith('\n'):
+                new_str += '\n'
+                
+            # Insert the text
+            lines.insert(insert_line, new_str)
+            new_content = "".join(lines)
             
-        # Add a newline to the inserted text if needed
-        if not new_str.endswith('\n'):
-            new_str += '\n'
-            
-        # Insert the text
-        lines.insert(insert_line, new_str)
+            write_workspace_file(file_path, new_content)
+            version = file_version(os.stat(file_path))
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
-            
-        return True, f"Successfully inserted text at line {insert_line}. Backup created at {os.path.basename(backup_path) if backup_path else 'N/A'}."
+        start = sum(map(len, lines[:insert_line]))
+        snippet = format_edit_snippet(new_content, start, start + len(new_str))
+        return True, f"Successfully inserted text at line {insert_line}. Backup created at {os.path.basename(backup_path) if backup_path else 'N/A'}. New version: {version}.{snippet}"
     except Exception as e:
         return False, f"Error inserting text: {str(e)}"
 
@@ -268,20 +220,21 @@ def create_new_file(file_path: str, file_text: str) -> Tuple[bool, str]:
         Tuple of (success, message)
     """
     try:
-        # Check if the file already exists
-        if os.path.exists(file_path):
-            return False, f"Error: File already exists: {file_path}"
+        with path_lock(file_path):
+            # Check if the file already exists
+            if os.path.exists(file_path):
+                return False, f"Error: File already exists: {file_path}"
+                
+            # Create the directory if it doesn't exist
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                
+            # Write the content to the file, failing if a writer outside the editor created it meanwhile
+            write_workspace_file(file_path, file_text, exclusive=True)
+            version = file_version(os.stat(file_path))
             
-        # Create the directory if it doesn't exist
-        directory = os.path.dirname(file_path)
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-            
-        # Write the content to the file
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(file_text)
-            
-        return True, f"Successfully created file: {file_path}"
+        return True, f"Successfully created file: {file_path} (version {version})"
+    except FileExistsError:
+        return False, f"Error: File already exists: {file_path}"
     except Exception as e:
         return False, f"Error creating file: {str(e)}"
 
@@ -300,13 +253,15 @@ def restore_from_backup(file_path: str) -> Tuple[bool, str]:
         Tuple of (success, message)
     """
     try:
-        backup_path = get_most_recent_backup(file_path)
-        
-        if not backup_path:
-            return False, f"Error: No backup found for {file_path}"
+        with path_lock(file_path):
+            backup_path = get_most_recent_backup(file_path)
             
-        # Copy the backup back to the original location
-        shutil.copy2(backup_path, file_path)
+            if not backup_path:
+                return False, f"Error: No backup found for {file_path}"
+                
+            # Write the backup's content back to the original location
+            with open(backup_path, 'rb') as f:
+                write_workspace_file(file_path, f.read())
         
         return True, f"Successfully restored from backup: {os.path.basename(backup_path)}"
     except Exception as e:
@@ -0,0 +1,107 @@
+"""
+File version tokens and per-path edit locks for optimistic concurrency.
+"""
+
+import hashlib
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterable, Iterator, Optional
+
+from src.config.settings import FILE_LOCK_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: edits are serialized within the process only
+    fcntl = None
+
+# --------------------------------------------------
+# --- File Versions
+# --------------------------------------------------
+
+def file_version(stat_result: os.stat_result) -> str:
+    """
+    Build a file's version token from its inode, modification time and size.
+    Any write through write_workspace_file replaces the file, which changes at least one of them.
+    """
+    return f"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+
+
+def check_version(file_path: str, expected_version: Optional[str]) -> Optional[str]:
+    """
+    Check that a file is still at the version an edit was based on.
+    
+    Args:
+        file_path: The absolute path to the file
+        expected_version: The version returned by view (or a previous edit); None skips the check
+        
+    Returns:
+        An error message on a conflict, otherwise None
+    """
+    if not expected_version:
+        return None
+    try:
+        current = file_version(os.stat(file_path))
+    except FileNotFoundError:
+        return f"Error: Version conflict: {file_path} no longer exists"
+    if current != expected_version.strip():
+        return (
+            f"Error: Version conflict: the file has changed since version {expected_version} "
+            f"(current version {current}). View it again before editing."
+        )
+    return None
+
+
+# absolute path -> [lock, number of holders and waiters]
+_path_locks: Dict[str, list] = {}
+_path_locks_guard = threading.Lock()
+
+
+@contextmanager
+def path_lock(file_path: str) -> Iterator[None]:
+    """
+    Hold a file's edit lock for one read-check-write, so a version check and
+    the write based on it cannot interleave with another edit of the file.
+    Threads of this process wait on an in-process lock first, then the
+    holder takes the path's lock file, which excludes other processes.
+    """
+    with _path_locks_guard:
+        entry = _path_locks.setdefault(file_path, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0], _file_lock(file_path):
+            yield
+    finally:
+        with _path_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _path_locks[file_path]
+
+
+@contextmanager
+def _file_lock(file_path: str) -> Iterator[None]:
+    """Hold an exclusive flock on the path's lock file (named by a hash of the path)."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(FILE_LOCK_DIR, exist_ok=True)
+    name = hashlib.sha1(file_path.encode("utf-8", "surrogateescape")).hexdigest() + ".lock"
+    fd = os.open(os.path.join(FILE_LOCK_DIR, name), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+@contextmanager
+def path_locks(file_paths: Iterable[str]) -> Iterator[None]:
+    """
+    Hold the edit locks of several files at once (for multi-file commands),
+    taken in sorted order so two such commands cannot deadlock.
+    """
+    with ExitStack() as stack:
+        for file_path in sorted(set(file_paths)):
+            stack.enter_context(path_lock(file_path))
+        yield
@@ -0,0 +1,245 @@
+"""
+Line diffs for 'view_diff': a shortest edit script between two versions of a
+file (common prefix and suffix trimmed, unique lines as anchors, Myers'
+algorithm between them), and its formatting as unified diff hunks.
+"""
+
+import bisect
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from src.config.settings import VIEW_DIFF_CONTEXT_LINES
+from src.utils import metrics
+
+# Past this many inserted plus deleted lines between two anchor lines the
+# changed region is shown as one replacement instead of being diffed, which
+# keeps the cost bounded
+MAX_EDIT_DISTANCE = 2000
+
+# (tag, old start, old end, new start, new end), as in difflib
+Opcode = Tuple[str, int, int, int, int]
+
+# --------------------------------------------------
+# --- Line Diff
+# --------------------------------------------------
+
+
+def _line_ids(old: List[bytes], new: List[bytes]) -> Tuple[List[int], List[int]]:
+    """Replace each line by a small integer, equal for equal lines, so lines are hashed once and compared as ints."""
+    ids: Dict[bytes, int] = {}
+    old_ids = [ids.setdefault(line, len(ids)) for line in old]
+    new_ids = [ids.setdefault(line, len(ids)) for line in new]
+    return old_ids, new_ids
+
+
+def _matching_blocks(a: List[int], b: List[int], max_edits: int) -> Optional[List[Tuple[int, int, int]]]:
+    """
+    Find the runs of equal lines of a shortest edit script (Myers' greedy
+    algorithm), in O((N + M) * D) time for D inserted plus deleted lines.
+
+    Returns:
+        (a index, b index, length) runs in order, or None if D exceeds max_edits
+    """
+    n, m = len(a), len(b)
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, max_edits) + 1):
+        trace.append(v.copy())
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace: List[Dict[int, int]], x: int, y: int) -> List[Tuple[int, int, int]]:
+    """Walk the saved frontiers back from the end, collecting the diagonal (equal) runs."""
+    blocks = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        # The run of equal lines ending at (x, y) starts just after the
+        # deletion (a step right) or insertion (a step down) that led to it
+        start_x = prev_x + 1 if prev_k == k - 1 else prev_x
+        if x > start_x:
+            blocks.append((start_x, y - (x - start_x), x - start_x))
+        x, y = prev_x, prev_y
+    blocks.reverse()
+    return blocks
+
+
+def _unique_anchors(a: List[int], b: List[int]) -> List[Tuple[int, int]]:
+    """
+    Pair up the lines that occur exactly once in each list, keeping the
+    longest run of pairs in the same order in both (as patience diff does).
+    Found in O((N + M) + U log U) time for U unique lines.
+    """
+    counts_a = Counter(a)
+    counts_b = Counter(b)
+    positions_b = {line: j for j, line in enumerate(b) if counts_b[line] == 1}
+    pairs = [(i, positions_b[line]) for i, line in enumerate(a) if counts_a[line] == 1 and line in positions_b]
+
+    # Longest increasing subsequence of the b positions, by patience sorting
+    tails: List[int] = []
+    tail_pairs: List[int] = []
+    previous: List[int] = []
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect.bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_pairs.append(index)
+        else:
+            tails[pile] = j
+            tail_pairs[pile] = index
+        previous.append(tail_pairs[pile - 1] if pile else -1)
+
+    anchors = []
+    index = tail_pairs[-1] if tail_pairs else -1
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _blocks_between(
+    a: List[int], b: List[int], a_start: int, a_end: int, b_start: int, b_end: int, max_edits: int
+) -> List[Tuple[int, int, int]]:
+    """Equal runs between a[a_start:a_end] and b[b_start:b_end]: their common prefix and suffix, then Myers on the rest."""
+    prefix = 0
+    limit = min(a_end - a_start, b_end - b_start)
+    while prefix < limit and a[a_start + prefix] == b[b_start + prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[a_end - 1 - suffix] == b[b_end - 1 - suffix]:
+        suffix += 1
+
+    a_start, b_start = a_start + prefix, b_start + prefix
+    middle = _matching_blocks(a[a_start:a_end - suffix], b[b_start:b_end - suffix], max_edits)
+    if middle is None:
+        middle = []
+        metrics.increment("view_diff.edit_limit_reached")
+    return (
+        [(a_start - prefix, b_start - prefix, prefix)]
+        + [(i + a_start, j + b_start, size) for i, j, size in middle]
+        + [(a_end - suffix, b_end - suffix, suffix)]
+    )
+
+
+def diff_lines(old: List[bytes], new: List[bytes], max_edits: int = MAX_EDIT_DISTANCE) -> List[Opcode]:
+    """
+    Compare two lists of lines. A linear first pass skips the common prefix
+    and suffix and anchors on lines that occur once in each list; only the
+    gaps between anchors are diffed with Myers, so the cost follows the size
+    of each changed region rather than of the whole file.
+
+    Args:
+        old: The earlier lines
+        new: The current lines
+        max_edits: Beyond this many inserted plus deleted lines between two anchors, that gap is one "replace"
+
+    Returns:
+        Opcodes covering both lists, like difflib.SequenceMatcher.get_opcodes
+    """
+    a, b = _line_ids(old, new)
+    blocks: List[Tuple[int, int, int]] = []
+    a_start = b_start = 0
+    for i, j in _unique_anchors(a, b) + [(len(a), len(b))]:
+        blocks.extend(_blocks_between(a, b, a_start, i, b_start, j, max_edits))
+        blocks.append((i, j, 1 if i < len(a) else 0))
+        a_start, b_start = i + 1, j + 1
+
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for block_i, block_j, size in blocks:
+        if i < block_i and j < block_j:
+            opcodes.append(("replace", i, block_i, j, block_j))
+        elif i < block_i:
+            opcodes.append(("delete", i, block_i, j, j))
+        elif j < block_j:
+            opcodes.append(("insert", i, i, j, block_j))
+        if size:
+            if opcodes and opcodes[-1][0] == "equal" and opcodes[-1][2] == block_i:
+                _, i1, _, j1, _ = opcodes.pop()
+                opcodes.append(("equal", i1, block_i + size, j1, block_j + size))
+            else:
+                opcodes.append(("equal", block_i, block_i + size, block_j, block_j + size))
+        i, j = block_i + size, block_j + size
+    return opcodes
+
+# --------------------------------------------------
+# --- Unified Diff Formatting
+# --------------------------------------------------
+
+
+def _hunk_range(start: int, length: int) -> str:
+    """A hunk header range (1-based; an empty range names the line before it)."""
+    if length == 1:
+        return str(start + 1)
+    if not length:
+        return f"{start},0"
+    return f"{start + 1},{length}"
+
+
+def _diff_line(prefix: str, line: bytes) -> List[str]:
+    text = line.decode("utf-8", "replace")
+    stripped = text.rstrip("\r\n")
+    if stripped == text:
+        return [prefix + text, "\\ No newline at end of file"]
+    return [prefix + stripped]
+
+
+def format_hunks(old: List[bytes], new: List[bytes], opcodes: List[Opcode], context: int = VIEW_DIFF_CONTEXT_LINES) -> List[str]:
+    """
+    Format opcodes as unified diff hunks with `context` unchanged lines around each change.
+
+    Returns:
+        The hunk lines, without the ---/+++ header
+    """
+    changes = [opcode for opcode in opcodes if opcode[0] != "equal"]
+    if not changes:
+        return []
+
+    # Merge changes whose context would touch into one hunk
+    groups: List[List[Opcode]] = [[changes[0]]]
+    for opcode in changes[1:]:
+        if opcode[1] - groups[-1][-1][2] <= 2 * context:
+            groups[-1].append(opcode)
+        else:
+            groups.append([opcode])
+
+    lines: List[str] = []
+    for group in groups:
+        old_start = max(group[0][1] - context, 0)
+        old_end = min(group[-1][2] + context, len(old))
+        new_start = group[0][3] - (group[0][1] - old_start)
+        new_end = group[-1][4] + (old_end - group[-1][2])
+        lines.append(f"@@ -{_hunk_range(old_start, old_end - old_start)} +{_hunk_range(new_start, new_end - new_start)} @@")
+
+        i = old_start
+        for _, i1, i2, j1, j2 in group:
+            for line in old[i:i1]:
+                lines.extend(_diff_line(" ", line))
+            for line in old[i1:i2]:
+                lines.extend(_diff_line("-", line))
+            for line in new[j1:j2]:
+                lines.extend(_diff_line("+", line))
+            i = i2
+        for line in old[i:old_end]:
+            lines.extend(_diff_line(" ", line))
+    return lines
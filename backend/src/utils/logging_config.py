@@ -0,0 +1,191 @@
+"""
+Structured logging. A logging call only queues the record; a background
+thread formats it (as JSON by default) and writes it to stdout, so a slow
+log consumer never stalls request handling.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config.settings import LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_DEBUG_SAMPLE_RATE
+from src.utils import metrics
+from src.utils.workspace import get_tenant
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# --------------------------------------------------
+# --- Log Context
+# --------------------------------------------------
+
+# Fields added to every record logged while they are bound (request id, session id, command, path...)
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+
+def bind_log_context(**fields: Any) -> Token:
+    """
+    Add fields to the records logged by the current request (or task).
+
+    Returns:
+        A token for reset_log_context
+    """
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_log_context(token: Token) -> None:
+    """Remove the fields added by bind_log_context."""
+    _log_context.reset(token)
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Add fields to the records logged within a block."""
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+# --------------------------------------------------
+# --- Filters, Formatter and Handler
+# --------------------------------------------------
+
+# Attributes every LogRecord has; any others were passed with extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate: float = LOG_DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+class ContextFilter(logging.Filter):
+    """Copy the log context and tenant onto a record, in the thread that logged it."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        if not hasattr(record, "tenant_id"):
+            record.tenant_id = get_tenant()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one line of JSON, including its context and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that drops records, and counts them, when the queue is full instead of waiting."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments and render the traceback now, while they are
+        # still valid, but leave formatting to the writer thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("logging.dropped")
+
+# --------------------------------------------------
+# --- Setup
+# --------------------------------------------------
+
+_listener: Optional[logging.handlers.QueueListener] = None
+# The root handlers in place before configure_logging, put back by stop_logging
+_previous_handlers: List[logging.Handler] = []
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT) -> bool:
+    """
+    Route all logging through a bounded queue to a writer thread. Safe to call more than once.
+
+    Args:
+        level: The root log level
+        log_format: "json" or "text"
+
+    Returns:
+        True if this call set logging up, False if it already was
+    """
+    global _listener, _previous_handlers
+    if _listener is not None:
+        return False
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter())
+    handler.addFilter(ContextFilter())
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    # A copy of this module from before a reload may have set up logging
+    # already; replace its handler and writer thread rather than stack on them
+    previous_handlers = []
+    for existing in root.handlers:
+        listener = getattr(existing, "listener", None)
+        if listener is not None:
+            listener.stop()
+            previous_handlers.extend(getattr(existing, "previous_handlers", []))
+        else:
+            previous_handlers.append(existing)
+    _previous_handlers = previous_handlers
+    root.handlers = [handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    handler.listener = _listener
+    handler.previous_handlers = previous_handlers
+    atexit.register(stop_logging)
+    return True
+
+
+def stop_logging() -> None:
+    """Write out the queued records, stop the writer thread and put back the previous root handlers."""
+    global _listener, _previous_handlers
+    if _listener is not None:
+        logging.getLogger().handlers = _previous_handlers
+        _previous_handlers = []
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,98 @@
+"""
+In-process metrics: counters, gauges and timing summaries.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict
+
+# --------------------------------------------------
+# --- Metric Storage
+# --------------------------------------------------
+
+# Number of recent observations kept per timing for percentiles
+TIMING_WINDOW = 1024
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_timings: Dict[str, Dict[str, Any]] = {}
+
+# --------------------------------------------------
+# --- Recording Functions
+# --------------------------------------------------
+
+def increment(name: str, value: float = 1) -> None:
+    """
+    Add to a counter.
+
+    Args:
+        name: The counter name
+        value: The amount to add
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    """
+    Set a gauge to its current value.
+
+    Args:
+        name: The gauge name
+        value: The current value
+    """
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, seconds: float) -> None:
+    """
+    Record a duration.
+
+    Args:
+        name: The timing name
+        seconds: The observed duration in seconds
+    """
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = {"count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=TIMING_WINDOW)}
+            _timings[name] = timing
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+        timing["recent"].append(seconds)
+
+# --------------------------------------------------
+# --- Reporting Functions
+# --------------------------------------------------
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Return the current value of every metric.
+
+    Returns:
+        A dictionary with counters, gauges and timing summaries
+    """
+    with _lock:
+        timings = {}
+        for name, timing in _timings.items():
+            recent = sorted(timing["recent"])
+            timings[name] = {
+                "count": timing["count"],
+                "mean": timing["total"] / timing["count"],
+                "max": timing["max"],
+                "p50": _percentile(recent, 0.50),
+                "p95": _percentile(recent, 0.95),
+                "p99": _percentile(recent, 0.99)
+            }
+        return {"counters": dict(_counters), "gauges": dict(_gauges), "timings": timings}
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    """Return the value at a fraction of a sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
@@ -0,0 +1,253 @@
+"""
+File outlines (classes, functions, sections and their line spans) with a
+parse cache that is refreshed when files are written.
+"""
+
+import ast
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from src.config.settings import OUTLINE_CACHE_SIZE
+from src.utils.atomic_write import add_write_listener
+
+# An outline entry: (depth, kind, name, start_line, end_line)
+Entry = Tuple[int, str, str, int, int]
+
+# --------------------------------------------------
+# --- Python Outliner
+# --------------------------------------------------
+
+def _outline_python(text: str) -> Tuple[List[Entry], Optional[str]]:
+    """Outline Python source with ast; falls back to regexes on a syntax error."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError) as e:
+        note = f"Syntax error at line {getattr(e, 'lineno', '?')}; outline is approximate"
+        return _outline_regex(text, PYTHON_PATTERNS), note
+
+    entries: List[Entry] = []
+
+    def visit(nodes, depth: int, parent_is_class: bool) -> None:
+        for node in nodes:
+            if isinstance(node, ast.ClassDef):
+                kind = "class"
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if parent_is_class else "function"
+                if isinstance(node, ast.AsyncFunctionDef):
+                    kind = "async " + kind
+            else:
+                continue
+            # Decorators belong to the definition's span
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            entries.append((depth, kind, node.name, start, node.end_lineno or node.lineno))
+            visit(node.body, depth + 1, kind == "class")
+
+    visit(tree.body, 0, False)
+    return entries, None
+
+# --------------------------------------------------
+# --- Regex Outliners
+# --------------------------------------------------
+
+# (pattern, kind) pairs; the pattern's "name" group is the symbol and its
+# "indent" group (if any) sets the nesting depth
+PYTHON_PATTERNS = [
+    (re.compile(r"^(?P<indent>\s*)class\s+(?P<name>\w+)"), "class"),
+    (re.compile(r"^(?P<indent>\s*)(?:async\s+)?def\s+(?P<name>\w+)"), "function"),
+]
+
+SCRIPT_PATTERNS = [
+    (re.compile(r"^(?P<indent>\s*)(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(?P<name>[\w$]+)"), "class"),
+    (re.compile(r"^(?P<indent>\s*)(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>[\w$]+)"), "function"),
+    (re.compile(r"^(?P<indent>\s*)(?:export\s+)?(?:const|let|var)\s+(?P<name>[\w$]+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function|\([^)]*\)\s*(?::[^=]+)?=>|[\w$]+\s*=>)"), "function"),
+    (re.compile(r"^(?P<indent>\s*)(?:export\s+)?interface\s+(?P<name>[\w$]+)"), "interface"),
+    (re.compile(r"^(?P<indent>\s*)(?:export\s+)?type\s+(?P<name>[\w$]+)\s*(?:<[^>]*>)?\s*="), "type"),
+    (re.compile(r"^(?P<indent>\s+)(?:(?:public|private|protected|static|async|get|set)\s+)*(?P<name>(?!if\b|for\b|while\b|switch\b|catch\b|return\b)[\w$]+)\s*\([^)]*\)\s*(?::[^{]+)?\{\s*$"), "method"),
+]
+
+MARKDOWN_PATTERNS = [
+    (re.compile(r"^(?P<indent>#{1,6})\s+(?P<name>.+?)\s*#*\s*$"), "heading"),
+]
+
+YAML_PATTERNS = [
+    (re.compile(r"^(?P<indent> {0,2})(?P<name>[\w.-]+):(?:\s|$)"), "key"),
+]
+
+JSON_PATTERNS = [
+    (re.compile(r'^(?P<indent>\s{0,4})"(?P<name>[^"]+)"\s*:'), "key"),
+]
+
+CSS_PATTERNS = [
+    (re.compile(r"^(?P<indent>\s*)(?P<name>@media[^{]*|[^\s{}@/][^{};]*?)\s*\{"), "rule"),
+]
+
+HTML_PATTERNS = [
+    (re.compile(r"^(?P<indent>\s*)<(?P<name>(?:head|body|header|footer|main|nav|section|article|aside|form|script|style|template)\b[^>]*)>", re.IGNORECASE), "element"),
+    (re.compile(r"^(?P<indent>\s*)<(?P<name>\w+[^>]*\bid=\"[^\"]+\"[^>]*)>"), "element"),
+]
+
+# Lines starting with these close the block above them
+CLOSING_CHARS = "}])<"
+
+REGEX_OUTLINERS = {
+    ".js": SCRIPT_PATTERNS, ".jsx": SCRIPT_PATTERNS,
+    ".ts": SCRIPT_PATTERNS, ".tsx": SCRIPT_PATTERNS,
+    ".md": MARKDOWN_PATTERNS,
+    ".yaml": YAML_PATTERNS, ".yml": YAML_PATTERNS,
+    ".json": JSON_PATTERNS,
+    ".css": CSS_PATTERNS,
+    ".html": HTML_PATTERNS,
+}
+
+
+def _outline_regex(text: str, patterns, indent_scoped: bool = True) -> List[Entry]:
+    """
+    Outline text line by line with regexes.
+
+    With indent_scoped, a symbol's block ends before the next non-blank line
+    that is not indented deeper (a closing bracket on that line is included).
+    Otherwise (e.g. Markdown headings) it ends before the next symbol at the
+    same or a shallower level.
+    """
+    lines = text.split("\n")
+    found = []
+    for number, line in enumerate(lines, 1):
+        for pattern, kind in patterns:
+            match = pattern.match(line)
+            if match:
+                indent = len(match.groupdict().get("indent") or "")
+                found.append((indent, kind, match.group("name").strip(), number))
+                break
+
+    last_line = len(lines) - 1 if text.endswith("\n") else len(lines)
+    levels = sorted({indent for indent, _, _, _ in found})
+    entries: List[Entry] = []
+    for i, (indent, kind, name, start) in enumerate(found):
+        if indent_scoped:
+            end = _block_end(lines, start, indent, last_line)
+        else:
+            end = last_line
+            for later_indent, _, _, later_start in found[i + 1:]:
+                if later_indent <= indent:
+                    end = later_start - 1
+                    break
+        entries.append((levels.index(indent), kind, name, start, max(end, start)))
+    return entries
+
+
+def _block_end(lines: List[str], start: int, indent: int, last_line: int) -> int:
+    """Find the last line of an indented block starting at (1-based) line start."""
+    end = start
+    for number in range(start + 1, last_line + 1):
+        line = lines[number - 1]
+        stripped = line.lstrip()
+        if not stripped:
+            continue
+        if len(line) - len(stripped) <= indent:
+            return number if stripped[0] in CLOSING_CHARS else end
+        end = number
+    return end
+
+# --------------------------------------------------
+# --- Outline Cache
+# --------------------------------------------------
+
+# abs_path -> ((mtime_ns, size), entries, note)
+_cache: "OrderedDict[str, Tuple[Tuple[int, int], List[Entry], Optional[str]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _build(file_path: str, text: str) -> Optional[Tuple[List[Entry], Optional[str]]]:
+    """Outline text according to the file's extension; None if it has no outliner."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".py":
+        return _outline_python(text)
+    if ext in REGEX_OUTLINERS:
+        patterns = REGEX_OUTLINERS[ext]
+        return _outline_regex(text, patterns, indent_scoped=patterns is not MARKDOWN_PATTERNS), None
+    return None
+
+
+def _store(file_path: str, key: Tuple[int, int], entries: List[Entry], note: Optional[str]) -> None:
+    with _cache_lock:
+        _cache[file_path] = (key, entries, note)
+        _cache.move_to_end(file_path)
+        while len(_cache) > OUTLINE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _refresh_on_write(file_path: str, data: bytes, stat_result: os.stat_result) -> None:
+    """Write listener: re-outline files already in the cache from the bytes just written."""
+    with _cache_lock:
+        if file_path not in _cache:
+            return
+    built = _build(file_path, data.decode("utf-8", errors="replace"))
+    if built is not None:
+        _store(file_path, (stat_result.st_mtime_ns, stat_result.st_size), *built)
+
+
+add_write_listener(_refresh_on_write)
+
+# --------------------------------------------------
+# --- Outline Functions
+# --------------------------------------------------
+
+def get_outline(file_path: str) -> Optional[Tuple[List[Entry], Optional[str]]]:
+    """
+    Get a file's outline, parsing it only if it changed since it was last outlined.
+
+    Args:
+        file_path: The absolute path to the file
+
+    Returns:
+        (entries, note) where note explains an approximate outline, or None
+        if the file type has no outliner
+    """
+    stat_result = os.stat(file_path)
+    key = (stat_result.st_mtime_ns, stat_result.st_size)
+    with _cache_lock:
+        cached = _cache.get(file_path)
+        if cached is not None and cached[0] == key:
+            _cache.move_to_end(file_path)
+            return cached[1], cached[2]
+
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    built = _build(file_path, text)
+    if built is not None:
+        _store(file_path, key, *built)
+    return built
+
+
+def format_outline(file_path: str) -> Tuple[bool, str]:
+    """
+    Render a file's outline with line ranges that can be passed to view_range.
+
+    Args:
+        file_path: The absolute path to the file
+
+    Returns:
+        Tuple of (success, message)
+    """
+    if not os.path.isfile(file_path):
+        return False, f"Error: File not found: {file_path}"
+
+    try:
+        outline = get_outline(file_path)
+    except Exception as e:
+        return False, f"Error building outline: {str(e)}"
+    if outline is None:
+        ext = os.path.splitext(file_path)[1] or "(none)"
+        return False, f"Error: No outline available for files with extension {ext}; use view instead"
+
+    entries, note = outline
+    header = f"Outline of {os.path.basename(file_path)} ({len(entries)} symbols)"
+    lines = [header + (f" - {note}" if note else "") + ":"]
+    for depth, kind, name, start, end in entries:
+        lines.append(f"{'  ' * depth}{kind} {name} [{start}-{end}]")
+    if not entries:
+        lines.append("(no symbols found)")
+    return True, "\n".join(lines)
@@ -0,0 +1,374 @@
+"""
+Transactional application of multi-file unified diffs.
+"""
+
+import contextvars
+import logging
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config.settings import PATCH_MAX_WORKERS
+from src.utils.backups import create_backup, prune_backups, remove_backup
+from src.utils.file_utils import validate_path
+from src.utils.file_versions import check_version, file_version, path_locks
+from src.utils.quota import QuotaExceededError
+from src.utils.workspace_files import remove_workspace_file, write_workspace_file
+
+logger = logging.getLogger(__name__)
+
+DEV_NULL = "/dev/null"
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# --------------------------------------------------
+# --- Patch Structures
+# --------------------------------------------------
+
+
+class Hunk:
+    """One @@ section of a file diff."""
+
+    __slots__ = ("old_start", "old_lines", "new_lines", "added", "removed")
+
+    def __init__(self, old_start: int):
+        self.old_start = old_start
+        self.old_lines: List[str] = []
+        self.new_lines: List[str] = []
+        self.added = 0
+        self.removed = 0
+
+
+class FilePatch:
+    """The hunks for one file, plus what the patch does to the file as a whole."""
+
+    def __init__(self, old_path: str, new_path: str):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.hunks: List[Hunk] = []
+        # Filled in by validation
+        self.abs_path = ""
+        self.original: Optional[str] = None
+        self.patched: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        return self.old_path if self.is_delete else self.new_path
+
+    @property
+    def is_create(self) -> bool:
+        return self.old_path == DEV_NULL
+
+    @property
+    def is_delete(self) -> bool:
+        return self.new_path == DEV_NULL
+
+# --------------------------------------------------
+# --- Parsing Functions
+# --------------------------------------------------
+
+def parse_unified_diff(patch: str) -> List[FilePatch]:
+    """
+    Parse a unified diff (plain or git style) into per-file patches.
+
+    Args:
+        patch: The diff text
+
+    Returns:
+        The file patches in the order they appear
+
+    Raises:
+        ValueError: If the diff is malformed
+    """
+    files: List[FilePatch] = []
+    current: Optional[FilePatch] = None
+    # Not splitlines(): form feeds and other separators are ordinary characters in a diff
+    lines = patch.replace("\r\n", "\n").split("\n")
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            current = FilePatch(_strip_path(line[4:]), _strip_path(lines[i + 1][4:]))
+            files.append(current)
+            i += 2
+            continue
+
+        header = HUNK_HEADER.match(line)
+        if not header:
+            # Anything else ("diff --git", "index ...", "\ No newline at end of file") is ignored
+            i += 1
+            continue
+        if current is None:
+            raise ValueError(f"Hunk without file header at patch line {i + 1}")
+
+        hunk = Hunk(int(header.group(1)))
+        old_remaining = int(header.group(2) or 1)
+        new_remaining = int(header.group(4) or 1)
+        i += 1
+        while old_remaining > 0 or new_remaining > 0:
+            if i >= len(lines):
+                raise ValueError(f"Hunk at @@ -{hunk.old_start} is shorter than its header says")
+            line = lines[i]
+            i += 1
+            kind, text = line[:1], line[1:]
+            if kind == "\\":
+                continue
+            if kind == "-":
+                hunk.old_lines.append(text)
+                hunk.removed += 1
+                old_remaining -= 1
+            elif kind == "+":
+                hunk.new_lines.append(text)
+                hunk.added += 1
+                new_remaining -= 1
+            elif kind in (" ", ""):
+                # An empty line is a context line whose trailing space was stripped
+                hunk.old_lines.append(text)
+                hunk.new_lines.append(text)
+                old_remaining -= 1
+                new_remaining -= 1
+            else:
+                raise ValueError(f"Unexpected line in hunk at patch line {i}: {line[:40]}")
+        current.hunks.append(hunk)
+
+    if not files:
+        raise ValueError("No file headers (--- / +++) found in patch")
+    for file_patch in files:
+        if not file_patch.hunks and not file_patch.is_delete:
+            raise ValueError(f"No hunks found for {file_patch.path}")
+    return files
+
+
+def _strip_path(header: str) -> str:
+    """Extract the path from a ---/+++ header, dropping timestamps and a/ b/ prefixes."""
+    path = header.split("\t")[0].strip()
+    if path != DEV_NULL and path[:2] in ("a/", "b/"):
+        path = path[2:]
+    return path
+
+# --------------------------------------------------
+# --- Validation Functions
+# --------------------------------------------------
+
+def _validate_file(file_patch: FilePatch) -> Optional[str]:
+    """
+    Compute a file patch's patched content in memory (its path is already resolved).
+
+    Returns:
+        An error message, or None if every hunk applies
+    """
+    abs_path = file_patch.abs_path
+    if file_patch.is_create:
+        if os.path.exists(abs_path):
+            return "File already exists"
+        content = ""
+    else:
+        if not os.path.isfile(abs_path):
+            return "File not found"
+        with open(abs_path, 'r', encoding='utf-8', newline='') as f:
+            content = f.read()
+        file_patch.original = content
+
+    newline = "\r\n" if "\r\n" in content else "\n"
+    lines = [line.rstrip("\r") for line in content.split("\n")]
+    ends_with_newline = lines[-1] == ""
+    if ends_with_newline:
+        lines.pop()
+
+    # Once a hunk is found away from its stated line, later hunks are
+    # looked for at the same offset first
+    offset = 0
+    previous_end = 0
+    placements = []
+    for number, hunk in enumerate(file_patch.hunks, 1):
+        # old_start names the first old line, or for a pure insertion the line to insert after
+        stated = hunk.old_start - 1 if hunk.old_lines else hunk.old_start
+        position = _locate_hunk(lines, hunk.old_lines, stated + offset)
+        if position is None or position < previous_end:
+            return f"Hunk {number} (@@ -{hunk.old_start}) does not match the current file content"
+        offset = position - stated
+        previous_end = position + len(hunk.old_lines)
+        placements.append((position, hunk))
+
+    # Apply bottom-up so earlier positions stay valid
+    for position, hunk in reversed(placements):
+        lines[position:position + len(hunk.old_lines)] = hunk.new_lines
+
+    if file_patch.is_delete:
+        # A deletion's hunks must remove exactly the file's current content
+        if lines:
+            return f"Deletion hunks do not cover the current file content ({len(lines)} line(s) left)"
+        return None
+
+    file_patch.patched = newline.join(lines) + (newline if lines and ends_with_newline else "")
+    return None
+
+
+def _locate_hunk(lines: List[str], needle: List[str], expected: int) -> Optional[int]:
+    """
+    Find where a hunk's old lines occur, preferring the position closest to
+    where they are expected (like patch's offset search).
+    """
+    if not needle:
+        return min(max(expected, 0), len(lines))
+
+    last = len(lines) - len(needle)
+    expected = min(max(expected, 0), max(last, 0))
+    for distance in range(max(expected, last - expected) + 1):
+        for position in (expected - distance, expected + distance):
+            if 0 <= position <= last and lines[position:position + len(needle)] == needle:
+                return position
+    return None
+
+# --------------------------------------------------
+# --- Apply Functions
+# --------------------------------------------------
+
+def apply_patch(patch: str, expected_versions: Optional[Dict[str, str]] = None) -> Tuple[bool, str]:
+    """
+    Apply a unified diff to the workspace as a single transaction. Every hunk
+    is validated against the current content before anything is written; if a
+    write fails, files already written are put back. The edit locks of all the
+    files are held from validation to the last write, so no other edit can
+    change a file in between.
+
+    Args:
+        patch: The diff text
+        expected_versions: Version tokens by path; the patch fails with a
+            conflict if any of those files is no longer at its version
+
+    Returns:
+        Tuple of (success, message)
+    """
+    try:
+        file_patches = parse_unified_diff(patch)
+    except ValueError as e:
+        return False, f"Error: Invalid patch: {str(e)}"
+
+    paths = [file_patch.path for file_patch in file_patches]
+    if len(set(paths)) != len(paths):
+        return False, "Error: Invalid patch: a file appears more than once"
+
+    # Resolve every path first, so the files' locks are taken before any is read
+    failures = []
+    for file_patch in file_patches:
+        is_valid, abs_path, error = validate_path(file_patch.path)
+        file_patch.abs_path = abs_path
+        if not is_valid:
+            failures.append(f"{file_patch.path}: {error}")
+    if failures:
+        return False, "Error: Patch not applied, no files were changed:\n" + "\n".join(failures)
+
+    versions = {}
+    for path, version in (expected_versions or {}).items():
+        abs_path = validate_path(path)[1]
+        if abs_path not in {file_patch.abs_path for file_patch in file_patches}:
+            return False, f"Error: expected_versions names a file the patch does not change: {path}"
+        versions[abs_path] = version
+
+    with path_locks(file_patch.abs_path for file_patch in file_patches):
+        for abs_path, version in versions.items():
+            conflict = check_version(abs_path, version)
+            if conflict:
+                return False, conflict
+        return _apply_locked(file_patches)
+
+
+def _apply_locked(file_patches: List[FilePatch]) -> Tuple[bool, str]:
+    """Validate, back up and write the files of a patch; their locks are held."""
+    workers = max(1, min(PATCH_MAX_WORKERS, len(file_patches)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        errors = map_in_context(pool, _validate_file_safely, file_patches)
+
+    failures = [f"{fp.path}: {error}" for fp, error in zip(file_patches, errors) if error]
+    if failures:
+        return False, "Error: Patch not applied, no files were changed:\n" + "\n".join(failures)
+
+    # One backup set for the whole patch; undo_edit restores each file from it
+    set_id = uuid.uuid4().hex[:8]
+    backups = []
+    for number, file_patch in enumerate(file_patches):
+        if file_patch.original is None:
+            continue
+        try:
+            # Unpruned until the set is committed or rolled back, so it stays whole
+            backup_path = create_backup(file_patch.abs_path, f"{set_id}-{number}", prune=False)
+            error = None if backup_path else f"Error: Patch not applied, could not back up {file_patch.path}"
+        except QuotaExceededError as e:
+            error = f"Error: Patch not applied: {str(e)}"
+        if error:
+            # Don't leave part of a set behind (or charged to the quota)
+            for path in backups:
+                remove_backup(path)
+            return False, error
+        backups.append(backup_path)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        errors = map_in_context(pool, _write_file_safely, file_patches)
+
+    failures = [f"{fp.path}: {error}" for fp, error in zip(file_patches, errors) if error]
+    if failures:
+        for file_patch, error in zip(file_patches, errors):
+            if not error:
+                _rollback_file(file_patch)
+    for file_patch in file_patches:
+        if file_patch.original is not None:
+            prune_backups(file_patch.abs_path)
+    if failures:
+        return False, "Error: Patch rolled back, no files were changed:\n" + "\n".join(failures)
+
+    summary = "\n".join(_describe(file_patch) for file_patch in file_patches)
+    return True, f"Successfully applied patch to {len(file_patches)} file(s) (backup set {set_id}):\n{summary}"
+
+
+def map_in_context(pool: ThreadPoolExecutor, fn: Callable, items: list) -> list:
+    """Like pool.map, but each call runs in a copy of the caller's context (e.g. its tenant)."""
+    futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+    return [future.result() for future in futures]
+
+
+def _validate_file_safely(file_patch: FilePatch) -> Optional[str]:
+    try:
+        return _validate_file(file_patch)
+    except Exception as e:
+        return str(e)
+
+
+def _write_file_safely(file_patch: FilePatch) -> Optional[str]:
+    try:
+        if file_patch.is_delete:
+            remove_workspace_file(file_patch.abs_path)
+        else:
+            os.makedirs(os.path.dirname(file_patch.abs_path), exist_ok=True)
+            write_workspace_file(file_patch.abs_path, file_patch.patched, exclusive=file_patch.is_create)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def _rollback_file(file_patch: FilePatch) -> None:
+    """Put back a file that was already written when another file failed."""
+    try:
+        if file_patch.is_create:
+            remove_workspace_file(file_patch.abs_path)
+        elif file_patch.is_delete:
+            write_workspace_file(file_patch.abs_path, file_patch.original, exclusive=True)
+        else:
+            write_workspace_file(file_patch.abs_path, file_patch.original)
+    except Exception as e:
+        logger.error("Error rolling back %s: %s", file_patch.abs_path, e)
+
+
+def _describe(file_patch: FilePatch) -> str:
+    """One summary line for an applied file patch."""
+    if file_patch.is_delete:
+        return f"  deleted {file_patch.path}"
+    version = file_version(os.stat(file_patch.abs_path))
+    if file_patch.is_create:
+        return f"  created {file_patch.path} (version {version})"
+    added = sum(hunk.added for hunk in file_patch.hunks)
+    removed = sum(hunk.removed for hunk in file_patch.hunks)
+    return f"  modified {file_patch.path} ({len(file_patch.hunks)} hunk(s), +{added} -{removed}, version {version})"
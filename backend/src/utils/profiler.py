@@ -0,0 +1,263 @@
+"""
+On-demand request profiling with a bounded on-disk ring buffer of pstats files.
+
+A profiled request is recorded wherever it runs: each step its coroutine
+takes on the event loop (profile_coroutine), and each call it makes on the
+file I/O pool (profiled_call). The profiler is switched on only for those
+steps and calls, never across an await, so other requests interleaved on the
+loop stay out of the profile.
+"""
+
+import cProfile
+import logging
+import os
+import re
+import threading
+import types
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Any, Callable, Coroutine, Dict, Iterator, List, Optional, TypeVar
+
+from src.config.settings import PROFILE_DIR, PROFILE_MAX_FILES, PROFILING_ENABLED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# --------------------------------------------------
+# --- Profiling Toggle
+# --------------------------------------------------
+
+# Admin toggle; starts from the PROFILING_ENABLED setting
+_state = {"enabled": PROFILING_ENABLED}
+_write_lock = threading.Lock()
+
+PROFILE_NAME_PATTERN = re.compile(r"^[\w.-]+\.prof$")
+
+
+def is_profiling_enabled() -> bool:
+    """Return whether every request to a profiled path should be profiled."""
+    return _state["enabled"]
+
+
+def set_profiling_enabled(enabled: bool) -> None:
+    """
+    Turn profiling of all requests on or off.
+
+    Args:
+        enabled: The new value of the admin toggle
+    """
+    _state["enabled"] = enabled
+
+# --------------------------------------------------
+# --- Profile Capture Functions
+# --------------------------------------------------
+
+class RequestProfile:
+    """The profile of one request, added to by each of its profiled calls."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.profiler = cProfile.Profile()
+        self.calls = 0
+        # Event loop steps left out because a pool call held the profiler
+        self.skipped_steps = 0
+        self.closed = False
+
+
+# The profile of the request being handled, if it is profiled; copied into
+# the file I/O pool's threads with the rest of the request's context
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+# Only one profiler may be active per process (Python 3.12+ raises otherwise,
+# and older versions would mix threads' results), so profiled calls take
+# turns: while profiling is on, the profiled requests' file operations run one
+# at a time. Event loop steps never wait for it (that would stall every
+# request on the loop); a step that finds it taken is left out. Unprofiled
+# calls never touch this lock.
+_profiler_lock = threading.Lock()
+
+
+@contextmanager
+def _profiling(profile: RequestProfile, blocking: bool) -> Iterator[bool]:
+    """Enable the request's profiler for the block; yields whether it was enabled."""
+    if not _profiler_lock.acquire(blocking):
+        yield False
+        return
+    try:
+        if profile.closed:
+            yield False
+            return
+        profile.profiler.enable()
+        try:
+            yield True
+        finally:
+            profile.profiler.disable()
+            profile.calls += 1
+    finally:
+        _profiler_lock.release()
+
+
+def start_request_profile(label: str) -> RequestProfile:
+    """
+    Profile the current request's calls made through profiled_call (every
+    file I/O pool operation) from now on; wrap its coroutine in
+    profile_coroutine to also profile its time on the event loop.
+
+    Args:
+        label: A short name for the profiled work (e.g. the request path)
+
+    Returns:
+        The profile, to pass to finish_request_profile
+    """
+    profile = RequestProfile(label)
+    _current_profile.set(profile)
+    return profile
+
+
+def profiled_call(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Call fn, adding the call to the current request's profile if it has one.
+    Costs a single context variable lookup when the request is not profiled.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return fn(*args)
+    # If the request already finished (e.g. this operation timed out) the call runs unprofiled
+    with _profiling(profile, blocking=True):
+        return fn(*args)
+
+
+@types.coroutine
+def profile_coroutine(coro: Coroutine[Any, Any, T], profile: RequestProfile):
+    """
+    Await coro, profiling each step it runs on the event loop. The profiler
+    is off while coro is suspended, so the tasks that run meanwhile are not
+    recorded.
+
+    Args:
+        coro: The request's coroutine (e.g. the ASGI app call)
+        profile: The request's profile from start_request_profile
+
+    Returns:
+        The coroutine's result
+    """
+    value, error = None, None
+    while True:
+        with _profiling(profile, blocking=False) as enabled:
+            if not enabled:
+                profile.skipped_steps += 1
+            try:
+                if error is None:
+                    yielded = coro.send(value)
+                else:
+                    yielded = coro.throw(error)
+            except StopIteration as stop:
+                return stop.value
+        try:
+            value, error = (yield yielded), None
+        except GeneratorExit:
+            coro.close()
+            raise
+        except BaseException as e:
+            value, error = None, e
+
+
+def finish_request_profile(profile: RequestProfile) -> Optional[str]:
+    """
+    Stop adding to a request's profile and save it if it recorded any calls.
+    Blocks until a profiled call in progress finishes, so run it off the event loop.
+
+    Returns:
+        The name of the saved profile, or None
+    """
+    with _profiler_lock:
+        profile.closed = True
+    if not profile.calls:
+        return None
+    if profile.skipped_steps:
+        logger.info("Profile %s left out %d event loop step(s)", profile.label, profile.skipped_steps)
+    return save_profile(profile.profiler, profile.label)
+
+
+def save_profile(profiler: cProfile.Profile, label: str) -> Optional[str]:
+    """
+    Write a profile to PROFILE_DIR and drop the oldest files beyond PROFILE_MAX_FILES.
+
+    Args:
+        profiler: The finished profiler
+        label: A short name for the profiled work
+
+    Returns:
+        The name of the saved profile or None if saving failed
+    """
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    safe_label = re.sub(r"[^\w-]+", "_", label).strip("_") or "request"
+    name = f"{timestamp}.{safe_label}.{uuid.uuid4().hex[:8]}.prof"
+
+    try:
+        with _write_lock:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+            _trim_profiles()
+        return name
+    except Exception as e:
+        logger.error("Error saving profile: %s", e)
+        return None
+
+
+def _trim_profiles() -> None:
+    """Remove the oldest profiles so at most PROFILE_MAX_FILES remain."""
+    names = sorted(f for f in os.listdir(PROFILE_DIR) if PROFILE_NAME_PATTERN.match(f))
+    for name in names[:max(0, len(names) - PROFILE_MAX_FILES)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass
+
+# --------------------------------------------------
+# --- Profile Lookup Functions
+# --------------------------------------------------
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    List the stored profiles, newest first.
+
+    Returns:
+        A list of dictionaries with the name, size and creation time of each profile
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not PROFILE_NAME_PATTERN.match(name):
+            continue
+        try:
+            stat = os.stat(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            continue
+        profiles.append({
+            "name": name,
+            "size": stat.st_size,
+            "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat()
+        })
+    return profiles
+
+
+def get_profile_path(name: str) -> Optional[str]:
+    """
+    Resolve a profile name to its path inside PROFILE_DIR.
+
+    Args:
+        name: The profile file name as returned by list_profiles
+
+    Returns:
+        The absolute path to the profile or None if the name is invalid or missing
+    """
+    if not PROFILE_NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
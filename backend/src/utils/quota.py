@@ -0,0 +1,121 @@
+"""
+Workspace quotas with usage counters updated incrementally on every write.
+"""
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from src.config.settings import WORKSPACE_MAX_BYTES, WORKSPACE_MAX_FILES
+from src.storage.usage_store import UNLIMITED, get_usage_store
+from src.utils.workspace import (
+    BACKUP_DIR_NAME,
+    CHECKPOINT_DIR_NAME,
+    get_tenant,
+    get_workspace_dir
+)
+
+
+class QuotaExceededError(Exception):
+    """Raised when a write would take a workspace past its byte or file quota."""
+
+# --------------------------------------------------
+# --- Quota Functions
+# --------------------------------------------------
+
+def quotas_enabled() -> bool:
+    """Whether any workspace quota is configured; usage is not tracked otherwise."""
+    return WORKSPACE_MAX_BYTES > 0 or WORKSPACE_MAX_FILES > 0
+
+
+def reserve(delta_bytes: int, delta_files: int = 0, tenant_id: Optional[str] = None) -> None:
+    """
+    Charge a change in workspace usage to a tenant before making it.
+    Costs one conditional counter update; negative deltas always succeed.
+
+    Args:
+        delta_bytes: Bytes the change adds (negative if it frees space)
+        delta_files: Files the change adds (negative if it deletes files)
+        tenant_id: The tenant (defaults to the current tenant)
+
+    Raises:
+        QuotaExceededError: If the change would exceed a quota
+    """
+    if not quotas_enabled() or (delta_bytes == 0 and delta_files == 0):
+        return
+    tenant_id = tenant_id or get_tenant()
+    store = get_usage_store()
+    max_bytes = WORKSPACE_MAX_BYTES or UNLIMITED
+    max_files = WORKSPACE_MAX_FILES or UNLIMITED
+
+    applied = store.try_add(tenant_id, delta_bytes, delta_files, max_bytes, max_files)
+    if applied is None:
+        # First time this tenant is charged: count its workspace once
+        store.seed(tenant_id, *count_usage(tenant_id))
+        applied = store.try_add(tenant_id, delta_bytes, delta_files, max_bytes, max_files)
+    if not applied:
+        used_bytes, used_files = store.get(tenant_id) or (0, 0)
+        raise QuotaExceededError(
+            f"Workspace quota exceeded: using {used_bytes} of {WORKSPACE_MAX_BYTES or 'unlimited'} bytes "
+            f"and {used_files} of {WORKSPACE_MAX_FILES or 'unlimited'} files"
+        )
+
+
+def release(delta_bytes: int, delta_files: int = 0, tenant_id: Optional[str] = None) -> None:
+    """Give back usage reserved for a change that did not happen."""
+    reserve(-delta_bytes, -delta_files, tenant_id)
+
+
+def get_usage(tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get a tenant's usage and quotas.
+
+    Returns:
+        A dict with tenant_id, used_bytes, used_files, max_bytes and max_files (0 = unlimited)
+    """
+    tenant_id = tenant_id or get_tenant()
+    store = get_usage_store()
+    usage = store.get(tenant_id)
+    if usage is None:
+        usage = count_usage(tenant_id)
+        if quotas_enabled():
+            store.seed(tenant_id, *usage)
+    return {
+        "tenant_id": tenant_id,
+        "used_bytes": usage[0],
+        "used_files": usage[1],
+        "max_bytes": WORKSPACE_MAX_BYTES,
+        "max_files": WORKSPACE_MAX_FILES
+    }
+
+
+def recount_usage(tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    """Replace a tenant's counters with a full count (after bulk changes such as a checkpoint restore)."""
+    tenant_id = tenant_id or get_tenant()
+    get_usage_store().seed(tenant_id, *count_usage(tenant_id), replace=True)
+    return get_usage(tenant_id)
+
+
+def count_usage(tenant_id: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Count a tenant's workspace with a full scan. Only used to seed or repair
+    the counters. Checkpoints share their data with the workspace and are not
+    counted; what they alone hold is capped by CHECKPOINT_MAX_BYTES.
+
+    Returns:
+        (bytes including backups, files excluding backups)
+    """
+    root = get_workspace_dir(tenant_id)
+    used_bytes = used_files = 0
+    stack = [(root, False)]
+    while stack:
+        directory, in_backups = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if directory == root and entry.name == CHECKPOINT_DIR_NAME:
+                        continue
+                    stack.append((entry.path, in_backups or (directory == root and entry.name == BACKUP_DIR_NAME)))
+                elif entry.is_file(follow_symlinks=False):
+                    used_bytes += entry.stat(follow_symlinks=False).st_size
+                    used_files += 0 if in_backups else 1
+    return used_bytes, used_files
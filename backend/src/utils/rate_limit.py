@@ -0,0 +1,63 @@
+"""
+Token bucket rate limiter.
+"""
+
+import time
+
+# --------------------------------------------------
+# --- Token Bucket
+# --------------------------------------------------
+
+
+class TokenBucket:
+    """
+    A bucket holding up to `capacity` units, refilled continuously at
+    `capacity` units per `period` seconds. Not thread-safe; callers lock.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the units accumulated since the last update."""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def time_until(self, amount: float) -> float:
+        """
+        Return how many seconds until `amount` units are available.
+
+        Args:
+            amount: The units needed (capped at the bucket's capacity)
+
+        Returns:
+            0 if the units are available now, otherwise the wait in seconds
+        """
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        """
+        Take units from the bucket. The level may go negative, which delays
+        later callers until the debt has been refilled.
+
+        Args:
+            amount: The units to take (negative amounts refund units)
+        """
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+    def limit_to(self, remaining: float) -> None:
+        """
+        Lower the level to a remaining allowance reported by the server.
+
+        Args:
+            remaining: The units the server says are still available
+        """
+        self._refill()
+        self.level = min(self.level, remaining)
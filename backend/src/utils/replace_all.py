@@ -0,0 +1,304 @@
+"""
+Workspace-wide find and replace. Files are searched on a pool of processes;
+the changed files are then backed up as one set and written atomically from
+the calling process, so quotas, tenants and the content cache stay in charge.
+"""
+
+import fnmatch
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import List, Optional, Tuple
+
+from src.config.settings import (
+    ALLOWED_EXTENSIONS,
+    PATCH_MAX_WORKERS,
+    REPLACE_ALL_MAX_FILE_BYTES,
+    REPLACE_ALL_WORKERS
+)
+from src.utils import metrics
+from src.utils.backups import create_backup, prune_backups, remove_backup
+from src.utils.file_versions import path_locks
+from src.utils.patch_utils import map_in_context
+from src.utils.quota import QuotaExceededError
+from src.utils.workspace import get_workspace_dir
+from src.utils.workspace_files import write_workspace_file
+
+logger = logging.getLogger(__name__)
+
+# Fewer files than this are searched in the calling thread; starting
+# processes and shipping results back would cost more than it saves
+MIN_PARALLEL_FILES = 32
+
+# Longest per-file list in a result message
+MAX_LISTED_FILES = 200
+
+# (path, number of matches, new content or None, (mtime_ns, size, inode), error or None)
+ScanResult = Tuple[str, int, Optional[bytes], Tuple[int, int, int], Optional[str]]
+
+# --------------------------------------------------
+# --- Search Workers
+# --------------------------------------------------
+
+
+def _scan_file(file_path: str, search: str, replacement: str, is_regex: bool, dry_run: bool) -> ScanResult:
+    """
+    Count (and unless dry_run, apply in memory) the replacements in one file.
+    Runs in a pool process, so it only uses its arguments and the standard library.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            stat_result = os.fstat(f.fileno())
+            data = f.read()
+        version = (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+    except OSError as e:
+        return file_path, 0, None, (0, 0, 0), str(e)
+
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return file_path, -1, None, version, None
+
+    try:
+        if is_regex:
+            pattern = re.compile(search, re.MULTILINE)
+            if dry_run:
+                return file_path, sum(1 for _ in pattern.finditer(text)), None, version, None
+            new_text, count = pattern.subn(replacement, text)
+        else:
+            count = text.count(search)
+            if dry_run or not count:
+                return file_path, count, None, version, None
+            new_text = text.replace(search, replacement)
+    except (re.error, IndexError) as e:
+        return file_path, 0, None, version, f"Invalid replacement: {str(e)}"
+
+    return file_path, count, new_text.encode('utf-8') if count else None, version, None
+
+# --------------------------------------------------
+# --- Process Pool
+# --------------------------------------------------
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Create the search pool on first use. Workers are spawned, not forked, since the server runs threads."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=REPLACE_ALL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the search processes (on application shutdown)."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+            _process_pool = None
+
+
+def _scan_files(files: List[str], search: str, replacement: str, is_regex: bool, dry_run: bool) -> List[ScanResult]:
+    """Search files on the process pool, or in this thread when there are only a few."""
+    scan = partial(_scan_file, search=search, replacement=replacement, is_regex=is_regex, dry_run=dry_run)
+    if REPLACE_ALL_WORKERS < 1 or len(files) < MIN_PARALLEL_FILES:
+        return [scan(file_path) for file_path in files]
+
+    chunksize = max(1, len(files) // (REPLACE_ALL_WORKERS * 4))
+    try:
+        return list(_get_process_pool().map(scan, files, chunksize=chunksize))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        logger.error("replace_all search pool broke, searching in-process instead")
+        shutdown_process_pool()
+        return [scan(file_path) for file_path in files]
+
+# --------------------------------------------------
+# --- File Selection
+# --------------------------------------------------
+
+
+def _find_files(root: str, glob: Optional[str]) -> Tuple[List[str], int]:
+    """
+    List the files under root that replace_all may change: files with an
+    allowed extension outside hidden directories (such as .backups), matching
+    glob if given.
+
+    Returns:
+        Tuple of (absolute paths, number of files skipped for being too large)
+    """
+    workspace_dir = get_workspace_dir()
+    if os.path.isfile(root):
+        candidates = [root]
+    else:
+        candidates = []
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names[:] = sorted(name for name in dir_names if not name.startswith('.'))
+            candidates.extend(os.path.join(dir_path, name) for name in sorted(file_names) if not name.startswith('.'))
+
+    files, too_large = [], 0
+    for file_path in candidates:
+        if os.path.splitext(file_path)[1].lower() not in ALLOWED_EXTENSIONS or os.path.islink(file_path):
+            continue
+        if glob and not fnmatch.fnmatch(os.path.relpath(file_path, workspace_dir).replace(os.sep, '/'), glob):
+            continue
+        if os.path.getsize(file_path) > REPLACE_ALL_MAX_FILE_BYTES:
+            too_large += 1
+            continue
+        files.append(file_path)
+    return files, too_large
+
+# --------------------------------------------------
+# --- Replace All
+# --------------------------------------------------
+
+
+def replace_all(
+    root: str,
+    search: str,
+    replacement: str,
+    is_regex: bool = False,
+    glob: Optional[str] = None,
+    dry_run: bool = False
+) -> Tuple[bool, str]:
+    """
+    Replace every occurrence of a string or regular expression in the files
+    under a directory. Nothing is written unless every file was searched
+    successfully; if a write fails, files already written are put back.
+
+    Args:
+        root: The absolute path to the directory (or file) to search
+        search: The text, or regular expression if is_regex, to find
+        replacement: The replacement text; with is_regex it may refer to groups (\\1, \\g<name>)
+        is_regex: Treat search as a regular expression (multi-line mode)
+        glob: Only change files whose workspace-relative path matches this pattern (e.g. "src/*.py")
+        dry_run: Only report how many matches each file has
+
+    Returns:
+        Tuple of (success, message)
+    """
+    if not search:
+        return False, "Error: old_str parameter is required for replace_all command"
+    if is_regex:
+        try:
+            re.compile(search, re.MULTILINE)
+        except re.error as e:
+            return False, f"Error: Invalid regular expression: {str(e)}"
+
+    files, too_large = _find_files(root, glob)
+    results = _scan_files(files, search, replacement, is_regex, dry_run)
+    metrics.increment("replace_all.files_searched", len(files))
+
+    workspace_dir = get_workspace_dir()
+    failures = [f"{os.path.relpath(path, workspace_dir)}: {error}" for path, _, _, _, error in results if error]
+    if failures:
+        if len(failures) > MAX_LISTED_FILES:
+            failures[MAX_LISTED_FILES:] = [f"... and {len(failures) - MAX_LISTED_FILES} more file(s)"]
+        return False, "Error: Nothing was replaced, some files could not be searched:\n" + "\n".join(failures)
+
+    matches = [result for result in results if result[1] > 0]
+    skipped = too_large + sum(1 for result in results if result[1] < 0)
+    notes = f"{len(files)} file(s) searched"
+    if skipped:
+        notes += f", {skipped} skipped as too large or not UTF-8"
+    if not matches:
+        return False, f"Error: No matches found ({notes})"
+
+    total = sum(count for _, count, _, _, _ in matches)
+    listing = _list_files(matches, workspace_dir)
+    if dry_run:
+        return True, f"Dry run: would replace {total} match(es) in {len(matches)} file(s) ({notes}):\n{listing}"
+
+    # Hold the files' edit locks from the check below to the last write, so a
+    # concurrent str_replace or insert cannot land in between and be overwritten
+    with path_locks(path for path, _, _, _, _ in matches):
+        return _write_matches(matches, total, notes, listing, workspace_dir)
+
+
+def _write_matches(matches: List[ScanResult], total: int, notes: str, listing: str, workspace_dir: str) -> Tuple[bool, str]:
+    """Back up and write the changed files of a replace_all; their locks are held."""
+    # Refuse to overwrite a file that changed after it was searched
+    for path, _, _, version, _ in matches:
+        try:
+            stat_result = os.stat(path)
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is None or (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino) != version:
+            return False, f"Error: Nothing was replaced, {os.path.relpath(path, workspace_dir)} changed during the search"
+
+    # One backup set for the whole replacement; undo_edit restores each file from it
+    set_id = uuid.uuid4().hex[:8]
+    backup_jobs = [(path, f"{set_id}-{number}") for number, (path, _, _, _, _) in enumerate(matches)]
+    workers = max(1, min(PATCH_MAX_WORKERS, len(matches)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        backups = map_in_context(pool, _backup_safely, backup_jobs)
+    for (path, _, _, _, _), backup in zip(matches, backups):
+        if isinstance(backup, QuotaExceededError) or not backup:
+            # Don't leave a partial set behind
+            for taken in backups:
+                if taken and not isinstance(taken, QuotaExceededError):
+                    remove_backup(taken)
+            if isinstance(backup, QuotaExceededError):
+                return False, f"Error: Nothing was replaced: {str(backup)}"
+            return False, f"Error: Nothing was replaced, could not back up {os.path.relpath(path, workspace_dir)}"
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        errors = map_in_context(pool, _write_safely, matches)
+
+    failures = [f"{os.path.relpath(m[0], workspace_dir)}: {error}" for m, error in zip(matches, errors) if error]
+    if failures:
+        for (path, _, _, _, _), backup, error in zip(matches, backups, errors):
+            if not error:
+                _rollback_file(path, backup)
+    # The set was held unpruned until now, so rollback could use every member
+    for path, _, _, _, _ in matches:
+        prune_backups(path)
+    if failures:
+        return False, "Error: Replacement rolled back, no files were changed:\n" + "\n".join(failures)
+
+    metrics.increment("replace_all.files_changed", len(matches))
+    return True, f"Successfully replaced {total} match(es) in {len(matches)} file(s) (backup set {set_id}, {notes}):\n{listing}"
+
+
+def _list_files(matches: List[ScanResult], workspace_dir: str) -> str:
+    """The per-file match counts, up to MAX_LISTED_FILES lines."""
+    lines = [f"  {os.path.relpath(path, workspace_dir)}: {count}" for path, count, _, _, _ in matches[:MAX_LISTED_FILES]]
+    if len(matches) > MAX_LISTED_FILES:
+        lines.append(f"  ... and {len(matches) - MAX_LISTED_FILES} more file(s)")
+    return "\n".join(lines)
+
+
+def _backup_safely(job: Tuple[str, str]):
+    try:
+        return create_backup(*job, prune=False)
+    except QuotaExceededError as e:
+        return e
+
+
+def _write_safely(match: ScanResult) -> Optional[str]:
+    try:
+        write_workspace_file(match[0], match[2])
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def _rollback_file(file_path: str, backup_path: str) -> None:
+    """Put back a file that was already written when another file failed."""
+    try:
+        with open(backup_path, 'rb') as f:
+            write_workspace_file(file_path, f.read())
+    except Exception as e:
+        logger.error("Error rolling back %s: %s", file_path, e)
@@ -0,0 +1,206 @@
+"""
+Tiered matching of str_replace targets: exact, then line-ending normalized,
+then per-line whitespace normalized.
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+# --------------------------------------------------
+# --- Match Tiers
+# --------------------------------------------------
+
+TIER_EXACT = "exact"
+TIER_LINE_ENDINGS = "line_endings"
+TIER_WHITESPACE = "whitespace"
+
+# Maximum number of candidate line numbers reported for an ambiguous match
+MAX_REPORTED_CANDIDATES = 20
+
+
+class MatchResult:
+    """The outcome of looking for old_str in a file."""
+
+    __slots__ = ("tier", "start", "end", "replacement", "candidate_lines")
+
+    def __init__(
+        self,
+        tier: Optional[str] = None,
+        start: int = -1,
+        end: int = -1,
+        replacement: str = "",
+        candidate_lines: Optional[List[int]] = None
+    ):
+        self.tier = tier
+        self.start = start
+        self.end = end
+        self.replacement = replacement
+        self.candidate_lines = candidate_lines or []
+
+    @property
+    def found(self) -> bool:
+        """Whether exactly one match was found."""
+        return self.start >= 0
+
+    @property
+    def ambiguous(self) -> bool:
+        """Whether several matches were found in the first tier that matched."""
+        return len(self.candidate_lines) > 1
+
+# --------------------------------------------------
+# --- Matching Functions
+# --------------------------------------------------
+
+def find_match(content: str, old_str: str, new_str: str) -> MatchResult:
+    """
+    Find the unique occurrence of old_str in content, trying progressively
+    looser tiers until one matches. A tier with several matches stops the
+    search and reports the candidates' line numbers.
+
+    Args:
+        content: The file content, with its original line endings
+        old_str: The text to replace
+        new_str: The replacement text
+
+    Returns:
+        A MatchResult whose replacement is new_str converted to the file's
+        line endings, and reindented when the whitespace tier matched
+    """
+    crlf = _uses_crlf(content)
+    result = _match_exact(content, old_str, new_str, crlf)
+    if result.found or result.ambiguous:
+        return result
+
+    if "\r\n" in content or "\r\n" in old_str:
+        result = _match_line_endings(content, old_str, new_str, crlf)
+        if result.found or result.ambiguous:
+            return result
+
+    return _match_whitespace(content, old_str, new_str, crlf)
+
+
+def _match_exact(content: str, old_str: str, new_str: str, crlf: bool) -> MatchResult:
+    """Tier 1: byte-exact substring match."""
+    starts = _find_all(content, old_str)
+    if len(starts) == 1:
+        return MatchResult(TIER_EXACT, starts[0], starts[0] + len(old_str), _with_line_endings(new_str, crlf))
+    return MatchResult(TIER_EXACT, candidate_lines=_line_numbers(content, starts))
+
+
+def _match_line_endings(content: str, old_str: str, new_str: str, crlf: bool) -> MatchResult:
+    """Tier 2: exact match after converting CRLF to LF in both texts."""
+    normalized = content.replace("\r\n", "\n")
+    needle = old_str.replace("\r\n", "\n")
+    starts = _find_all(normalized, needle)
+    if len(starts) != 1:
+        return MatchResult(TIER_LINE_ENDINGS, candidate_lines=_line_numbers(normalized, starts))
+
+    # Map normalized offsets back: the k-th CRLF sits at normalized offset
+    # (original offset - k), and each CRLF before an offset adds one character
+    crlf_positions = [o - k for k, o in enumerate(_find_all(content, "\r\n", limit=None))]
+
+    def original(offset: int) -> int:
+        return offset + bisect_left(crlf_positions, offset)
+
+    replacement = _with_line_endings(new_str, crlf)
+    return MatchResult(TIER_LINE_ENDINGS, original(starts[0]), original(starts[0] + len(needle)), replacement)
+
+
+def _match_whitespace(content: str, old_str: str, new_str: str, crlf: bool) -> MatchResult:
+    """Tier 3: whole-line match comparing lines with whitespace collapsed."""
+    needle = [_normalize_line(line) for line in old_str.replace("\r\n", "\n").split("\n")]
+    while needle and not needle[-1]:
+        needle.pop()
+    anchor = next((i for i, line in enumerate(needle) if line), None)
+    if anchor is None:
+        return MatchResult()
+
+    lines = content.split("\n")
+    normalized = [_normalize_line(line) for line in lines]
+    # Index: normalized line -> line numbers where it occurs (built once, linear in the file)
+    index: Dict[str, List[int]] = {}
+    for i, line in enumerate(normalized):
+        index.setdefault(line, []).append(i)
+
+    starts = []
+    for position in index.get(needle[anchor], []):
+        first = position - anchor
+        if first < 0 or first + len(needle) > len(lines):
+            continue
+        if normalized[first:first + len(needle)] == needle:
+            starts.append(first)
+
+    if len(starts) != 1:
+        return MatchResult(TIER_WHITESPACE, candidate_lines=[s + 1 for s in starts[:MAX_REPORTED_CANDIDATES]])
+
+    first = starts[0]
+    last = first + len(needle) - 1
+    start = sum(len(line) + 1 for line in lines[:first])
+    end = start + sum(len(line) + 1 for line in lines[first:last + 1])
+    if not old_str.endswith("\n") or last + 1 == len(lines):
+        # Leave the last matched line's line ending in place
+        end -= 2 if lines[last].endswith("\r") else 1
+
+    replacement = _reindent(new_str, old_str, lines[first + anchor], anchor)
+    return MatchResult(TIER_WHITESPACE, start, end, _with_line_endings(replacement, crlf))
+
+# --------------------------------------------------
+# --- Helper Functions
+# --------------------------------------------------
+
+def _find_all(text: str, needle: str, limit: Optional[int] = MAX_REPORTED_CANDIDATES + 1) -> List[int]:
+    """Return the start offsets of non-overlapping occurrences of needle, up to limit."""
+    starts = []
+    position = text.find(needle)
+    while position != -1 and (limit is None or len(starts) < limit):
+        starts.append(position)
+        position = text.find(needle, position + max(1, len(needle)))
+    return starts
+
+
+def _line_numbers(text: str, offsets: List[int]) -> List[int]:
+    """Convert sorted offsets into 1-based line numbers in a single pass."""
+    numbers = []
+    line = 1
+    previous = 0
+    for offset in offsets[:MAX_REPORTED_CANDIDATES]:
+        line += text.count("\n", previous, offset)
+        previous = offset
+        numbers.append(line)
+    return numbers
+
+
+def _normalize_line(line: str) -> str:
+    """Collapse runs of whitespace and drop leading/trailing whitespace (including CR)."""
+    return " ".join(line.split())
+
+
+def _uses_crlf(content: str) -> bool:
+    """Whether most of a file's line endings are CRLF (the style new text is converted to)."""
+    crlf = content.count("\r\n")
+    return crlf > 0 and crlf * 2 >= content.count("\n")
+
+
+def _with_line_endings(text: str, crlf: bool) -> str:
+    """Convert text to the file's line endings: CRLF, or LF otherwise."""
+    text = text.replace("\r\n", "\n")
+    return text.replace("\n", "\r\n") if crlf else text
+
+
+def _reindent(new_str: str, old_str: str, file_line: str, anchor: int) -> str:
+    """
+    Shift new_str's indentation by the difference between old_str's and
+    the file's indentation on the first non-blank matched line.
+    """
+    old_lines = old_str.replace("\r\n", "\n").split("\n")
+    old_indent = old_lines[anchor][:len(old_lines[anchor]) - len(old_lines[anchor].lstrip())]
+    file_indent = file_line[:len(file_line) - len(file_line.lstrip())].rstrip("\r")
+    if old_indent == file_indent:
+        return new_str
+
+    reindented = []
+    for line in new_str.replace("\r\n", "\n").split("\n"):
+        if line.startswith(old_indent) and line.strip():
+            line = file_indent + line[len(old_indent):]
+        reindented.append(line)
+    return "\n".join(reindented)
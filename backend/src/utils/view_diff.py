@@ -0,0 +1,317 @@
+"""
+'view_diff': what changed in a file since the session last saw it. The
+content each session last viewed or edited is remembered per path (compressed,
+in a size-capped LRU) along with the lines it was shown, and compared with the
+current file line by line, so the result grows with the change rather than
+with the file.
+"""
+
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from src.config.settings import (
+    VIEW_DIFF_MAX_FILE_BYTES,
+    VIEW_DIFF_SNAPSHOT_BYTES,
+    VIEW_MAX_BYTES
+)
+from src.utils import metrics
+from src.utils.atomic_write import add_write_listener
+from src.utils.content_cache import read_file_bytes_with_stat
+from src.utils.file_reading import add_view_listener, read_file_with_line_numbers
+from src.utils.file_versions import file_version
+from src.utils.line_diff import Opcode, diff_lines, format_hunks
+from src.utils.workspace import get_tenant, get_workspace_dir
+
+# --------------------------------------------------
+# --- Seen Snapshots
+# --------------------------------------------------
+
+# (tenant, session, absolute path)
+SnapshotKey = Tuple[str, str, str]
+
+# 1-based line ranges [first, end) a session has seen; None means the whole file
+LineRanges = Optional[List[Tuple[int, int]]]
+
+
+def _line_count(data: bytes) -> int:
+    return data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+
+
+def _split_lines(data: bytes) -> List[bytes]:
+    """Split after each newline only, as view numbers lines (bytes.splitlines also splits at a lone carriage return)."""
+    lines = data.split(b"\n")
+    return [line + b"\n" for line in lines[:-1]] + ([lines[-1]] if lines[-1] else [])
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]], line_count: int) -> LineRanges:
+    """Sort and merge overlapping or touching ranges; None if together they cover every line."""
+    merged: List[Tuple[int, int]] = []
+    for first, end in sorted(ranges):
+        if first >= end:
+            continue
+        if merged and first <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((first, end))
+    if not line_count or (merged and merged[0][0] <= 1 and merged[0][1] > line_count):
+        return None
+    return merged
+
+
+class SnapshotStore:
+    """
+    The version and (compressed) content of each file as a session last saw
+    it, with the lines it saw, capped by total compressed size with least
+    recently used entries dropped first.
+    """
+
+    def __init__(self, max_bytes: int = VIEW_DIFF_SNAPSHOT_BYTES):
+        self.max_bytes = max_bytes
+        # key -> (version, compressed content, line count, seen ranges)
+        self._entries: "OrderedDict[SnapshotKey, Tuple[str, bytes, int, LineRanges]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: SnapshotKey) -> Optional[Tuple[str, bytes, LineRanges]]:
+        """Get the version, content and lines last seen, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        return entry[0], zlib.decompress(entry[1]), entry[3]
+
+    def put(self, key: SnapshotKey, version: str, data: bytes, ranges: LineRanges = None) -> None:
+        """Remember a version and its content, of which the lines in `ranges` were seen."""
+        compressed = zlib.compress(data, 1)
+        if len(compressed) > self.max_bytes:
+            self.discard(key)
+            return
+        line_count = _line_count(data)
+        if ranges is not None:
+            ranges = _merge_ranges(ranges, line_count)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[key] = (version, compressed, line_count, ranges)
+            self._size += len(compressed)
+            while self._size > self.max_bytes:
+                _, (_, evicted, _, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                metrics.increment("view_diff.evictions")
+            metrics.set_gauge("view_diff.snapshot_bytes", self._size)
+
+    def add_range(self, key: SnapshotKey, version: str, first: int, end: int) -> bool:
+        """
+        Mark more lines of an already remembered version as seen, without
+        storing its content again.
+
+        Returns:
+            False if the version remembered is not this one
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return False
+            old_version, compressed, line_count, ranges = entry
+            if ranges is not None:
+                ranges = _merge_ranges(ranges + [(first, end)], line_count)
+            self._entries[key] = (old_version, compressed, line_count, ranges)
+            self._entries.move_to_end(key)
+            return True
+
+    def discard(self, key: SnapshotKey) -> None:
+        """Forget a file."""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+                metrics.set_gauge("view_diff.snapshot_bytes", self._size)
+
+
+_snapshots = SnapshotStore()
+
+# The session whose views and edits are being recorded, set by seen_by
+_seeing_session: ContextVar[Optional[str]] = ContextVar("view_diff_session", default=None)
+
+
+@contextmanager
+def seen_by(session_id: str) -> Iterator[None]:
+    """
+    Record the files viewed or written meanwhile (in this context) as seen by
+    a session, as the base of its next view_diff. The snapshots are taken
+    from the bytes the view read or the write wrote, so they are exactly what
+    the session was shown, even if the file changes right after.
+    """
+    token = _seeing_session.set(session_id)
+    try:
+        yield
+    finally:
+        _seeing_session.reset(token)
+
+
+def _remember_write(file_path: str, data: bytes, stat_result: os.stat_result) -> None:
+    """Write listener: an edit shows the session the whole new file's version."""
+    session_id = _seeing_session.get()
+    if session_id is None:
+        return
+    key = (get_tenant(), session_id, file_path)
+    if len(data) > VIEW_DIFF_MAX_FILE_BYTES:
+        _snapshots.discard(key)
+        return
+    _snapshots.put(key, file_version(stat_result), data)
+
+
+def _remember_view(file_path: str, version: str, data: Optional[bytes], first: int, end: int) -> None:
+    """View listener: a view shows the session lines [first, end) of a version."""
+    session_id = _seeing_session.get()
+    if session_id is None:
+        return
+    key = (get_tenant(), session_id, file_path)
+    if _snapshots.add_range(key, version, first, end):
+        return
+    if data is None:
+        # The view was paged from disk: remember the file only if it is small
+        # enough and still at the version shown
+        try:
+            if os.path.getsize(file_path) > VIEW_DIFF_MAX_FILE_BYTES:
+                _snapshots.discard(key)
+                return
+            stat_result, data = read_file_bytes_with_stat(file_path)
+        except OSError:
+            _snapshots.discard(key)
+            return
+        if file_version(stat_result) != version:
+            _snapshots.discard(key)
+            return
+    elif len(data) > VIEW_DIFF_MAX_FILE_BYTES:
+        _snapshots.discard(key)
+        return
+    ranges = _merge_ranges([(first, end)], _line_count(data))
+    if ranges == []:
+        # Not even one whole line was shown (e.g. a page of a very long line)
+        return
+    _snapshots.put(key, version, data, ranges)
+
+
+add_write_listener(_remember_write)
+add_view_listener(_remember_view)
+
+# --------------------------------------------------
+# --- View Diff
+# --------------------------------------------------
+
+
+def _overlaps(opcode: Opcode, ranges: List[Tuple[int, int]]) -> bool:
+    """Whether a change touches the seen lines (an insertion counts if it is inside or at the edge of a range)."""
+    _, i1, i2, _, _ = opcode
+    for first, end in ranges:
+        if (i1 < end - 1 and i2 > first - 1) or (i1 == i2 and first - 1 <= i1 <= end - 1):
+            return True
+    return False
+
+
+def _map_range(opcodes: List[Opcode], first: int, end: int) -> Tuple[int, int]:
+    """Map a 1-based range of old lines to the new lines covering it, including changes at its edges."""
+    start_index, end_index = first - 1, end - 1
+    new_start = new_end = None
+    for tag, i1, i2, j1, j2 in opcodes:
+        if i1 <= start_index < i2 or (tag == "insert" and i1 == start_index):
+            new_start = j1 + (start_index - i1 if tag == "equal" else 0)
+            break
+    for tag, i1, i2, j1, j2 in reversed(opcodes):
+        if i1 < end_index <= i2 or (tag == "insert" and i1 == end_index):
+            new_end = j1 + (end_index - i1) if tag == "equal" else j2
+            break
+    last = opcodes[-1] if opcodes else ("equal", 0, 0, 0, 0)
+    if new_start is None:
+        new_start = last[4]
+    if new_end is None:
+        new_end = 0 if end_index <= 0 else last[4]
+    return new_start + 1, new_end + 1
+
+
+def _describe_ranges(ranges: List[Tuple[int, int]]) -> str:
+    return ", ".join(f"{first}-{end - 1}" for first, end in ranges)
+
+
+def view_diff(session_id: str, file_path: str, max_bytes: int = VIEW_MAX_BYTES) -> Tuple[bool, str]:
+    """
+    Show how a file differs from the version the session last viewed or
+    edited, as a unified diff, and make the current version the new base.
+    If the session only viewed some lines, only changes touching those lines
+    are shown. Without a remembered version the file is shown in full, as by
+    view.
+
+    Args:
+        session_id: The session asking
+        file_path: The absolute path to the file
+        max_bytes: The output budget; a larger diff is not returned
+
+    Returns:
+        Tuple of (success, message)
+    """
+    key = (get_tenant(), session_id, file_path)
+    if not os.path.isfile(file_path):
+        _snapshots.discard(key)
+        return False, f"Error: File not found: {file_path}"
+
+    seen = _snapshots.get(key)
+    if seen is None:
+        metrics.increment("view_diff.full_views")
+        with seen_by(session_id):
+            content = read_file_with_line_numbers(file_path, max_bytes=max_bytes)
+        if content.startswith("Error"):
+            return False, content
+        return True, "No earlier view of this file in this session, so here it is in full.\n" + content
+
+    seen_version, seen_data, seen_ranges = seen
+    try:
+        stat_result, data = read_file_bytes_with_stat(file_path)
+    except OSError as e:
+        return False, f"Error reading file: {str(e)}"
+    version = file_version(stat_result)
+    if version == seen_version or data == seen_data:
+        metrics.increment("view_diff.unchanged")
+        if version != seen_version:
+            _snapshots.put(key, version, data, seen_ranges)
+        return True, f"No changes since you last viewed or edited this file (version {version})."
+
+    old, new = _split_lines(seen_data), _split_lines(data)
+    opcodes = diff_lines(old, new)
+    shown = opcodes
+    note = []
+    new_ranges = None
+    if seen_ranges is not None:
+        # Changes to lines the session never saw would be shown without context
+        shown = [opcode for opcode in opcodes if opcode[0] == "equal" or _overlaps(opcode, seen_ranges)]
+        hidden = sum(1 for opcode in opcodes if opcode[0] != "equal") - sum(1 for opcode in shown if opcode[0] != "equal")
+        note = [f"(You had viewed only lines {_describe_ranges(seen_ranges)} of the earlier version.)"]
+        if hidden:
+            note.append(f"({hidden} change(s) elsewhere in the file are not shown; view those lines to see them.)")
+        new_ranges = _merge_ranges([_map_range(opcodes, first, end) for first, end in seen_ranges], len(new))
+
+    name = os.path.relpath(file_path, get_workspace_dir())
+    header = [f"[version: {version}]", f"--- {name} (version {seen_version})", f"+++ {name} (version {version})"]
+    diff = "\n".join(header + format_hunks(old, new, shown) + note)
+    if len(diff.encode("utf-8")) > max_bytes:
+        metrics.increment("view_diff.too_large")
+        return True, (
+            f"[version: {version}]\nThe file changed too much for a compact diff "
+            f"({sum(i2 - i1 for tag, i1, i2, _, _ in shown if tag != 'equal')} line(s) removed, "
+            f"{sum(j2 - j1 for tag, _, _, j1, j2 in shown if tag != 'equal')} added); view it again instead."
+        )
+
+    metrics.increment("view_diff.diffs")
+    if new_ranges == []:
+        # Every line the session had seen was deleted
+        _snapshots.discard(key)
+    else:
+        _snapshots.put(key, version, data, new_ranges)
+    return True, diff
@@ -0,0 +1,109 @@
+"""
+Per-tenant workspace roots, selected through a context variable.
+"""
+
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterator, Optional, Set
+
+from src.config.settings import (
+    WORKSPACE_DIR,
+    BACKUP_DIR,
+    CHECKPOINT_DIR,
+    TENANTS_DIR,
+    DEFAULT_TENANT_ID
+)
+
+# Tenant ids name directories, so they are restricted to a safe character set
+TENANT_ID = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$")
+
+BACKUP_DIR_NAME = os.path.basename(BACKUP_DIR)
+CHECKPOINT_DIR_NAME = os.path.basename(CHECKPOINT_DIR)
+
+# The tenant of the request (or job) being handled; copied into threads
+# started with asyncio.to_thread or contextvars.copy_context()
+_current_tenant: ContextVar[str] = ContextVar("tenant", default=DEFAULT_TENANT_ID)
+
+# Workspace roots whose directories are known to exist
+_ensured_roots: Set[str] = set()
+
+# --------------------------------------------------
+# --- Tenant Context Functions
+# --------------------------------------------------
+
+def is_valid_tenant_id(tenant_id: str) -> bool:
+    """Check that a tenant id is safe to use as a directory name."""
+    return bool(TENANT_ID.match(tenant_id))
+
+
+def get_tenant() -> str:
+    """Return the current tenant id."""
+    return _current_tenant.get()
+
+
+def set_tenant(tenant_id: str) -> Token:
+    """
+    Make tenant_id the current tenant.
+
+    Returns:
+        A token for reset_tenant
+
+    Raises:
+        ValueError: If the tenant id is not valid
+    """
+    if not is_valid_tenant_id(tenant_id):
+        raise ValueError(f"Invalid tenant id: {tenant_id!r}")
+    return _current_tenant.set(tenant_id)
+
+
+def reset_tenant(token: Token) -> None:
+    """Restore the tenant that was current before set_tenant."""
+    _current_tenant.reset(token)
+
+
+@contextmanager
+def tenant_scope(tenant_id: str) -> Iterator[None]:
+    """Run a block with tenant_id as the current tenant."""
+    token = set_tenant(tenant_id)
+    try:
+        yield
+    finally:
+        reset_tenant(token)
+
+# --------------------------------------------------
+# --- Workspace Directory Functions
+# --------------------------------------------------
+
+def get_workspace_dir(tenant_id: Optional[str] = None) -> str:
+    """
+    Return a tenant's workspace root, creating it on first use.
+
+    Args:
+        tenant_id: The tenant (defaults to the current tenant)
+
+    Returns:
+        The absolute path of the workspace root
+    """
+    tenant_id = tenant_id or get_tenant()
+    root = WORKSPACE_DIR if tenant_id == DEFAULT_TENANT_ID else os.path.join(TENANTS_DIR, tenant_id)
+    if root not in _ensured_roots:
+        os.makedirs(os.path.join(root, BACKUP_DIR_NAME), exist_ok=True)
+        _ensured_roots.add(root)
+    return root
+
+
+def get_backup_dir(tenant_id: Optional[str] = None) -> str:
+    """Return the directory holding a tenant's file backups."""
+    return os.path.join(get_workspace_dir(tenant_id), BACKUP_DIR_NAME)
+
+
+def get_checkpoint_dir(tenant_id: Optional[str] = None) -> str:
+    """Return the directory holding a tenant's workspace checkpoints."""
+    return os.path.join(get_workspace_dir(tenant_id), CHECKPOINT_DIR_NAME)
+
+
+def is_within(path: str, root: str) -> bool:
+    """Check that path is root itself or inside it (a plain prefix check would accept root + "-other")."""
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
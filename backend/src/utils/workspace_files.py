@@ -0,0 +1,83 @@
+"""
+Quota-charged atomic writes and deletes of workspace files.
+"""
+
+import os
+from typing import Iterable, Union
+
+from src.utils.atomic_write import atomic_write, atomic_write_chunks
+from src.utils.content_cache import invalidate_file
+from src.utils.quota import release, reserve
+from src.utils.workspace import get_backup_dir
+
+# --------------------------------------------------
+# --- Workspace Setup Functions
+# --------------------------------------------------
+
+def ensure_workspace_directories() -> None:
+    """Create the default workspace and backup directories if they don't exist."""
+    get_backup_dir()
+
+
+def write_workspace_file(file_path: str, data: Union[str, bytes], exclusive: bool = False) -> None:
+    """
+    Write a workspace file atomically, charging the size change to the
+    current tenant's quota first.
+    
+    Args:
+        file_path: The absolute path to the file
+        data: The new content (str is encoded as UTF-8)
+        exclusive: Fail with FileExistsError instead of replacing an existing file
+        
+    Raises:
+        QuotaExceededError: If the write would exceed the workspace quota
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        old_size, new_files = os.path.getsize(file_path), 0
+    except FileNotFoundError:
+        old_size, new_files = 0, 1
+        
+    reserve(len(data) - old_size, new_files)
+    try:
+        atomic_write(file_path, data, exclusive=exclusive)
+    except BaseException:
+        release(len(data) - old_size, new_files)
+        raise
+
+
+def write_workspace_file_chunks(file_path: str, chunks: Iterable[bytes], size: int, exclusive: bool = False) -> None:
+    """
+    Write a workspace file atomically from chunks (e.g. streamed from an
+    archive), charging its size to the current tenant's quota first.
+    
+    Args:
+        file_path: The absolute path to the file
+        chunks: The new content, a piece at a time
+        size: The total length of the chunks
+        exclusive: Fail with FileExistsError instead of replacing an existing file
+        
+    Raises:
+        QuotaExceededError: If the write would exceed the workspace quota
+    """
+    try:
+        old_size, new_files = os.path.getsize(file_path), 0
+    except FileNotFoundError:
+        old_size, new_files = 0, 1
+        
+    reserve(size - old_size, new_files)
+    try:
+        atomic_write_chunks(file_path, chunks, exclusive=exclusive)
+    except BaseException:
+        release(size - old_size, new_files)
+        raise
+    invalidate_file(file_path)
+
+
+def remove_workspace_file(file_path: str) -> None:
+    """Delete a workspace file and credit its size back to the current tenant's quota."""
+    size = os.path.getsize(file_path)
+    os.remove(file_path)
+    invalidate_file(file_path)
+    release(size, 1)
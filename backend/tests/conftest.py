@@ -0,0 +1,37 @@
+"""
+Shared fixtures. Runtime data (tenant workspaces, the conversation and usage
+databases) goes to a temporary directory, set before the settings module
+reads the environment.
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+
+import pytest
+
+_data_dir = tempfile.mkdtemp(prefix="editor-tests-")
+os.environ.setdefault("TENANTS_DIR", os.path.join(_data_dir, "tenants"))
+os.environ.setdefault("CONVERSATION_DB_PATH", os.path.join(_data_dir, "conversations.db"))
+os.environ.setdefault("WORKSPACE_USAGE_DB_PATH", os.path.join(_data_dir, "workspace_usage.db"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_data_dir, "profiles"))
+os.environ.setdefault("FILE_LOCK_DIR", os.path.join(_data_dir, "locks"))
+os.environ.setdefault("CHECKPOINTS_ENABLED", "false")
+os.environ.setdefault("ADMIN_TOKEN", "test-admin-token")
+
+from src.utils.workspace import get_workspace_dir, tenant_scope  # noqa: E402
+
+
+@pytest.fixture
+def workspace():
+    """An empty workspace of its own tenant, current for the test; yields its root."""
+    tenant_id = f"test-{uuid.uuid4().hex[:12]}"
+    with tenant_scope(tenant_id):
+        root = get_workspace_dir()
+        yield root
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_data_dir, ignore_errors=True)
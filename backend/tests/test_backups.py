@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from src.utils import file_utils, quota
+from src.utils.backups import create_backup, list_backups, prune_backups
+from src.utils.file_utils import replace_text_in_file
+
+
+@pytest.fixture
+def charged(monkeypatch):
+    """Turn on quota accounting so backups are charged to the usage counters."""
+    monkeypatch.setattr(quota, "WORKSPACE_MAX_BYTES", 10 ** 9)
+
+
+def write(workspace, name, text):
+    path = os.path.join(workspace, name)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def test_edits_keep_the_newest_backups(workspace):
+    path = write(workspace, "a.py", "n = 0\n")
+    for n in range(12):
+        assert replace_text_in_file(path, f"n = {n}", f"n = {n + 1}")[0]
+    backups = list_backups(path)
+    assert len(backups) == 10
+    # Newest first: the last edit backed up "n = 11"
+    with open(backups[0]) as f:
+        assert f.read() == "n = 11\n"
+
+
+def test_pruning_releases_the_backups_bytes(workspace, charged):
+    path = write(workspace, "a.py", "x" * 100)
+    other = write(workspace, "a.py.old.py", "y" * 50)
+    for _ in range(3):
+        create_backup(path)
+    create_backup(other)
+    before = quota.get_usage()["used_bytes"]
+
+    prune_backups(path, keep=1)
+    assert len(list_backups(path)) == 1
+    assert len(list_backups(other)) == 1
+    assert quota.get_usage()["used_bytes"] == before - 200
+    assert quota.recount_usage()["used_bytes"] == before - 200
+
+
+def test_edit_goes_ahead_when_the_backup_fails(workspace, monkeypatch):
+    monkeypatch.setattr(file_utils, "create_backup", lambda file_path: None)
+    path = write(workspace, "a.py", "a = 1\n")
+    success, message = replace_text_in_file(path, "a = 1", "a = 2")
+    assert success, message
+    assert "Backup created at N/A" in message
+
+
+def test_same_named_files_keep_their_own_backups(workspace, charged):
+    os.makedirs(os.path.join(workspace, "a"))
+    os.makedirs(os.path.join(workspace, "b"))
+    first = write(workspace, "a/__init__.py", "A = 1\n")
+    second = write(workspace, "b/__init__.py", "B = 1\n")
+    create_backup(first)
+    for _ in range(12):
+        create_backup(second)
+
+    # Pruning b's backups neither deletes nor lists a's
+    assert len(list_backups(second)) == 10
+    [backup] = list_backups(first)
+    assert os.path.dirname(backup) == os.path.join(workspace, ".backups", "a")
+    with open(backup) as f:
+        assert f.read() == "A = 1\n"
+    assert quota.recount_usage()["used_bytes"] == quota.get_usage()["used_bytes"]
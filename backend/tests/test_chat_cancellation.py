@@ -0,0 +1,78 @@
+import asyncio
+import os
+import types
+
+import pytest
+
+from src import chatbot as chatbot_module
+from src.chatbot import ClaudeTextEditorChatbot
+from src.services.chat_cancellation import ChatCancelledError, get_chat_registry
+from src.storage.conversation_store import InMemoryConversationStore, SQLiteConversationStore
+
+
+def response(stop_reason, *content):
+    return types.SimpleNamespace(stop_reason=stop_reason, content=list(content))
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def chatbot(request, monkeypatch, tmp_path):
+    monkeypatch.setattr(chatbot_module, "get_anthropic_client", lambda: None)
+    if request.param == "memory":
+        store = InMemoryConversationStore()
+    else:
+        store = SQLiteConversationStore(str(tmp_path / "conversations.db"))
+    bot = ClaudeTextEditorChatbot("session-1", store)
+    bot.add_user_message("earlier")
+    bot.add_assistant_message([{"type": "text", "text": "done"}])
+    return bot
+
+
+def cancel_turn(bot, replies):
+    """Run a turn whose model calls return `replies` in order and then hang, and cancel it."""
+    replies = list(replies)
+
+    async def get_response(priority):
+        if replies:
+            return replies.pop(0)
+        await asyncio.Event().wait()
+
+    bot.get_assistant_response_async = get_response
+
+    async def scenario():
+        turn = asyncio.ensure_future(get_chat_registry().run("chat-1", bot.chat_async("new turn")))
+        while replies or not get_chat_registry().is_running("chat-1"):
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        get_chat_registry().cancel("chat-1")
+        with pytest.raises(ChatCancelledError):
+            await turn
+
+    asyncio.run(scenario())
+
+
+def texts(records):
+    return [message["content"] if isinstance(message["content"], str) else message["content"][0]["type"]
+            for message in (record.to_dict() for record in records)]
+
+
+def test_cancelled_turn_is_rolled_back(chatbot):
+    cancel_turn(chatbot, [])
+    assert texts(chatbot.conversation) == ["earlier", "text"]
+    assert texts(chatbot.store.load_tail("session-1", 10)) == ["earlier", "text"]
+
+
+def test_cancelled_tool_loop_is_rolled_back(chatbot, workspace):
+    tool_use = {
+        "type": "tool_use",
+        "id": "t1",
+        "name": "str_replace_editor",
+        "input": {"command": "create", "path": "a.py", "file_text": "x = 1\n"}
+    }
+    cancel_turn(chatbot, [response("tool_use", tool_use)])
+    assert texts(chatbot.store.load_tail("session-1", 10)) == ["earlier", "text"]
+    # The edit made before the cancellation stays
+    assert os.path.isfile(os.path.join(workspace, "a.py"))
+
+    # The next turn starts from the earlier history only
+    chatbot.load_history()
+    assert texts(chatbot.conversation) == ["earlier", "text"]
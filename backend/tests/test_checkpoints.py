@@ -0,0 +1,101 @@
+import contextvars
+import os
+import threading
+
+from src.services import checkpoints
+from src.services.checkpoints import (
+    create_checkpoint,
+    diff_checkpoint,
+    diff_checkpoint_file,
+    list_checkpoints,
+    restore_checkpoint
+)
+from src.utils.file_versions import path_lock
+from src.utils.workspace_files import remove_workspace_file, write_workspace_file
+
+
+def write(root, name, text):
+    path = os.path.join(root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_workspace_file(path, text)
+    return path
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def change_workspace(root):
+    """Modify a.py, delete b.py and add new/c.py."""
+    write(root, "a.py", "a = 2\n")
+    remove_workspace_file(os.path.join(root, "b.py"))
+    return write(root, "new/c.py", "c = 1\n")
+
+
+def test_diff_lists_changes_since_the_checkpoint(workspace):
+    write(workspace, "a.py", "a = 1\n")
+    write(workspace, "b.py", "b = 1\n")
+    checkpoint = create_checkpoint("before")
+    assert checkpoint["file_count"] == 2
+    change_workspace(workspace)
+
+    assert diff_checkpoint(checkpoint["id"]) == {
+        "added": ["new/c.py"],
+        "removed": ["b.py"],
+        "modified": ["a.py"]
+    }
+    diff = diff_checkpoint_file(checkpoint["id"], "a.py")
+    assert "-a = 1\n" in diff and "+a = 2\n" in diff
+
+
+def test_restore_puts_files_back_and_deletes_added_ones(workspace):
+    a = write(workspace, "a.py", "a = 1\n")
+    b = write(workspace, "b.py", "b = 1\n")
+    checkpoint = create_checkpoint("before")
+    c = change_workspace(workspace)
+
+    result = restore_checkpoint(checkpoint["id"])
+    assert result["restored"] == ["b.py", "a.py"]
+    assert result["deleted"] == ["new/c.py"]
+    assert (read(a), read(b)) == ("a = 1\n", "b = 1\n")
+    assert not os.path.exists(c) and not os.path.exists(os.path.dirname(c))
+    assert diff_checkpoint(checkpoint["id"]) == {"added": [], "removed": [], "modified": []}
+
+    # The safety checkpoint undoes the restore
+    restore_checkpoint(result["safety_checkpoint_id"])
+    assert read(a) == "a = 2\n" and read(c) == "c = 1\n" and not os.path.exists(b)
+
+
+def test_restore_waits_for_the_file_lock(workspace):
+    a = write(workspace, "a.py", "a = 1\n")
+    checkpoint = create_checkpoint("before")
+    write(workspace, "a.py", "a = 2\n")
+    results = []
+    # The worker runs in this test's tenant
+    context = contextvars.copy_context()
+    with path_lock(a):
+        worker = threading.Thread(target=context.run, args=(lambda: results.append(restore_checkpoint(checkpoint["id"])),))
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive()
+        assert read(a) == "a = 2\n"
+    worker.join(5)
+    assert results[0]["restored"] == ["a.py"]
+    assert read(a) == "a = 1\n"
+
+
+def test_oldest_checkpoints_go_when_their_data_passes_the_cap(workspace, monkeypatch):
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_MAX_BYTES", 250)
+    write(workspace, "a.py", "1" * 100)
+    first = create_checkpoint("1")
+    write(workspace, "a.py", "2" * 100)
+    second = create_checkpoint("2")
+    write(workspace, "a.py", "3" * 100)
+    # first and second each hold 100 bytes the workspace no longer has
+    third = create_checkpoint("3")
+    assert [c["id"] for c in list_checkpoints()] == [third["id"], second["id"], first["id"]]
+
+    write(workspace, "a.py", "4" * 100)
+    fourth = create_checkpoint("4")
+    assert [c["id"] for c in list_checkpoints()] == [fourth["id"], third["id"], second["id"]]
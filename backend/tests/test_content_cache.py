@@ -0,0 +1,61 @@
+import os
+
+from src.utils import metrics
+from src.utils.atomic_write import atomic_write
+from src.utils.content_cache import ContentCache, read_file_bytes
+
+
+def counter(name):
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def test_hits_and_misses(tmp_path):
+    cache = ContentCache(max_bytes=1024)
+    path = write(tmp_path / "a.py", b"x = 1\n")
+    hits, misses = counter("content_cache.hits"), counter("content_cache.misses")
+    assert cache.read(path) == b"x = 1\n"
+    assert cache.read(path) is cache.read(path)
+    assert counter("content_cache.misses") == misses + 1
+    assert counter("content_cache.hits") == hits + 2
+
+
+def test_outside_change_is_seen(tmp_path):
+    cache = ContentCache(max_bytes=1024)
+    path = write(tmp_path / "a.py", b"x = 1\n")
+    cache.read(path)
+    # Replaced by another program: new inode and size
+    os.remove(path)
+    write(tmp_path / "a.py", b"x = 22\n")
+    assert cache.read(path) == b"x = 22\n"
+
+
+def test_writes_go_through_the_shared_cache(tmp_path):
+    path = str(tmp_path / "a.py")
+    atomic_write(path, b"x = 1\n")
+    misses = counter("content_cache.misses")
+    assert read_file_bytes(path) == b"x = 1\n"
+    atomic_write(path, b"x = 2\n")
+    assert read_file_bytes(path) == b"x = 2\n"
+    assert counter("content_cache.misses") == misses
+
+
+def test_eviction_by_size(tmp_path):
+    cache = ContentCache(max_bytes=100, max_file_bytes=60)
+    paths = [write(tmp_path / f"{n}.py", bytes([97 + n]) * 40) for n in range(3)]
+    evictions = counter("content_cache.evictions")
+    for path in paths:
+        cache.read(path)
+    # Only the two most recently used files fit
+    assert counter("content_cache.evictions") == evictions + 1
+    assert list(cache._entries) == paths[1:]
+
+    # Files over max_file_bytes are read but never cached
+    big = write(tmp_path / "big.py", b"z" * 80)
+    assert cache.read(big) == b"z" * 80
+    assert big not in cache._entries
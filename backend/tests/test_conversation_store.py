@@ -0,0 +1,46 @@
+from src.storage.conversation_store import SQLiteConversationStore
+from src.storage.message_records import MessageRecord
+
+
+def texts(records):
+    return [record.to_dict()["content"] for record in records]
+
+
+def two_workers(tmp_path):
+    """Two stores on one database, as two worker processes would have."""
+    db_path = str(tmp_path / "conversations.db")
+    return SQLiteConversationStore(db_path), SQLiteConversationStore(db_path)
+
+
+def test_appends_by_another_worker_are_picked_up(tmp_path):
+    first, second = two_workers(tmp_path)
+    first.append("s", MessageRecord("user", "one"))
+    assert texts(first.load_tail("s", 10)) == ["one"]
+    second.append("s", MessageRecord("assistant", "two"))
+    assert texts(first.load_tail("s", 10)) == ["one", "two"]
+
+
+def test_remove_last_elsewhere_then_as_many_appends(tmp_path):
+    first, second = two_workers(tmp_path)
+    for text in ("one", "two", "three"):
+        first.append("s", MessageRecord("user", text))
+    assert texts(first.load_tail("s", 10)) == ["one", "two", "three"]
+
+    # Same last seq as the cached tail, but different messages
+    second.remove_last("s", 2)
+    second.append("s", MessageRecord("user", "four"))
+    second.append("s", MessageRecord("user", "five"))
+    assert texts(first.load_tail("s", 10)) == ["one", "four", "five"]
+
+
+def test_clear_elsewhere_then_as_many_appends(tmp_path):
+    first, second = two_workers(tmp_path)
+    first.append("s", MessageRecord("user", "old"))
+    assert texts(first.load_tail("s", 10)) == ["old"]
+
+    second.clear("s")
+    second.append("s", MessageRecord("user", "new"))
+    # Neither a cached read nor an in-place append may build on the stale tail
+    assert texts(first.load_tail("s", 10)) == ["new"]
+    first.append("s", MessageRecord("assistant", "reply"))
+    assert texts(first.load_tail("s", 10)) == ["new", "reply"]
@@ -0,0 +1,40 @@
+import asyncio
+import os
+
+from src.services.file_batch import plan_batch, run_batch
+from src.tools.commands import parse_editor_command
+
+
+def operations(*items):
+    return [parse_editor_command(item) for item in items]
+
+
+def collect(batch):
+    async def run():
+        return [result async for result in run_batch(batch)]
+
+    return asyncio.run(run())
+
+
+def test_exclusive_command_splits_same_path_edits(workspace):
+    with open(os.path.join(workspace, "a.py"), "w") as f:
+        f.write("x = 1\n")
+    batch = operations(
+        {"command": "str_replace", "path": "a.py", "old_str": "x = 1", "new_str": "x = 2"},
+        {"command": "create", "path": "b.py", "file_text": "b = 1\n"},
+        # Only matches once the edit before it has run
+        {"command": "replace_all", "path": ".", "old_str": "x = 2", "new_str": "x = 3", "glob": "*.py"},
+        {"command": "str_replace", "path": "a.py", "old_str": "x = 3", "new_str": "x = 4"},
+        {"command": "view", "path": os.path.join(workspace, "a.py")}
+    )
+    stages = plan_batch(batch)
+    assert [[[index for index, _ in queue] for queue in stage] for stage in stages] == [[[0], [1]], [[2]], [[3, 4]]]
+
+    results = collect(batch)
+    assert all(result["success"] for result in results), results
+    order = [result["index"] for result in results]
+    assert sorted(order[:2]) == [0, 1]
+    assert order[2:] == [2, 3, 4]
+    assert results[-1]["message"].splitlines()[1:] == ["1: x = 4"]
+    with open(os.path.join(workspace, "a.py")) as f:
+        assert f.read() == "x = 4\n"
@@ -0,0 +1,81 @@
+import contextvars
+import os
+import subprocess
+import sys
+import threading
+
+from src.utils.backups import create_backup
+from src.utils.file_utils import create_new_file, restore_from_backup
+from src.utils.file_versions import path_lock
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Holds a path's lock in another process until its stdin is closed
+HOLDER = """
+import sys
+from src.utils.file_versions import path_lock
+with path_lock(sys.argv[1]):
+    print("locked", flush=True)
+    sys.stdin.read()
+"""
+
+
+def write(root, name, text):
+    path = os.path.join(root, name)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def run_while_locked(path, fn):
+    """Start fn in a thread while path's lock is held; return its result once the lock is released."""
+    results = []
+    # The worker runs in this test's tenant
+    context = contextvars.copy_context()
+    with path_lock(path):
+        worker = threading.Thread(target=context.run, args=(lambda: results.append(fn()),))
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive()
+    worker.join(5)
+    return results[0]
+
+
+def test_undo_waits_for_the_file_lock(workspace):
+    path = write(workspace, "a.py", "a = 1\n")
+    create_backup(path)
+    write(workspace, "a.py", "a = 2\n")
+    success, message = run_while_locked(path, lambda: restore_from_backup(path))
+    assert success, message
+    assert open(path).read() == "a = 1\n"
+
+
+def test_create_waits_for_the_file_lock(workspace):
+    path = os.path.join(workspace, "new.py")
+    success, message = run_while_locked(path, lambda: create_new_file(path, "x = 1\n"))
+    assert success, message
+
+
+def test_lock_is_held_across_processes(workspace):
+    path = os.path.join(workspace, "a.py")
+    holder = subprocess.Popen(
+        [sys.executable, "-c", HOLDER, path],
+        cwd=BACKEND_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        acquired = threading.Event()
+
+        def take():
+            with path_lock(path):
+                acquired.set()
+
+        worker = threading.Thread(target=take)
+        worker.start()
+        assert not acquired.wait(0.2)
+        holder.stdin.close()
+        assert acquired.wait(5)
+        worker.join()
+    finally:
+        holder.kill()
+        holder.wait()
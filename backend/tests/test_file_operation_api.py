@@ -0,0 +1,34 @@
+import asyncio
+import os
+
+import httpx2 as httpx
+
+
+def post(workspace, body):
+    from main import app
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/api/file/operation", json=body, headers={
+                "X-Tenant-ID": workspace.rsplit("/", 1)[-1]
+            })
+
+    return asyncio.run(send())
+
+
+def test_operation_runs_the_typed_command(workspace):
+    response = post(workspace, {"command": "create", "path": "a.py", "parameters": {"file_text": "x = 1\n"}})
+    assert response.status_code == 200
+    assert response.json()["success"]
+    with open(os.path.join(workspace, "a.py")) as f:
+        assert f.read() == "x = 1\n"
+
+
+def test_invalid_operation_fails_with_the_usual_envelope(workspace):
+    # The frontend reads failures from the body, so an invalid command is not a 422
+    response = post(workspace, {"command": "str_replace", "path": "a.py", "parameters": {"new_str": "y"}})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["success"], body["error"]) == (False, True)
+    assert body["message"].startswith("Error: Invalid parameters:")
+    assert "old_str" in body["message"]
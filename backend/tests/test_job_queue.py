@@ -0,0 +1,105 @@
+import asyncio
+
+from src.services.job_queue import JOB_COMPLETED, JOB_QUEUED, FINISHED_STATES, ChatJobQueue
+from src.services.session_locks import session_turn_lock
+from src.utils.workspace import tenant_scope
+
+
+class FakeChatbot:
+    """Records how many turns run at once on the same chatbot."""
+
+    running = 0
+    most_running = 0
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+
+    async def chat_async(self, message, priority):
+        FakeChatbot.running += 1
+        FakeChatbot.most_running = max(FakeChatbot.most_running, FakeChatbot.running)
+        await asyncio.sleep(0.01)
+        FakeChatbot.running -= 1
+        return f"re: {message}"
+
+
+async def finished(job):
+    while job.status not in FINISHED_STATES:
+        await job.wait_for_update(1)
+    return job
+
+
+def test_jobs_wait_for_their_sessions_running_turn():
+    async def scenario():
+        queue = ChatJobQueue(FakeChatbot, workers=2)
+        await queue.start()
+        try:
+            # Stands in for an /api/chat turn of session s1
+            async with session_turn_lock("s1"):
+                blocked = queue.submit("s1", "a")
+                other = queue.submit("s2", "b")
+                await asyncio.wait_for(finished(other), 1)
+                assert blocked.status == JOB_QUEUED
+            await asyncio.wait_for(finished(blocked), 1)
+            assert (blocked.status, blocked.response) == (JOB_COMPLETED, "re: a")
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_one_turn_at_a_time_per_session():
+    async def scenario():
+        queue = ChatJobQueue(FakeChatbot, workers=4)
+        await queue.start()
+        try:
+            jobs = [queue.submit("s1", str(n)) for n in range(4)]
+            await asyncio.wait_for(asyncio.gather(*map(finished, jobs)), 2)
+        finally:
+            await queue.stop()
+        return jobs
+
+    FakeChatbot.most_running = 0
+    jobs = asyncio.run(scenario())
+    assert FakeChatbot.most_running == 1
+    assert [job.response for job in jobs] == ["re: 0", "re: 1", "re: 2", "re: 3"]
+    assert sorted(jobs, key=lambda job: job.started_at) == jobs
+
+
+def test_a_sessions_backlog_does_not_hold_other_workers():
+    release = asyncio.Event()
+
+    class GatedChatbot(FakeChatbot):
+        async def chat_async(self, message, priority):
+            if self.session_id == "s1":
+                await release.wait()
+            return f"re: {message}"
+
+    async def scenario():
+        queue = ChatJobQueue(GatedChatbot, workers=2)
+        await queue.start()
+        try:
+            backlog = [queue.submit("s1", str(n)) for n in range(3)]
+            other = queue.submit("s2", "b")
+            # The second worker is free for s2 while s1's first job runs
+            await asyncio.wait_for(finished(other), 1)
+            assert [job.status for job in backlog] == ["running", JOB_QUEUED, JOB_QUEUED]
+            release.set()
+            await asyncio.wait_for(asyncio.gather(*map(finished, backlog)), 1)
+            assert [job.response for job in backlog] == ["re: 0", "re: 1", "re: 2"]
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_jobs_are_only_visible_to_their_tenant():
+    async def scenario():
+        queue = ChatJobQueue(FakeChatbot, workers=1)
+        with tenant_scope("tenant-a"):
+            job = queue.submit("s1", "a")
+            assert queue.get(job.job_id) is job
+        with tenant_scope("tenant-b"):
+            assert queue.get(job.job_id) is None
+            assert not queue.cancel(job.job_id)
+
+    asyncio.run(scenario())
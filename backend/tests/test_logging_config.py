@@ -0,0 +1,47 @@
+import json
+import logging
+import queue
+import subprocess
+import sys
+
+from tests.test_startup import BACKEND_DIR
+
+from src.utils.logging_config import ContextFilter, JsonFormatter, NonBlockingQueueHandler, log_context
+
+
+def test_repeated_and_reloaded_configuration_keeps_one_writer():
+    # Run in a fresh interpreter: reloading the module here would leave the
+    # other tests holding the old module's context variable
+    script = (
+        "import importlib, logging, threading\n"
+        "from src.utils import logging_config\n"
+        "assert logging_config.configure_logging()\n"
+        "assert not logging_config.configure_logging()\n"
+        "importlib.reload(logging_config)\n"
+        "assert logging_config.configure_logging()\n"
+        "logging.getLogger('t').warning('once')\n"
+        "print(threading.active_count(), len(logging.getLogger().handlers), flush=True)\n"
+        "logging_config.stop_logging()\n"
+        "print(logging.getLogger().handlers, flush=True)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    lines = result.stdout.splitlines()
+    # One writer thread and one handler, the record was written once, and
+    # stopping puts back the handlers from before the first configuration
+    assert [line for line in lines if not line.startswith("{")] == ["2 1", "[]"]
+    assert sum('"message": "once"' in line for line in lines) == 1
+
+
+def test_json_record_carries_the_log_context():
+    record = logging.makeLogRecord({"name": "t", "levelno": logging.INFO, "levelname": "INFO", "msg": "hi %s", "args": ("there",)})
+    with log_context(command="view", path="a.py"):
+        ContextFilter().filter(record)
+    entry = json.loads(JsonFormatter().format(record))
+    assert (entry["message"], entry["command"], entry["path"]) == ("hi there", "view", "a.py")
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    for _ in range(3):
+        handler.handle(logging.makeLogRecord({"msg": "x"}))
+    assert handler.queue.qsize() == 1
@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.services.model_scheduler import ModelCallScheduler
+
+
+class FakeAsyncRawResponse:
+    """Shaped like the async SDK's raw response: headers, and a coroutine parse()."""
+
+    def __init__(self, message, headers):
+        self.headers = headers
+        self._message = message
+
+    async def parse(self):
+        return self._message
+
+
+class FakeRawResponse(FakeAsyncRawResponse):
+    def parse(self):
+        return self._message
+
+
+def make_message(input_tokens=10, output_tokens=5):
+    return SimpleNamespace(content=[], usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens))
+
+
+def test_call_async_parses_the_raw_response():
+    scheduler = ModelCallScheduler(requests_per_minute=100, tokens_per_minute=10000, max_concurrency=4)
+    message = make_message()
+    headers = {"anthropic-ratelimit-requests-remaining": "7", "anthropic-ratelimit-tokens-remaining": "500"}
+
+    async def create():
+        return FakeAsyncRawResponse(message, headers)
+
+    assert asyncio.run(scheduler.call_async(create, tokens=100)) is message
+    # The rate-limit headers were read: the buckets are down to what the server
+    # reported (plus the unused part of the estimate, refunded from usage)
+    assert scheduler._requests.level <= 7
+    assert scheduler._tokens.level <= 500 + 100
+    assert scheduler._in_flight == 0
+
+
+def test_call_async_replaces_the_token_estimate_with_usage():
+    scheduler = ModelCallScheduler(requests_per_minute=100, tokens_per_minute=10000, max_concurrency=4)
+
+    async def create():
+        return FakeAsyncRawResponse(make_message(input_tokens=3000, output_tokens=1000), {})
+
+    asyncio.run(scheduler.call_async(create, tokens=100))
+    # 4000 tokens were used in all, not the estimated 100
+    assert scheduler._tokens.level <= 10000 - 4000 + 50
+
+
+def test_call_parses_the_sync_raw_response():
+    scheduler = ModelCallScheduler(requests_per_minute=100, tokens_per_minute=10000)
+    message = make_message()
+    assert scheduler.call(lambda: FakeRawResponse(message, {}), tokens=100) is message
+    assert scheduler._in_flight == 0
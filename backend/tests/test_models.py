@@ -0,0 +1,82 @@
+import pytest
+from pydantic import ValidationError
+
+from src.api.models import (
+    ApplyPatchCommand,
+    FileOperationBatch,
+    InsertCommand,
+    ReplaceAllCommand,
+    StrReplaceCommand,
+    ViewCommand,
+    ViewDiffCommand,
+    parse_editor_command
+)
+
+
+@pytest.mark.parametrize("data, model", [
+    ({"command": "view", "path": "a.py", "view_range": [1, 10]}, ViewCommand),
+    ({"command": "view_diff", "path": "a.py"}, ViewDiffCommand),
+    ({"command": "str_replace", "path": "a.py", "old_str": "x", "new_str": "y", "expected_version": "1-2-3"}, StrReplaceCommand),
+    ({"command": "insert", "path": "a.py", "insert_line": 3, "new_str": "z"}, InsertCommand),
+    ({"command": "apply_patch", "path": ".", "patch": "--- a/a.py\n+++ b/a.py\n"}, ApplyPatchCommand),
+    ({"command": "replace_all", "path": "src", "old_str": "a", "regex": True, "glob": "*.py"}, ReplaceAllCommand),
+])
+def test_round_trip(data, model):
+    command = parse_editor_command(data)
+    assert isinstance(command, model)
+    dumped = command.model_dump(exclude_defaults=True)
+    assert dumped == {key: value for key, value in data.items()}
+    assert parse_editor_command(command.model_dump()) == command
+
+
+def test_nested_parameters_are_flattened():
+    command = parse_editor_command({"command": "str_replace", "path": "a.py", "parameters": {"old_str": "x", "new_str": "y"}})
+    assert (command.old_str, command.new_str) == ("x", "y")
+
+
+def test_top_level_fields_win_over_parameters():
+    command = parse_editor_command({"command": "view", "path": "a.py", "parameters": {"path": "b.py"}})
+    assert command.path == "a.py"
+
+
+def test_unknown_parameters_are_ignored():
+    command = parse_editor_command({"command": "view", "path": "a.py", "bogus": 1})
+    assert not hasattr(command, "bogus")
+
+
+def test_defaults():
+    command = parse_editor_command({"command": "insert", "path": "a.py"})
+    assert (command.insert_line, command.new_str, command.expected_version) == (0, "", None)
+
+
+def test_object_with_attributes():
+    class ToolInput:
+        command = "create"
+        path = "a.py"
+        file_text = "hello"
+
+    assert parse_editor_command(ToolInput()).file_text == "hello"
+
+
+@pytest.mark.parametrize("data, location", [
+    ({"command": "str_replace", "path": "a.py"}, ("str_replace", "old_str")),
+    ({"command": "insert", "path": "a.py", "insert_line": "three"}, ("insert", "insert_line")),
+    ({"command": "view", "path": "a.py", "view_range": "1-10"}, ("view", "view_range")),
+])
+def test_invalid_parameters(data, location):
+    with pytest.raises(ValidationError) as error:
+        parse_editor_command(data)
+    assert error.value.errors()[0]["loc"][:2] == location
+
+
+def test_unknown_command():
+    with pytest.raises(ValidationError):
+        parse_editor_command({"command": "delete", "path": "a.py"})
+
+
+def test_batch_parses_each_operation():
+    batch = FileOperationBatch.model_validate({"operations": [
+        {"command": "view", "path": "a.py"},
+        {"command": "outline", "path": "b.py"},
+    ]})
+    assert [operation.command for operation in batch.operations] == ["view", "outline"]
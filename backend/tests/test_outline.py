@@ -0,0 +1,72 @@
+import os
+
+from src.utils import outline
+from src.utils.file_utils import replace_text_in_file
+from src.utils.outline import format_outline, get_outline
+
+SOURCE = """\
+import functools
+
+
+@functools.total_ordering
+class Point:
+    def __init__(self, x):
+        self.x = x
+
+    async def fetch(self):
+        def inner():
+            pass
+        return inner
+
+
+async def main():
+    pass
+"""
+
+
+def write(root, name, text):
+    path = os.path.join(root, name)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def test_python_outline_nests_definitions(workspace):
+    path = write(workspace, "a.py", SOURCE)
+    success, message = format_outline(path)
+    assert success, message
+    assert message.splitlines() == [
+        "Outline of a.py (5 symbols):",
+        # The decorator is part of the class's span
+        "class Point [4-12]",
+        "  method __init__ [6-7]",
+        "  async method fetch [9-12]",
+        "    function inner [10-11]",
+        "async function main [15-16]"
+    ]
+
+
+def test_syntax_error_falls_back_to_regexes(workspace):
+    path = write(workspace, "a.py", "class A:\n    def f(self:\n        pass\n")
+    success, message = format_outline(path)
+    assert success, message
+    assert message.splitlines() == [
+        "Outline of a.py (2 symbols) - Syntax error at line 2; outline is approximate:",
+        "class A [1-3]",
+        "  function f [2-3]"
+    ]
+
+
+def test_editor_writes_refresh_the_cached_outline(workspace):
+    path = write(workspace, "a.py", SOURCE)
+    entries, _ = get_outline(path)
+    assert entries[-1][2] == "main"
+
+    success, message = replace_text_in_file(path, "async def main():", "async def run():")
+    assert success, message
+    # The write listener re-outlined the new content before anyone asked
+    cached = outline._cache[path]
+    stat_result = os.stat(path)
+    assert cached[0] == (stat_result.st_mtime_ns, stat_result.st_size)
+    assert cached[1][-1] == (0, "async function", "run", 15, 16)
+    assert get_outline(path) == (cached[1], None)
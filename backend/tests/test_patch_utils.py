@@ -0,0 +1,135 @@
+import contextvars
+import os
+import threading
+
+from src.utils import patch_utils, quota
+from src.utils.backups import create_backup, list_backups
+from src.utils.file_versions import file_version, path_lock
+from src.utils.patch_utils import apply_patch
+
+
+def write(root, name, text):
+    path = os.path.join(root, name)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+PATCH = """--- a/a.py
++++ b/a.py
+@@ -1,2 +1,2 @@
+ x = 1
+-y = 2
++y = 3
+"""
+
+
+def test_expected_versions_match(workspace):
+    path = write(workspace, "a.py", "x = 1\ny = 2\n")
+    success, message = apply_patch(PATCH, {"a.py": file_version(os.stat(path))})
+    assert success, message
+    assert read(path) == "x = 1\ny = 3\n"
+    assert f"version {file_version(os.stat(path))}" in message
+
+
+def test_expected_versions_conflict(workspace):
+    path = write(workspace, "a.py", "x = 1\ny = 2\n")
+    stale = file_version(os.stat(path))
+    write(workspace, "a.py", "x = 1\ny = 2\n# changed\n")
+    success, message = apply_patch(PATCH, {"a.py": stale})
+    assert not success
+    assert message.startswith("Error: Version conflict")
+    assert read(path) == "x = 1\ny = 2\n# changed\n"
+
+
+def test_expected_versions_must_name_patched_files(workspace):
+    path = write(workspace, "a.py", "x = 1\ny = 2\n")
+    success, message = apply_patch(PATCH, {"b.py": file_version(os.stat(path))})
+    assert not success and "does not change" in message
+
+
+def test_waits_for_the_file_lock(workspace):
+    path = write(workspace, "a.py", "x = 1\ny = 2\n")
+    results = []
+    # The worker runs in this test's tenant
+    context = contextvars.copy_context()
+    with path_lock(path):
+        worker = threading.Thread(target=context.run, args=(lambda: results.append(apply_patch(PATCH)),))
+        worker.start()
+        worker.join(0.2)
+        # Blocked behind the edit holding the lock, before reading the file
+        assert worker.is_alive()
+        write(workspace, "a.py", "x = 1\ny = 20\n")
+    worker.join()
+    # The patch was checked against the content the other edit left
+    assert not results[0][0]
+    assert read(path) == "x = 1\ny = 20\n"
+
+
+DELETE_PATCH = """--- a/a.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+-x = 1
+-y = 2
+"""
+
+
+def test_delete_matching_the_file(workspace):
+    path = write(workspace, "a.py", "x = 1\ny = 2\n")
+    success, message = apply_patch(DELETE_PATCH)
+    assert success, message
+    assert not os.path.exists(path)
+
+
+def test_delete_of_a_changed_file_is_refused(workspace):
+    path = write(workspace, "a.py", "x = 1\ny = 2\nz = 3\n")
+    success, message = apply_patch(DELETE_PATCH)
+    assert not success
+    assert "a.py: Deletion hunks do not cover the current file content (1 line(s) left)" in message
+    assert read(path) == "x = 1\ny = 2\nz = 3\n"
+
+    write(workspace, "a.py", "x = 1\ny = 20\n")
+    success, message = apply_patch(DELETE_PATCH)
+    assert not success and "does not match" in message
+
+
+def test_failed_backup_removes_the_rest_of_the_set(workspace, monkeypatch):
+    monkeypatch.setattr(quota, "WORKSPACE_MAX_BYTES", 10 ** 9)
+    a = write(workspace, "a.py", "x = 1\ny = 2\n")
+    b = write(workspace, "b.py", "x = 1\ny = 2\n")
+    monkeypatch.setattr(
+        patch_utils, "create_backup",
+        lambda file_path, backup_id, prune=True: None if file_path == b else create_backup(file_path, backup_id, prune)
+    )
+    before = quota.get_usage()["used_bytes"]
+
+    success, message = apply_patch(PATCH + PATCH.replace("a.py", "b.py"))
+    assert not success
+    assert message == "Error: Patch not applied, could not back up b.py"
+    assert list_backups(a) == []
+    assert quota.get_usage()["used_bytes"] == before
+    assert read(a) == "x = 1\ny = 2\n"
+
+
+def test_backup_set_is_pruned_only_after_the_writes(workspace, monkeypatch):
+    a = write(workspace, "a.py", "x = 1\ny = 2\n")
+    for _ in range(10):
+        create_backup(a)
+    counts = []
+    write_file = patch_utils._write_file_safely
+    monkeypatch.setattr(patch_utils, "_write_file_safely", lambda fp: counts.append(len(list_backups(a))) or write_file(fp))
+
+    success, message = apply_patch(PATCH)
+    assert success, message
+    # The set's backup was taken without pruning, then pruned once the write was done
+    assert counts == [11]
+    backups = list_backups(a)
+    assert len(backups) == 10
+    set_id = message.split("backup set ")[1].split(")")[0]
+    assert f".{set_id}-0.bak" in backups[0]
+    assert read(backups[0]) == "x = 1\ny = 2\n"
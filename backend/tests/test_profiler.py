@@ -0,0 +1,81 @@
+import asyncio
+import pstats
+
+import httpx2 as httpx
+import pytest
+from fastapi import HTTPException
+
+from src.api import dependencies
+from src.config.settings import ADMIN_TOKEN
+from src.utils.profiler import get_profile_path, list_profiles
+
+
+def profiled_functions(name):
+    stats = pstats.Stats(get_profile_path(name))
+    return {function for _, _, function in stats.stats}
+
+
+def post_operations(operations, headers):
+    from main import app
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/api/file/operation", json=operation, headers=headers) for operation in operations
+            ))
+
+    return asyncio.run(send())
+
+
+def profile_headers(workspace):
+    return {"X-Profile": "1", "X-Admin-Token": ADMIN_TOKEN, "X-Tenant-ID": workspace.rsplit("/", 1)[-1]}
+
+
+def test_profiled_request_records_its_loop_and_pool_work(workspace):
+    before = {profile["name"] for profile in list_profiles()}
+    responses = post_operations(
+        [{"command": "create", "path": "a.py", "file_text": "x = 1\n"}],
+        profile_headers(workspace)
+    )
+    assert responses[0].status_code == 200 and responses[0].json()["success"]
+
+    new = [profile["name"] for profile in list_profiles() if profile["name"] not in before]
+    assert len(new) == 1 and "api_file_operation" in new[0]
+    functions = profiled_functions(new[0])
+    # The work done on the file I/O thread is in the profile
+    assert "create_new_file" in functions
+    # And so is the endpoint's own time on the event loop
+    assert "file_operation" in functions
+
+
+def test_concurrent_profiled_requests(workspace):
+    before = {profile["name"] for profile in list_profiles()}
+    operations = [{"command": "create", "path": f"f{n}.py", "file_text": ""} for n in range(8)]
+    responses = post_operations(operations, profile_headers(workspace))
+    assert all(response.json()["success"] for response in responses)
+    new = [profile["name"] for profile in list_profiles() if profile["name"] not in before]
+    assert len(new) == 8
+    assert all("create_new_file" in profiled_functions(name) for name in new)
+
+
+def test_unprofiled_request_saves_nothing(workspace):
+    before = list_profiles()
+    post_operations([{"command": "view", "path": "."}], {"X-Tenant-ID": workspace.rsplit("/", 1)[-1]})
+    assert list_profiles() == before
+
+
+def test_profile_header_needs_the_admin_token(workspace):
+    before = list_profiles()
+    headers = profile_headers(workspace)
+    headers["X-Admin-Token"] = "wrong"
+    responses = post_operations([{"command": "create", "path": "a.py", "file_text": ""}], headers)
+    assert responses[0].json()["success"]
+    assert list_profiles() == before
+
+
+def test_admin_routes_are_closed_without_an_admin_token(monkeypatch):
+    monkeypatch.setattr(dependencies, "ADMIN_TOKEN", None)
+    with pytest.raises(HTTPException) as raised:
+        dependencies.require_admin(None)
+    assert raised.value.status_code == 403
+    assert not dependencies.is_admin_token("")
@@ -0,0 +1,66 @@
+import asyncio
+import os
+
+import httpx2 as httpx
+
+
+def get(workspace, path, headers=None):
+    from main import app
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(f"/api/files/raw/{path}", headers={
+                "X-Tenant-ID": workspace.rsplit("/", 1)[-1], **(headers or {})
+            })
+
+    return asyncio.run(send())
+
+
+def write(workspace, name, text):
+    path = os.path.join(workspace, name)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def test_download_has_the_files_version_as_etag(workspace):
+    write(workspace, "a.py", "x = 1\n")
+    response = get(workspace, "a.py")
+    assert response.status_code == 200
+    assert response.content == b"x = 1\n"
+    assert response.headers["content-type"].endswith("charset=utf-8")
+    # The ETag is the version token the view command reports
+    stat_result = os.stat(os.path.join(workspace, "a.py"))
+    assert response.headers["etag"] == f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def test_if_none_match_answers_304_until_the_file_changes(workspace):
+    write(workspace, "a.py", "x = 1\n")
+    etag = get(workspace, "a.py").headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = get(workspace, "a.py", {"If-None-Match": header})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+
+    os.replace(write(workspace, "b.py", "x = 2\n"), os.path.join(workspace, "a.py"))
+    response = get(workspace, "a.py", {"If-None-Match": etag})
+    assert response.status_code == 200 and response.content == b"x = 2\n"
+
+
+def test_range_requests(workspace):
+    write(workspace, "a.txt", "0123456789")
+    response = get(workspace, "a.txt", {"Range": "bytes=2-4"})
+    assert response.status_code == 206
+    assert response.content == b"234"
+    assert response.headers["content-range"] == "bytes 2-4/10"
+
+    # A stale If-Range gets the whole file
+    response = get(workspace, "a.txt", {"Range": "bytes=2-4", "If-Range": '"stale"'})
+    assert response.status_code == 200 and response.content == b"0123456789"
+
+
+def test_missing_files_directories_and_invalid_paths(workspace):
+    os.makedirs(os.path.join(workspace, "pkg"))
+    assert get(workspace, "missing.py").status_code == 404
+    assert get(workspace, "pkg").status_code == 404
+    assert get(workspace, "tool.exe").status_code == 400
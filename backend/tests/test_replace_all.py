@@ -0,0 +1,78 @@
+import contextvars
+import os
+import threading
+
+from src.utils import replace_all as replace_all_module
+from src.utils.backups import create_backup, list_backups
+from src.utils.file_utils import restore_from_backup
+from src.utils.file_versions import path_lock
+from src.utils.replace_all import replace_all
+
+
+def write(root, name, text):
+    path = os.path.join(root, name)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def test_replaces_in_every_file(workspace):
+    paths = [write(workspace, f"m{n}.py", "old = old\n") for n in range(3)]
+    success, message = replace_all(workspace, "old", "new")
+    assert success, message
+    assert message.startswith("Successfully replaced 6 match(es) in 3 file(s)")
+    assert all(open(path).read() == "new = new\n" for path in paths)
+
+
+def test_dry_run_writes_nothing(workspace):
+    path = write(workspace, "a.py", "old\n")
+    success, message = replace_all(workspace, "old", "new", dry_run=True)
+    assert success and message.startswith("Dry run: would replace 1 match(es)")
+    assert open(path).read() == "old\n"
+
+
+def test_file_changed_while_waiting_for_its_lock(workspace):
+    path = write(workspace, "a.py", "old\n")
+    results = []
+    # The worker runs in this test's tenant
+    context = contextvars.copy_context()
+    with path_lock(path):
+        worker = threading.Thread(target=context.run, args=(lambda: results.append(replace_all(workspace, "old", "new")),))
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive()
+        # An edit holding the lock changes the file after it was searched
+        write(workspace, "a.py", "old and more\n")
+    worker.join()
+    success, message = results[0]
+    assert not success and "changed during the search" in message
+    assert open(path).read() == "old and more\n"
+
+
+def test_undo_restores_each_same_named_file_from_its_own_backup(workspace):
+    # More same-named files than BACKUP_MAX_PER_FILE
+    paths = []
+    for n in range(12):
+        os.makedirs(os.path.join(workspace, f"pkg{n}"))
+        paths.append(write(workspace, f"pkg{n}/__init__.py", f"NAME = 'pkg{n}'\n"))
+    success, message = replace_all(workspace, "NAME", "TITLE")
+    assert success, message
+    assert all(len(list_backups(path)) == 1 for path in paths)
+
+    for n in (0, 7, 11):
+        success, message = restore_from_backup(paths[n])
+        assert success, message
+        assert open(paths[n]).read() == f"NAME = 'pkg{n}'\n"
+
+
+def test_a_failed_backup_removes_the_rest_of_the_set(workspace, monkeypatch):
+    paths = [write(workspace, f"m{n}.py", "old\n") for n in range(3)]
+
+    def backup(file_path, backup_id, prune=True):
+        return None if file_path == paths[1] else create_backup(file_path, backup_id, prune)
+    monkeypatch.setattr(replace_all_module, "create_backup", backup)
+
+    success, message = replace_all(workspace, "old", "new")
+    assert not success and "could not back up m1.py" in message
+    assert not any(list_backups(path) for path in paths)
+    assert all(open(path).read() == "old\n" for path in paths)
@@ -0,0 +1,41 @@
+"""
+Cold start stays fast for autoscaling: importing the app is cheap and has no
+side effects beyond defining it (see the lifespan in main.py).
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time of main allowed, in seconds
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+
+
+def import_seconds() -> float:
+    """The cumulative time python -X importtime reports for importing main."""
+    stderr = run_python("-X", "importtime", "-c", "import main").stderr
+    match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| main$", stderr, re.MULTILINE)
+    assert match, stderr[-2000:]
+    return int(match.group(1)) / 1e6
+
+
+def test_import_time_budget():
+    # Best of three, so a busy machine does not fail the budget
+    best = min(import_seconds() for _ in range(3))
+    assert best < IMPORT_BUDGET_SECONDS, f"importing main took {best:.3f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+
+
+def test_import_has_no_side_effects():
+    output = run_python("-c", (
+        "import sys, threading, main; "
+        "print(threading.active_count(), 'anthropic' in sys.modules)"
+    )).stdout.split()
+    # No logging thread is started and the SDK is only imported for the first chatbot
+    assert output == ["1", "False"]
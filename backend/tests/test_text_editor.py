@@ -0,0 +1,48 @@
+import os
+
+from src.api.models import parse_editor_command
+from src.tools.text_editor import TextEditorTool
+
+
+def run(**data):
+    return TextEditorTool.run(parse_editor_command(data))
+
+
+def test_create_then_view(workspace):
+    assert not run(command="create", path="a.py", file_text="x = 1\n")["is_error"]
+    result = run(command="view", path="a.py")
+    assert not result["is_error"]
+    assert result["content"].splitlines()[1:] == ["1: x = 1"]
+
+
+def test_str_replace_dispatch(workspace):
+    run(command="create", path="a.py", file_text="x = 1\n")
+    result = run(command="str_replace", path="a.py", old_str="x = 1", new_str="x = 2")
+    assert not result["is_error"], result["content"]
+    with open(os.path.join(workspace, "a.py")) as f:
+        assert f.read() == "x = 2\n"
+
+
+def test_path_outside_workspace_is_refused(workspace):
+    result = run(command="view", path="../../etc/passwd")
+    assert result["is_error"]
+    assert result["content"].startswith("Access denied")
+
+
+def test_tool_use_with_invalid_parameters():
+    result = TextEditorTool.handle_tool_use({"id": "t1", "input": {"command": "str_replace", "path": "a.py"}})
+    assert result == {
+        "type": "tool_result",
+        "tool_use_id": "t1",
+        "content": "Error: Invalid tool parameters: old_str: Field required",
+        "is_error": True
+    }
+
+
+def test_tool_use_from_sdk_object(workspace):
+    class ToolUse:
+        id = "t2"
+        input = {"command": "create", "path": "b.py", "file_text": ""}
+
+    result = TextEditorTool.handle_tool_use(ToolUse())
+    assert result["tool_use_id"] == "t2" and not result["is_error"]
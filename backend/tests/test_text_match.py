@@ -0,0 +1,39 @@
+from src.utils.text_match import TIER_EXACT, TIER_LINE_ENDINGS, TIER_WHITESPACE, find_match
+
+
+def replace(content, old_str, new_str):
+    match = find_match(content, old_str, new_str)
+    assert match.found
+    return match.tier, content[:match.start] + match.replacement + content[match.end:]
+
+
+def test_exact_match_keeps_crlf_files_crlf():
+    content = "a = 1\r\nb = 2\r\n"
+    assert replace(content, "b = 2", "b = 3\nc = 4") == (TIER_EXACT, "a = 1\r\nb = 3\r\nc = 4\r\n")
+
+
+def test_exact_match_keeps_lf_files_lf():
+    content = "a = 1\nb = 2\n"
+    assert replace(content, "b = 2", "b = 3\r\nc = 4") == (TIER_EXACT, "a = 1\nb = 3\nc = 4\n")
+
+
+def test_line_ending_tier():
+    content = "a = 1\r\nb = 2\r\nc = 3\r\n"
+    assert replace(content, "a = 1\nb = 2", "a = 1\nb = 20") == (TIER_LINE_ENDINGS, "a = 1\r\nb = 20\r\nc = 3\r\n")
+
+
+def test_whitespace_tier_reindents_in_the_files_style():
+    content = "def f():\r\n    x  = 1\r\n    return x\r\n"
+    tier, result = replace(content, "x = 1\nreturn x", "x = 2\nreturn x")
+    assert (tier, result) == (TIER_WHITESPACE, "def f():\r\n    x = 2\r\n    return x\r\n")
+
+
+def test_mostly_lf_file_with_a_stray_crlf():
+    content = "a = 1\nb = 2\r\nc = 3\nd = 4\n"
+    assert replace(content, "c = 3", "c = 30\nc = 31") == (TIER_EXACT, "a = 1\nb = 2\r\nc = 30\nc = 31\nd = 4\n")
+
+
+def test_ambiguous_match_reports_lines():
+    match = find_match("x = 1\ny = 2\nx = 1\n", "x = 1", "x = 2")
+    assert not match.found
+    assert match.candidate_lines == [1, 3]
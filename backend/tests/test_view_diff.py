@@ -0,0 +1,108 @@
+import os
+import random
+
+from src.api.models import parse_editor_command
+from src.tools.text_editor import TextEditorTool
+from src.utils.line_diff import _matching_blocks, diff_lines
+
+
+def lcs_length(a, b):
+    lengths = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            lengths[i + 1][j + 1] = lengths[i][j] + 1 if x == y else max(lengths[i][j + 1], lengths[i + 1][j])
+    return lengths[-1][-1]
+
+
+def random_pair(rng):
+    old = [rng.randrange(6) for _ in range(rng.randrange(25))]
+    new = [rng.randrange(6) for _ in range(rng.randrange(25))] if rng.random() < 0.3 else list(old)
+    for _ in range(rng.randrange(6)):
+        if new and rng.random() < 0.5:
+            del new[rng.randrange(len(new))]
+        else:
+            new.insert(rng.randrange(len(new) + 1), rng.randrange(8))
+    return old, new
+
+
+def test_myers_finds_a_shortest_edit_script():
+    rng = random.Random(0)
+    for _ in range(500):
+        a, b = random_pair(rng)
+        blocks = _matching_blocks(a, b, max_edits=len(a) + len(b))
+        for i, j, size in blocks:
+            assert size > 0 and a[i:i + size] == b[j:j + size]
+        assert sum(size for _, _, size in blocks) == lcs_length(a, b)
+
+
+def test_myers_gives_up_past_the_edit_limit():
+    assert _matching_blocks([1, 2, 3], [4, 5, 6], max_edits=5) is None
+    assert _matching_blocks([1, 2, 3], [4, 5, 6], max_edits=6) == []
+
+
+def test_opcodes_rebuild_the_new_lines():
+    rng = random.Random(1)
+    for _ in range(500):
+        old, new = (list(map(str.encode, map(str, lines))) for lines in random_pair(rng))
+        rebuilt, i, j = [], 0, 0
+        for tag, i1, i2, j1, j2 in diff_lines(old, new):
+            assert (i1, j1) == (i, j)
+            if tag == "equal":
+                assert old[i1:i2] == new[j1:j2]
+            rebuilt += new[j1:j2]
+            i, j = i2, j2
+        assert (i, j) == (len(old), len(new)) and rebuilt == new
+
+
+def test_unique_lines_anchor_distant_changes():
+    old = [f"line {n}\n".encode() for n in range(1000)]
+    new = list(old)
+    new[100] = b"changed\n"
+    del new[900]
+    changes = [opcode for opcode in diff_lines(old, new, max_edits=10) if opcode[0] != "equal"]
+    assert changes == [("replace", 100, 101, 100, 101), ("delete", 900, 901, 900, 900)]
+
+
+def run(**data):
+    return TextEditorTool.run(parse_editor_command(data), "session-1")
+
+
+def rewrite(workspace, name, text):
+    with open(os.path.join(workspace, name), "w") as f:
+        f.write(text)
+
+
+def test_view_diff_after_view(workspace):
+    run(command="create", path="a.py", file_text="a = 1\nb = 2\nc = 3\n")
+    run(command="view", path="a.py")
+    rewrite(workspace, "a.py", "a = 1\nb = 20\nc = 3\n")
+    content = run(command="view_diff", path="a.py")["content"]
+    assert content.splitlines()[3:] == ["@@ -1,3 +1,3 @@", " a = 1", "-b = 2", "+b = 20", " c = 3"]
+    assert "No changes" in run(command="view_diff", path="a.py")["content"]
+
+
+def test_edit_is_remembered_as_written(workspace):
+    run(command="create", path="a.py", file_text="a = 1\n")
+    run(command="str_replace", path="a.py", old_str="a = 1", new_str="a = 2")
+    rewrite(workspace, "a.py", "a = 2\nb = 3\n")
+    assert run(command="view_diff", path="a.py")["content"].splitlines()[-2:] == [" a = 2", "+b = 3"]
+
+
+def test_ranged_view_only_marks_those_lines_seen(workspace):
+    lines = [f"line {n}\n" for n in range(1, 21)]
+    rewrite(workspace, "a.py", "".join(lines))
+    other = TextEditorTool.run(parse_editor_command({"command": "view", "path": "a.py"}), "session-2")
+    assert not other["is_error"]
+    run(command="view", path="a.py", view_range=[1, 5])
+
+    lines[2] = "line three\n"
+    lines[15] = "line sixteen\n"
+    rewrite(workspace, "a.py", "".join(lines))
+    content = run(command="view_diff", path="a.py")["content"]
+    assert "+line three" in content and "sixteen" not in content
+    assert "You had viewed only lines 1-5" in content
+    assert "1 change(s) elsewhere" in content
+
+    # The other session viewed the whole file, so it sees both changes
+    content = TextEditorTool.run(parse_editor_command({"command": "view_diff", "path": "a.py"}), "session-2")["content"]
+    assert "+line three" in content and "+line sixteen" in content
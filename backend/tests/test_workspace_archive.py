@@ -0,0 +1,114 @@
+import contextvars
+import io
+import os
+import tarfile
+import threading
+
+from src.services.workspace_archive import import_archive
+from src.utils.backups import list_backups
+from src.utils.file_utils import restore_from_backup
+from src.utils.file_versions import path_lock
+
+
+def archive(*members):
+    """Build a tar archive from (name, data) pairs; data None makes a directory, a str a symlink target."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            if data is None:
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+            elif isinstance(data, str):
+                info.type = tarfile.SYMTYPE
+                info.linkname = data
+                tar.addfile(info)
+            else:
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    return io.BytesIO(buffer.getvalue())
+
+
+def unpack(workspace, source, overwrite=False):
+    return import_archive(lambda: source.read(4096), workspace, compression="none", overwrite=overwrite)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_members_are_checked_like_editor_paths(workspace, tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    os.symlink(outside, os.path.join(workspace, "escape"))
+
+    result = unpack(workspace, archive(
+        ("/etc/passwd.txt", b"x"),
+        ("../up.py", b"x"),
+        ("a/../../up.py", b"x"),
+        ("escape/x.py", b"x"),
+        (".backups/x.py", b"x"),
+        (".checkpoints/x.py", b"x"),
+        ("tool.exe", b"x"),
+        ("link.py", "/etc/passwd"),
+        ("pkg", None),
+        ("pkg/ok.py", b"ok = 1\n")
+    ))
+
+    assert (result["files"], result["directories"]) == (1, 1)
+    assert result["skipped"] == [
+        "/etc/passwd.txt: absolute or empty path",
+        "../up.py: path contains '..'",
+        "a/../../up.py: path contains '..'",
+        "escape/x.py: outside the workspace",
+        ".backups/x.py: reserved directory",
+        ".checkpoints/x.py: reserved directory",
+        "tool.exe: Access denied: File extension '.exe' is not allowed",
+        "link.py: not a regular file"
+    ]
+    assert read(os.path.join(workspace, "pkg", "ok.py")) == "ok = 1\n"
+    assert os.listdir(outside) == []
+    assert not os.path.lexists(os.path.join(workspace, "link.py"))
+
+
+def test_existing_files_are_kept_without_overwrite(workspace):
+    path = os.path.join(workspace, "a.py")
+    with open(path, "w") as f:
+        f.write("a = 1\n")
+    result = unpack(workspace, archive(("a.py", b"a = 2\n")))
+    assert result["skipped"] == ["a.py: already exists"]
+    assert read(path) == "a = 1\n"
+
+
+def test_overwrite_backs_up_the_replaced_file(workspace):
+    path = os.path.join(workspace, "a.py")
+    with open(path, "w") as f:
+        f.write("a = 1\n")
+    result = unpack(workspace, archive(("a.py", b"a = 2\n")), overwrite=True)
+    assert result["files"] == 1
+    assert read(path) == "a = 2\n"
+    assert len(list_backups(path)) == 1
+
+    success, message = restore_from_backup(path)
+    assert success, message
+    assert read(path) == "a = 1\n"
+
+
+def test_overwrite_waits_for_the_file_lock(workspace):
+    path = os.path.join(workspace, "a.py")
+    with open(path, "w") as f:
+        f.write("a = 1\n")
+    results = []
+    # The worker runs in this test's tenant
+    context = contextvars.copy_context()
+    source = archive(("a.py", b"a = 2\n"))
+    with path_lock(path):
+        worker = threading.Thread(target=context.run, args=(lambda: results.append(unpack(workspace, source, overwrite=True)),))
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive()
+        assert read(path) == "a = 1\n"
+    worker.join(5)
+    assert results[0]["files"] == 1
+    assert read(path) == "a = 2\n"